@@ -3,18 +3,48 @@
 import asyncio
 import os
 from pathlib import Path
-from typing import Final
 
 import discord
 import yaml
 from discord.ext.commands import Bot, DefaultHelpCommand
 from discord.message import Message
 
+from libs.dirty_paths import DirtyPathJournal
+from libs.message_router import MessageRouter
+
 """
 The executable script for the BSF bot.
 """
 
-class DebugBot(Bot):
+class BSFBot(Bot):
+    """
+    The Discord `Bot` class of the BSF bot.
+
+    Cogs don't listen to `on_message` themselves. Instead they register their interest in messages
+    at `message_router`, which normalizes every message once and only dispatches it to the cogs
+    whose prefilter matches.
+
+    Cogs that write into the data folder mark the files they changed in `dirty_paths`, so the
+    CommitDataCog only commits those files.
+    """
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.message_router: MessageRouter = MessageRouter()
+        config = yaml.safe_load(Path("config.yaml").open())
+        self.dirty_paths: DirtyPathJournal = DirtyPathJournal(
+            config.get("dirty-paths-journal", "./dirty_paths.journal")
+        )
+
+    async def on_message(self, message: Message, /) -> None:
+        """
+        Routes a message to the interested cogs and processes the commands in it.
+
+        :param message: A discord message.
+        """
+        await asyncio.gather(self.message_router.dispatch(message), self.process_commands(message))
+
+
+class DebugBot(BSFBot):
     """
     A debugable version of the Discord `Bot` class.
 
@@ -38,52 +68,62 @@ class DebugBot(Bot):
         # the type of the invocation context's bot attribute will be correct
         await self.invoke(ctx)  # type: ignore
 
-run_debug_bot = yaml.safe_load(Path("config_instance.yaml").open())["debug"]
-bot_class = DebugBot if run_debug_bot else Bot
-client = bot_class(command_prefix=".", intents=discord.Intents.all())
-
-TOKEN: Final[str] = yaml.safe_load(Path("discord_token.yaml").open())["discord_token"]
-client.help_command = DefaultHelpCommand(show_parameter_descriptions=False)
-
-
-@client.command(brief="Load clog module")
-async def load(ctx, extension):
-    client.load_extension(f"cogs.{extension}")
-
-
-@client.command(brief="Unload clog module")
-async def unload(ctx, extension):
-    client.unload_extension(f"cogs.{extension}")
-
-
-@client.command(brief="Reload all modules", aliases=["r"])
-async def reload(ctx):
-    for filename in os.listdir("./cogs"):
-        if filename.endswith(".py"):
-            client.unload_extension(f"cogs.{filename[:-3]}")
-            client.load_extension(f"cogs.{filename[:-3]}")
-    await ctx.send("Reloaded cogs")
-
-
-@client.command(brief="List modules to load/unload")
-async def list_cogs(ctx):
-    msg = ""
-    for filename in os.listdir("./cogs"):
-        if filename.endswith(".py"):
-            msg += f"\n{filename[:-3]}"
-    await ctx.send(msg)
 
+def create_client() -> BSFBot:
+    """
+    Creates the bot and registers the commands that load and unload the cogs.
 
-async def load_extensions():
+    The bot is only created when the script runs. Worker processes that are started with spawn
+    (like the weight plot renderer and the NLP workers) import this script again, and must not
+    read the config files or create a client of their own.
+    """
+    run_debug_bot = yaml.safe_load(Path("config_instance.yaml").open())["debug"]
+    bot_class = DebugBot if run_debug_bot else BSFBot
+    client = bot_class(command_prefix=".", intents=discord.Intents.all())
+    client.help_command = DefaultHelpCommand(show_parameter_descriptions=False)
+
+    @client.command(brief="Load clog module")
+    async def load(ctx, extension):
+        client.load_extension(f"cogs.{extension}")
+
+    @client.command(brief="Unload clog module")
+    async def unload(ctx, extension):
+        client.unload_extension(f"cogs.{extension}")
+
+    @client.command(brief="Reload all modules", aliases=["r"])
+    async def reload(ctx):
+        for filename in os.listdir("./cogs"):
+            if filename.endswith(".py"):
+                client.unload_extension(f"cogs.{filename[:-3]}")
+                client.load_extension(f"cogs.{filename[:-3]}")
+        await ctx.send("Reloaded cogs")
+
+    @client.command(brief="List modules to load/unload")
+    async def list_cogs(ctx):
+        msg = ""
+        for filename in os.listdir("./cogs"):
+            if filename.endswith(".py"):
+                msg += f"\n{filename[:-3]}"
+        await ctx.send(msg)
+
+    return client
+
+
+async def load_extensions(client: BSFBot):
     for filename in os.listdir("./cogs"):
         if filename.endswith(".py"):
             await client.load_extension(f"cogs.{filename[:-3]}")
 
 
 async def main():
+    client = create_client()
+    token: str = yaml.safe_load(Path("discord_token.yaml").open())["discord_token"]
     async with client:
-        await load_extensions()
-        await client.start(TOKEN)
+        await load_extensions(client)
+        await client.start(token)
 
 
-asyncio.run(main())
+# Worker processes that are started with spawn (like the weight plot renderer) import this script
+# again, which must not start another bot.
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from libs import weight_repository  # noqa: E402
+
+"""
+Benchmark that compares reads of the memory-mapped binary weight format against the csv format,
+for histories of different lengths. Both the whole history (the `.stats all` plot) and the last
+week are read, as (date, weight) entries and as arrays.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_binary_format.py
+"""
+
+HISTORY_YEARS = [1, 5, 10, 30]
+REPEATS = 50
+
+
+def average_ms(function, *args) -> float:
+    """Returns the average run time of a function in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        function(*args)
+    return 1000 * (time.perf_counter() - start) / REPEATS
+
+
+def main() -> None:
+    data_path = tempfile.mkdtemp()
+    csv_repository = weight_repository.CsvWeightRepository(os.path.join(data_path, "csv"))
+    binary_repository = weight_repository.BinaryWeightRepository(os.path.join(data_path, "bin"))
+    today = date.today()
+    week_start = today - timedelta(days=7)
+
+    print("Every column shows csv, then binary.")
+    print(
+        f"{'history':>8}   {'file size':<16}   {'all entries':<29}   {'all arrays':<29}"
+        "   last week"
+    )
+    try:
+        for years in HISTORY_YEARS:
+            user_id = str(years)
+            entries = [
+                (today - timedelta(days=day), 80.0 + day % 100 / 10)
+                for day in range(years * 365)
+            ]
+            csv_repository.upsert_many(user_id, entries)
+            binary_repository.upsert_many(user_id, entries)
+            assert binary_repository.read_range(user_id) == csv_repository.read_range(user_id)
+
+            timings = []
+            for method, args in (
+                ("read_range", (user_id,)),
+                ("read_arrays", (user_id,)),
+                ("read_range", (user_id, week_start, today)),
+            ):
+                csv_ms = average_ms(getattr(csv_repository, method), *args)
+                binary_ms = average_ms(getattr(binary_repository, method), *args)
+                timings.append(
+                    f"   {csv_ms:6.2f} ms {binary_ms:6.3f} ms ({csv_ms / binary_ms:3.0f}x)"
+                )
+
+            csv_size = os.path.getsize(csv_repository.weight_path(user_id)) / 1024
+            binary_size = os.path.getsize(binary_repository.weight_path(user_id)) / 1024
+            print(
+                f"{years:>6} y   {csv_size:>4.0f} KiB {binary_size:>4.0f} KiB" + "".join(timings)
+            )
+    finally:
+        shutil.rmtree(data_path)
+
+
+if __name__ == "__main__":
+    main()
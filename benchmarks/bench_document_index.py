@@ -0,0 +1,83 @@
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from libs.document_index import DocumentVectorIndex  # noqa: E402
+
+"""
+Benchmark of the "source that" search over 500 info command files with 300-dimensional document
+vectors, the size of the `en_core_web_md` vectors. It compares the matrix-vector product of the
+document index against computing the cosine similarity file by file, like `Doc.similarity` did, and
+reports how long loading the persisted index and an up-to-date refresh take.
+
+The pipeline itself isn't run, so the random vectors stand in for the vectors of the files. Before
+the index the pipeline also ran over every file for every search, which the index avoids.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_document_index.py
+"""
+
+FILES = 500
+DIMENSIONS = 300
+SEARCHES = 200
+
+
+def loop_search(vectors: List[np.ndarray], query_vector: np.ndarray) -> int:
+    """The search as it was done in `SourceCog.search_files` before, without the pipeline."""
+    best_file, max_similarity = None, 0.0
+    for file, vector in enumerate(vectors):
+        similarity = np.dot(query_vector, vector) / (
+            np.linalg.norm(query_vector) * np.linalg.norm(vector)
+        )
+        if similarity > max_similarity:
+            best_file, max_similarity = file, similarity
+    return best_file
+
+
+def main() -> None:
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(FILES, DIMENSIONS)).astype(np.float32)
+    queries = rng.normal(size=(SEARCHES, DIMENSIONS)).astype(np.float32)
+    directory = tempfile.mkdtemp()
+    try:
+        for file in range(FILES):
+            Path(directory, f"{file:04d}.txt").write_text(str(file))
+        index = DocumentVectorIndex(str(Path(directory, "index.npz")))
+        index.refresh(directory, lambda texts: vectors[[int(text) for text in texts]])
+        index.save()
+
+        start = time.perf_counter()
+        loop_results = [loop_search(list(vectors), query) for query in queries]
+        loop_seconds = (time.perf_counter() - start) / SEARCHES
+        start = time.perf_counter()
+        index_results = [int(Path(index.search("", query)[0][0]).stem) for query in queries]
+        index_seconds = (time.perf_counter() - start) / SEARCHES
+        assert loop_results == index_results
+
+        start = time.perf_counter()
+        loaded_index = DocumentVectorIndex(index.PATH)
+        loaded_index.load()
+        load_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        assert not loaded_index.refresh(directory, lambda texts: vectors)
+        refresh_seconds = time.perf_counter() - start
+    finally:
+        shutil.rmtree(directory)
+
+    print(f"{FILES} files with {DIMENSIONS}-dimensional vectors")
+    print(f"file by file   {loop_seconds * 1000:8.3f} ms per search")
+    print(f"index          {index_seconds * 1000:8.3f} ms per search")
+    print(f"load index     {load_seconds * 1000:8.3f} ms")
+    print(f"refresh        {refresh_seconds * 1000:8.3f} ms (nothing changed)")
+
+
+if __name__ == "__main__":
+    main()
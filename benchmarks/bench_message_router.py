@@ -0,0 +1,128 @@
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, List
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from cogs.conversion import ConversionCog  # noqa: E402
+from cogs.fitness_calculators import FitnessCalculators  # noqa: E402
+from cogs.funny_reactions import FunnyReactionsCog  # noqa: E402
+from cogs.polls import PollsCog  # noqa: E402
+from libs.message_router import (MessageRouter, Route,  # noqa: E402
+                                 RoutedMessage)
+
+"""
+Benchmark that compares the messages per second of the message router against the old fan-out,
+where every cog had its own `on_message` listener that was scheduled as a separate task.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_message_router.py
+"""
+
+MESSAGE_COUNT = 20_000
+
+SAMPLE_MESSAGES: List[str] = [
+    "good morning everyone",
+    "anyone training legs today?",
+    "what do you guys think about creatine",
+    "I just hit a new deadlift PR!",
+    "drink more water",
+    "I'm 184cm and 90kg, 15bf",
+    "I weigh 200 lbs and I'm 5'10",
+    "lol",
+    "that's not how protein synthesis works",
+    "source that",
+    "cutting at 2200 kcal right now",
+    "thor is a beast",
+]
+
+
+async def noop(*args, **kwargs) -> None:
+    """Stand-in for Discord API calls."""
+
+
+async def source_stub(routed_message: RoutedMessage) -> None:
+    """Stand-in for SourceCog, which only does work for replies with the key phrase."""
+
+
+def make_message(content: str, channel_id: int) -> SimpleNamespace:
+    """Creates a fake Discord message."""
+    channel = SimpleNamespace(id=channel_id, send=noop)
+    return SimpleNamespace(
+        content=content, reference=None, channel=channel, author=None, add_reaction=noop
+    )
+
+
+async def setup_router() -> MessageRouter:
+    """Loads the cogs into a fake bot and returns its router."""
+    bot = SimpleNamespace(message_router=MessageRouter(), user=object())
+    for cog in [ConversionCog(bot), FitnessCalculators(bot), FunnyReactionsCog(bot), PollsCog(bot)]:
+        await cog.cog_load()
+    bot.message_router.register("SourceCog", source_stub, keywords=["source that"], reply=True)
+    return bot.message_router
+
+
+def fan_out_listeners(router: MessageRouter) -> List[Callable]:
+    """
+    Rebuilds the old listeners from the registered routes. Every listener normalizes the message
+    itself, and the digit prefilter didn't exist.
+    """
+
+    def listener(route: Route) -> Callable:
+        legacy_route = Route(
+            route.handler, keywords=route.keywords, reply=route.reply, channels=route.channels
+        )
+        own_router = MessageRouter()
+        own_router.routes["legacy"] = legacy_route
+        own_router.compile_keywords()
+
+        async def on_message(message) -> None:
+            routed_message = RoutedMessage(
+                message, own_router.keyword_pattern, own_router.contained_keywords
+            )
+            if legacy_route.matches(routed_message):
+                await legacy_route.handler(routed_message)
+
+        return on_message
+
+    return [listener(route) for route in router.routes.values()]
+
+
+async def bench_fan_out(router: MessageRouter, messages: List[SimpleNamespace]) -> float:
+    listeners = fan_out_listeners(router)
+    start = time.perf_counter()
+    for message in messages:
+        # discord.py schedules every listener of an event as its own task.
+        await asyncio.gather(*(asyncio.create_task(listener(message)) for listener in listeners))
+    return len(messages) / (time.perf_counter() - start)
+
+
+async def bench_router(router: MessageRouter, messages: List[SimpleNamespace]) -> float:
+    start = time.perf_counter()
+    for message in messages:
+        await asyncio.create_task(router.dispatch(message))
+    return len(messages) / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    router = await setup_router()
+    random.seed(0)
+    messages = [
+        make_message(random.choice(SAMPLE_MESSAGES), random.randint(0, 20))
+        for _ in range(MESSAGE_COUNT)
+    ]
+
+    fan_out = await bench_fan_out(router, messages)
+    routed = await bench_router(router, messages)
+    print(f"{f'Fan-out of {len(router.routes)} listeners:':<28}{fan_out:>10.0f} messages/s")
+    print(f"{'Message router:':<28}{routed:>10.0f} messages/s")
+    print(f"{'Speedup:':<28}{routed / fan_out:>10.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
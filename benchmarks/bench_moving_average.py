@@ -0,0 +1,71 @@
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from libs.weight_stats import moving_average, to_arrays  # noqa: E402
+
+"""
+Benchmark that compares the vectorized moving average of the `.stats` command against the old
+Python loop, on 10 years of daily weight data.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_moving_average.py
+"""
+
+WINDOWS = {"weekly_avg": 7, "monthly_avg": 30, "yearly_avg": 365}
+DAYS = 10 * 365
+
+
+def loop_moving_average(weights: List[float], window: int) -> List[float]:
+    """The moving average as it was calculated in `WeightCog.stats` before."""
+    moving_averages = []
+    for i in range(len(weights) - window + 1):
+        avg = np.mean(weights[i : i + window])
+        moving_averages.append(avg)
+    return moving_averages
+
+
+def best_of(repeats: int, function, *args) -> float:
+    """Returns the fastest run time of a function in seconds."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    rng = np.random.default_rng(0)
+    first_date = date(2014, 1, 1)
+    entries = [
+        (first_date + timedelta(days=day), 90 - day * 0.005 + rng.normal(0, 0.5))
+        for day in range(DAYS)
+    ]
+    ordinals, weights = to_arrays(entries)
+    weight_tuple = tuple(weights.tolist())
+
+    print(f"{DAYS} daily entries")
+    for name, window in WINDOWS.items():
+        # Without gaps both methods average the same entries.
+        _, averages = moving_average(ordinals, weights, window)
+        assert np.allclose(averages, loop_moving_average(weight_tuple, window))
+
+        loop_seconds = best_of(3, loop_moving_average, weight_tuple, window)
+        vectorized_seconds = best_of(20, moving_average, ordinals, weights, window)
+        speedup = loop_seconds / vectorized_seconds
+        print(
+            f"{name:<12} loop: {loop_seconds * 1000:8.2f} ms  vectorized:"
+            f" {vectorized_seconds * 1000:6.3f} ms  speedup: {speedup:6.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
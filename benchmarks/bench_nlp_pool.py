@@ -0,0 +1,96 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, List
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from libs.nlp_pool import NlpProcessPool  # noqa: E402
+
+"""
+Load test of the NLP worker pool of the SourceCog: 50 "source that" replies arrive at once, half of
+them quoting the same few messages. It reports how long the event loop was blocked at most, which
+is what delays the gateway heartbeat, and the latency of the replies. It compares the pool against
+running the pipeline inside of the event loop, like `SourceCog.search_files` did before.
+
+It needs spaCy and the `en_core_web_md` model:
+
+    python -m spacy download en_core_web_md
+
+Run from the root of the repository:
+
+    python benchmarks/bench_nlp_pool.py
+"""
+
+QUERIES = 50
+HEARTBEAT_INTERVAL = 0.01
+
+MESSAGES = [
+    "Carbs are unhealthy and make you fat",
+    "You need to eat protein right after your workout or you lose your gains",
+    "Eating late at night makes you gain weight",
+    "Fruit has too much sugar to be healthy",
+    "Creatine is a steroid",
+]
+
+
+async def measure(search: Callable[[str], Awaitable[object]], texts: List[str]) -> None:
+    """Runs the searches at once while a heartbeat measures how late the event loop wakes it."""
+    max_lag = 0.0
+    latencies = []
+
+    async def heartbeat() -> None:
+        nonlocal max_lag
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            max_lag = max(max_lag, time.perf_counter() - start - HEARTBEAT_INTERVAL)
+
+    async def timed_search(text: str) -> None:
+        start = time.perf_counter()
+        await search(text)
+        latencies.append(time.perf_counter() - start)
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+    await asyncio.sleep(HEARTBEAT_INTERVAL)
+    start = time.perf_counter()
+    await asyncio.gather(*(timed_search(text) for text in texts))
+    total = time.perf_counter() - start
+    heartbeat_task.cancel()
+    latencies.sort()
+    median = latencies[len(latencies) // 2]
+    print(
+        f"  all answered in {total * 1000:7.0f} ms, latency p50 {median * 1000:6.0f} ms,"
+        f" max {latencies[-1] * 1000:6.0f} ms, event loop blocked up to {max_lag * 1000:6.0f} ms"
+    )
+
+
+async def main() -> None:
+    # Half of the replies quote the same messages, the other half quote different messages.
+    texts = [MESSAGES[query % len(MESSAGES)] for query in range(QUERIES // 2)] + [
+        f"{MESSAGES[query % len(MESSAGES)]} (reply {query})" for query in range(QUERIES // 2)
+    ]
+
+    import spacy
+
+    pipeline = spacy.load("en_core_web_md")
+
+    async def inline_search(text: str) -> object:
+        return pipeline(text).vector
+
+    print(f"{QUERIES} concurrent queries")
+    print("pipeline in the event loop")
+    await measure(inline_search, texts)
+
+    pool = NlpProcessPool("en_core_web_md", max_workers=2)
+    start = time.perf_counter()
+    await pool.start()
+    print(f"worker pool (started in {time.perf_counter() - start:.1f} s)")
+    await measure(pool.vector, texts)
+    print(f"  {pool.metrics()}")
+    pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
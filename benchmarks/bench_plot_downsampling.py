@@ -0,0 +1,69 @@
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from libs import weight_stats  # noqa: E402
+from libs.weight_plot import render_weight_plot  # noqa: E402
+
+"""
+Benchmark of the `.stats` plot of the period "all" with and without LTTB downsampling, for
+histories of 1 to 30 years of daily weight data.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_plot_downsampling.py
+"""
+
+YEARS = [1, 5, 10, 30]
+MAX_POINTS = 500
+"""
+The default of the `weight-plot-max-points` setting.
+"""
+
+
+def render(ordinals: np.ndarray, weights: np.ndarray) -> bytes:
+    """Renders a plot of the entries like `WeightCog.render_stats_plot`."""
+    return render_weight_plot(
+        "Weight Record", weight_stats.ordinals_to_dates(ordinals).tolist(), weights.tolist()
+    )
+
+
+def time_render(ordinals: np.ndarray, weights: np.ndarray, downsample: bool):
+    """Returns the best time of 3 renders in seconds and the size of the PNG."""
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        if downsample:
+            indices = weight_stats.largest_triangle_three_buckets(ordinals, weights, MAX_POINTS)
+            png = render(ordinals[indices], weights[indices])
+        else:
+            png = render(ordinals, weights)
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(png)
+
+
+def main() -> None:
+    rng = np.random.default_rng(0)
+    first_date = date(1994, 1, 1)
+    print(f"{'history':>8} {'entries':>8}   {'all points':>20}   {'LTTB ' + str(MAX_POINTS):>20}")
+    for years in YEARS:
+        days = years * 365
+        ordinals, weights = weight_stats.to_arrays(
+            (first_date + timedelta(days=day), 90 - day * 0.002 + rng.normal(0, 0.5))
+            for day in range(days)
+        )
+        full_seconds, full_size = time_render(ordinals, weights, downsample=False)
+        lttb_seconds, lttb_size = time_render(ordinals, weights, downsample=True)
+        print(
+            f"{years:>6} y {days:>8}   {full_seconds * 1000:7.0f} ms {full_size / 1024:6.0f} KiB"
+            f"   {lttb_seconds * 1000:7.0f} ms {lttb_size / 1024:6.0f} KiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from libs.weight_repository import CsvWeightRepository  # noqa: E402
+from libs.weight_repository import read_csv_entries
+
+"""
+Benchmark that compares reading the last week of a csv weight history with the binary search of
+`CsvWeightRepository.read_range` against parsing and filtering the whole file, for histories of
+different lengths.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_read_range.py
+"""
+
+HISTORY_YEARS = [1, 5, 10, 30]
+REPEATS = 200
+
+
+def main() -> None:
+    data_path = tempfile.mkdtemp()
+    repository = CsvWeightRepository(data_path)
+    today = date.today()
+    week_start = today - timedelta(days=7)
+
+    try:
+        for years in HISTORY_YEARS:
+            user_id = str(years)
+            days = years * 365
+            repository.upsert_many(
+                user_id, [(today - timedelta(days=day), 80.0 + day % 10) for day in range(days)]
+            )
+
+            start = time.perf_counter()
+            for _ in range(REPEATS):
+                entries = repository.read_range(user_id, week_start, today)
+            seek_ms = 1000 * (time.perf_counter() - start) / REPEATS
+
+            start = time.perf_counter()
+            for _ in range(REPEATS):
+                filtered = [
+                    entry
+                    for entry in read_csv_entries(repository.weight_path(user_id))
+                    if week_start <= entry[0] <= today
+                ]
+            scan_ms = 1000 * (time.perf_counter() - start) / REPEATS
+
+            assert entries == filtered
+            print(
+                f"{years:>2} years ({days:>5} rows): last week with seek: {seek_ms:6.3f} ms,"
+                f" full parse and filter: {scan_ms:7.3f} ms"
+            )
+    finally:
+        shutil.rmtree(data_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from libs import nlp_pool  # noqa: E402
+from libs.document_index import DocumentVectorIndex, normalize  # noqa: E402
+
+"""
+Benchmark of the "source that" retrieval on a small labelled set of info commands and replied
+messages. It reports the recall (how often the expected info command is found first) and the
+latency of a query for:
+
+- whole files compared by their vectors, like `SourceCog.search_files` did before,
+- paragraphs compared by their vectors,
+- paragraphs prefiltered by BM25 and re-ranked by their vectors, which the SourceCog does now.
+
+The latency includes the vector of the query. It needs spaCy and the `en_core_web_md` model:
+
+    python -m spacy download en_core_web_md
+
+Run from the root of the repository:
+
+    python benchmarks/bench_source_retrieval.py
+"""
+
+INFO_COMMANDS: Dict[str, str] = {
+    "carbs": (
+        "Carbohydrates are not unhealthy. They are the main source of energy for the brain and for"
+        " intense training.\n\n"
+        "Weight loss depends on a calorie deficit, not on cutting carbs. Low carb diets work"
+        " because they make people eat fewer calories.\n\n"
+        "Sugar in fruit comes with fiber and water, which makes fruit filling and healthy."
+    ),
+    "protein": (
+        "Aim for 1.6 to 2.2 grams of protein per kilogram of body weight per day to build"
+        " muscle.\n\n"
+        "The anabolic window is a myth. Eating protein within 30 minutes after a workout is not"
+        " needed, the total protein of the day matters.\n\n"
+        "High protein diets don't damage the kidneys of healthy people."
+    ),
+    "creatine": (
+        "Creatine is not a steroid. It is one of the most researched supplements and is safe for"
+        " healthy adults.\n\n"
+        "Take 3 to 5 grams of creatine monohydrate a day. Loading is not necessary."
+    ),
+    "meal_timing": (
+        "Eating late at night doesn't make you gain weight. Total calories over the day decide"
+        " weight gain.\n\n"
+        "Breakfast is not the most important meal of the day. Intermittent fasting works as well"
+        " as any diet with the same calories."
+    ),
+    "cardio": (
+        "Cardio doesn't kill your gains. Moderate cardio next to lifting is good for the heart and"
+        " recovery.\n\n"
+        "Fasted cardio doesn't burn more fat over the day than cardio after a meal."
+    ),
+    "spot_reduction": (
+        "You can't burn belly fat with crunches. Fat loss happens all over the body, not where you"
+        " train."
+    ),
+    "sleep": (
+        "Sleep at least seven hours. Too little sleep makes you hungrier and hurts recovery and"
+        " strength."
+    ),
+}
+
+QUERIES: Dict[str, str] = {
+    "Carbs make you fat": "carbs",
+    "Bread is bad for you, cut all carbohydrates": "carbs",
+    "Fruit has too much sugar": "carbs",
+    "You have to drink your shake right after training or you lose gains": "protein",
+    "How much protein do I need to build muscle?": "protein",
+    "Eating that much protein ruins your kidneys": "protein",
+    "Creatine is basically steroids": "creatine",
+    "Should I do a loading phase with my supplement?": "creatine",
+    "Don't eat after 8pm, it turns into fat": "meal_timing",
+    "Never skip breakfast": "meal_timing",
+    "Running will make you lose all your muscle": "cardio",
+    "Do your cardio on an empty stomach to burn more fat": "cardio",
+    "Do 100 situps a day to get rid of belly fat": "spot_reduction",
+    "Sleep is for the weak, just train harder": "sleep",
+}
+
+REPEATS = 20
+
+
+def measure(search: Callable[[str], str]) -> None:
+    """Runs every query and prints the recall and the average latency."""
+    hits = 0
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        hits += sum(search(query) == expected for query, expected in QUERIES.items())
+    latency = (time.perf_counter() - start) / (REPEATS * len(QUERIES))
+    print(f"  recall@1 {hits / (REPEATS * len(QUERIES)):5.0%}   {latency * 1000:6.2f} ms per query")
+
+
+def main() -> None:
+    nlp_pool.load_pipeline("en_core_web_md")
+    vectorize = nlp_pool.document_vectors
+    directory = tempfile.mkdtemp()
+    try:
+        for name, content in INFO_COMMANDS.items():
+            Path(directory, f"{name}.txt").write_text(content)
+        index = DocumentVectorIndex(str(Path(directory, "index.npz")))
+        index.refresh(directory, vectorize)
+        names: List[str] = list(INFO_COMMANDS)
+        file_vectors = normalize(vectorize(list(INFO_COMMANDS.values())))
+
+        def whole_files(query: str) -> str:
+            return names[int(np.argmax(file_vectors @ vectorize([query])[0]))]
+
+        def paragraphs(query: str) -> str:
+            # Without a query text, BM25 finds no candidates and every paragraph is compared.
+            matches = index.search("", vectorize([query])[0])
+            return Path(matches[0][0]).stem if matches else ""
+
+        def hybrid(query: str) -> str:
+            matches = index.search(query, vectorize([query])[0], candidates=5)
+            return Path(matches[0][0]).stem if matches else ""
+
+        print(f"{len(QUERIES)} labelled queries, {len(index.chunks)} paragraphs")
+        searches = {"whole files": whole_files, "paragraphs": paragraphs, "BM25 + vectors": hybrid}
+        for name, search in searches.items():
+            print(name)
+            measure(search)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+"""
+Benchmark of the startup time and resident memory of the spaCy pipeline of the SourceCog. Every
+measurement runs in a fresh Python process:
+
+- the full `en_core_web_md` pipeline, which `cogs/source.py` used to load when it was imported,
+- the vectors-only pipeline that the NLP worker processes load now,
+- importing `cogs/source.py` in the bot process, which doesn't import spaCy anymore.
+
+It also checks that both pipelines compute the same document vectors.
+
+It needs spaCy and the `en_core_web_md` model:
+
+    python -m spacy download en_core_web_md
+
+Run from the root of the repository:
+
+    python benchmarks/bench_spacy_startup.py
+"""
+
+ROOT = str(Path(__file__).resolve().parents[1])
+
+MEASURE = """
+import json, resource, sys, time
+sys.path.append({root!r})
+start = time.perf_counter()
+{code}
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "spacy_imported": "spacy" in sys.modules,
+}}))
+"""
+
+MEASUREMENTS = {
+    "full pipeline": "import spacy\nspacy.load('en_core_web_md')",
+    "vectors-only pipeline": (
+        "from libs import nlp_pool\nnlp_pool.load_pipeline('en_core_web_md')"
+    ),
+    "import cogs/source.py": "import cogs.source",
+}
+
+TEXTS = ["Carbs are unhealthy", "Creatine is a steroid", "Eating late at night makes you fat"]
+
+
+def measure(code: str) -> dict:
+    """Runs code in a fresh process and returns its run time and peak resident memory."""
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE.format(root=ROOT, code=code)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main() -> None:
+    sys.path.append(ROOT)
+    import numpy as np
+    import spacy
+
+    from libs import nlp_pool
+
+    full_pipeline = spacy.load("en_core_web_md")
+    nlp_pool.load_pipeline("en_core_web_md")
+    print(f"vectors-only components: {nlp_pool.pipeline.pipe_names}")
+    for text in TEXTS:
+        assert np.allclose(full_pipeline(text).vector, nlp_pool.document_vectors([text])[0])
+
+    for name, code in MEASUREMENTS.items():
+        result = measure(code)
+        print(
+            f"{name:>22}   {result['seconds']:6.2f} s   {result['max_rss_mb']:7.0f} MB resident"
+            f"   spaCy imported: {result['spacy_imported']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
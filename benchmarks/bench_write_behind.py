@@ -0,0 +1,109 @@
+import asyncio
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import yaml
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from cogs.weightcog import WeightCog  # noqa: E402
+from libs.dirty_paths import DirtyPathJournal  # noqa: E402
+from libs.weight_repository import CsvWeightRepository  # noqa: E402
+from libs.weight_write_buffer import DURABILITY_MODES  # noqa: E402
+
+"""
+Benchmark of a morning burst of `.weight` commands: 1,000 users with a year of history each log
+their weight at the same time, once with every durability mode of the weight logs. The commands
+run through `WeightCog.weight`, including the updates of the trends and the server statistics. It
+reports the commands per second until every command has been answered, and the time until every
+log, trend and statistic has been written to disk.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_write_behind.py
+"""
+
+USERS = 1000
+HISTORY_DAYS = 365
+
+
+class BenchContext:
+    """The context of a `.weight` command, with only what the command uses."""
+
+    def __init__(self, user_id: int) -> None:
+        self.author = SimpleNamespace(id=user_id, display_name=f"user {user_id}")
+        self.message = SimpleNamespace(created_at=datetime.now(timezone.utc))
+
+    async def send(self, *args, **kwargs) -> None:
+        pass
+
+
+def write_config(directory: str, durability: str) -> Path:
+    """Writes the config of the repository, with all data files in a temporary directory."""
+    config = yaml.safe_load(Path("config.yaml").read_text())
+    config.update(
+        {
+            "weight-cog-data-path": f"{directory}/weightcog/",
+            "weight-aggregates-path": f"{directory}/weight_aggregates.json",
+            "weight-trends-path": f"{directory}/weight_trends/",
+            "weight-reminders-path": f"{directory}/weigh_in_reminders.json",
+            "weight-storage": "csv",
+            "weight-write-durability": durability,
+        }
+    )
+    config_path = Path(directory, "config.yaml")
+    config_path.write_text(yaml.safe_dump(config))
+    return config_path
+
+
+async def burst(directory: str, durability: str) -> None:
+    """Runs the burst of commands with a durability mode and prints the timings."""
+    WeightCog.CONFIG_PATH = write_config(directory, durability)
+    bot = SimpleNamespace(dirty_paths=DirtyPathJournal(f"{directory}/dirty_paths.journal"))
+    cog = WeightCog(bot)
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            WeightCog.weight.callback(cog, BenchContext(user), 80.0 + user % 20)
+            for user in range(USERS)
+        )
+    )
+    answered = time.perf_counter() - start
+    # In the "async" mode the commands answer before their logs are written, so the buffer is only
+    # complete once the unload has flushed it.
+    await cog.cog_unload()
+    written = time.perf_counter() - start
+    write_buffer = cog.weight_repository.write_buffer
+    write_buffer_metrics = write_buffer.metrics() if write_buffer else ""
+
+    today = datetime.now(timezone.utc).date()
+    assert CsvWeightRepository(f"{directory}/weightcog/").read_range("1")[-1] == (today, 81.0)
+    assert len(cog.aggregate_index.summaries) == USERS
+    print(
+        f"{durability:>6}   {USERS / answered:10.0f} commands/s   answered in {answered:6.3f} s"
+        f"   written in {written:6.3f} s   {write_buffer_metrics}"
+    )
+
+
+def main() -> None:
+    today = datetime.now(timezone.utc).date()
+    history = [(today - timedelta(days=day), 80.0) for day in range(1, HISTORY_DAYS + 1)]
+    print(f"{USERS} users log their weight at once, with {HISTORY_DAYS} days of history each")
+    for durability in DURABILITY_MODES:
+        directory = tempfile.mkdtemp()
+        try:
+            seed_repository = CsvWeightRepository(f"{directory}/weightcog/")
+            for user in range(USERS):
+                seed_repository.upsert_many(str(user), history)
+            asyncio.run(burst(directory, durability))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
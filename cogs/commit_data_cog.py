@@ -1,12 +1,17 @@
+import asyncio
 import datetime
 import os
-import subprocess
+import shutil
+import time
 from pathlib import Path
-from typing import Any, Dict, Final
+from typing import Any, Dict, Final, List, Optional, Tuple
 
 import yaml
 from discord.ext import commands, tasks
 
+from libs.git_pipeline import GitPipeline, GitStepResult
+from libs.push_outbox import PushOutbox
+
 
 class CommitDataCog(commands.Cog):
     """
@@ -14,21 +19,73 @@ class CommitDataCog(commands.Cog):
 
     It assumes that Git has already been setup on a host with access to the remote repository and
     that the setup won't change during runtime.
+
+    The git commands run as asyncio subprocesses inside of the data folder, so a slow remote doesn't
+    block the bot and the working directory of the other cogs never changes.
+
+    Only the files that the other cogs marked as changed in `bot.dirty_paths` are staged. When no
+    file changed, the commit is skipped without contacting the remote, so the data can be committed
+    often.
+
+    The data is committed locally first, and the commit is recorded in a persistent outbox. A push
+    that fails (for example because the remote can't be reached, or another clone pushed first) is
+    retried with exponential backoff, after rebasing the local commits onto the remote.
     """
 
     # Specifies the time to commit data through specified timezone, hour and minute values
     TIMEZONE: Final[datetime.timezone] = datetime.timezone.utc
     COMMIT_TIME: Final[datetime.time] = datetime.time(hour=14, minute=8, tzinfo=TIMEZONE)
+    # How often the data files are checkpointed before a commit is skipped, and the seconds between
+    # the attempts
+    CHECKPOINT_ATTEMPTS: Final[int] = 3
+    CHECKPOINT_RETRY_SECONDS: Final[float] = 1.0
 
     def __init__(self, bot: commands.Bot) -> None:
         self.bot: commands.Bot = bot
         self.CONFIG_PATH: Final[str] = Path("./config.yaml")
         self.config: Dict[str, Any] = self.get_config()
         self.DATA_PATH: Final[str] = self.config["data-folder"]
+        self.git: Final[GitPipeline] = GitPipeline(
+            self.DATA_PATH,
+            self.config.get("git-local-timeout-seconds", 30),
+            self.config.get("git-network-timeout-seconds", 120),
+        )
+        # Keeps a manual commit from running git at the same time as the scheduled commit
+        self.commit_lock: Final[asyncio.Lock] = asyncio.Lock()
+        # Commits that still have to be pushed, and when the push is retried
+        self.outbox: Final[PushOutbox] = PushOutbox(
+            self.config.get("git-push-outbox-path", "./push_outbox.json"),
+            self.config.get("git-push-retry-base-seconds", 30),
+            self.config.get("git-push-retry-max-seconds", 3600),
+        )
+        self.push_retry: Optional[asyncio.Task] = None
+
+        # Commits every few minutes instead of once a day at COMMIT_TIME when configured
+        commit_interval = self.config.get("data-commit-interval-minutes")
+        if commit_interval:
+            self.commit_data.change_interval(minutes=commit_interval)
+
+    """
+    Loads the outbox and starts committing data when the cog is loaded. Pending commits of an
+    earlier run are pushed when their retry is due.
+    """
 
+    async def cog_load(self) -> None:
+        await asyncio.to_thread(self.outbox.load)
         # Only commits data if Git is installed on the host
         if self.is_git_installed():
             self.commit_data.start()
+            if self.outbox.pending:
+                self.schedule_push_retry()
+
+    """
+    Stops committing data and retrying pushes when the cog is unloaded
+    """
+
+    async def cog_unload(self) -> None:
+        self.commit_data.cancel()
+        if self.push_retry:
+            self.push_retry.cancel()
 
     @commands.Cog.listener()
     async def on_ready(self) -> None:
@@ -44,29 +101,69 @@ class CommitDataCog(commands.Cog):
         await self.commit_data()
 
     """
-    Commits data according to COMMIT_TIME where Git is used to push changes to the remote repository
+    Commits data according to COMMIT_TIME (or the configured interval) where Git is used to push the
+    changed files to the remote repository. Nothing is run when no file changed.
     """
 
     @tasks.loop(time=COMMIT_TIME)
     async def commit_data(self) -> None:
-        datetime_now: datetime.datetime = datetime.datetime.now()
-        current_date: str = datetime_now.strftime("%Y-%m-%d")
-        current_time: str = datetime_now.strftime("%H-%M-%S")
+        async with self.commit_lock:
+            snapshot: Dict[str, int] = self.bot.dirty_paths.snapshot()
+            paths: List[str] = self.data_relative_paths(snapshot)
+            if not paths:
+                print("No data changed since the last commit, skipping the data commit")
+                if self.outbox.is_due(time.time()):
+                    await self.push_outbox()
+                return
+            if not await self.checkpoint_data():
+                print("The data files are still being written, skipping the data commit")
+                return
 
-        commit_msg: str = f"(UTC: {current_date} {current_time}) Committing user data"
+            datetime_now: datetime.datetime = datetime.datetime.now()
+            current_date: str = datetime_now.strftime("%Y-%m-%d")
+            current_time: str = datetime_now.strftime("%H-%M-%S")
 
-        # Gets the current working directory of the subprocess/bot instance NOT the working
-        # directory of the root process
-        working_dir = os.getcwd()
-        try:
-            # Changes the current directory to the data folder if possible
-            os.chdir(self.DATA_PATH)
-        except FileNotFoundError:
-            print(f"Git could not find the data folder {self.DATA_PATH}.")
+            commit_msg: str = f"(UTC: {current_date} {current_time}) Committing user data"
+            if not await self.commit_to_git(commit_msg, paths):
+                return
+            # The changes are in a local commit now, which the outbox pushes.
+            self.bot.dirty_paths.clear(snapshot)
+            if self.outbox.is_due(time.time()):
+                await self.push_outbox()
+
+    """
+    Completes the data files on disk with the checkpoints of the cogs (see `bot.dirty_paths`), so
+    the staged files contain all data. A checkpoint that can't complete the files right now is
+    retried a few times. Returns False when the files are still incomplete.
+    """
 
-        self.commit_to_git(commit_msg)
-        # Exits out of the BSF-bot-data directory back into BSF-bot
-        os.chdir(working_dir)
+    async def checkpoint_data(self) -> bool:
+        for attempt in range(self.CHECKPOINT_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(self.CHECKPOINT_RETRY_SECONDS)
+            if await asyncio.to_thread(self.bot.dirty_paths.checkpoint):
+                return True
+        return False
+
+    """
+    Shows how long every git command took and how often it failed
+    example: .git_metrics
+    """
+
+    @commands.has_role("bot-input")
+    @commands.command()
+    async def git_metrics(self, ctx: commands.Context) -> None:
+        await ctx.send(f"```{self.git.metrics()}```")
+
+    """
+    Shows the commits that still have to be pushed and when the push is retried
+    example: .push_status
+    """
+
+    @commands.has_role("bot-input")
+    @commands.command()
+    async def push_status(self, ctx: commands.Context) -> None:
+        await ctx.send(f"```{self.outbox.status(time.time())}```")
 
     """
     Gets the config file contents that contain the data folder path
@@ -77,41 +174,128 @@ class CommitDataCog(commands.Cog):
             return yaml.safe_load(config_file)
 
     """
-    Runs the console commands to add, commit and push to Git
+    Converts the dirty paths to paths relative to the data folder, which git expects. Paths outside
+    of the data folder are not part of the data repository and are left out.
     """
 
-    def commit_to_git(self, commit_msg: str) -> None:
-        # Ensure that the repo is up to date first
-        subprocess.run(["git", "fetch"])
-        subprocess.run(["git", "checkout", "origin/master"])
-        subprocess.run(["git", "add", "."])
-        subprocess.run(["git", "commit", "-m", commit_msg])
-        subprocess.run(["git", "push", "origin", "HEAD:master"])
+    def data_relative_paths(self, dirty_paths: Dict[str, int]) -> List[str]:
+        data_path: str = os.path.abspath(self.DATA_PATH)
+        return sorted(
+            os.path.relpath(path, data_path)
+            for path in dirty_paths
+            if os.path.commonpath([path, data_path]) == data_path and path != data_path
+        )
+
+    """
+    Runs the git commands to stage the changed paths and commit them locally, and records the commit
+    in the outbox. Deleted files are removed from the index. The pipeline stops at the first command
+    that fails. Returns True when the changes were committed, or when the changed files turned out
+    to match the last commit.
+    """
+
+    async def commit_to_git(self, commit_msg: str, paths: List[str]) -> bool:
+        existing: List[bool] = await asyncio.to_thread(
+            lambda: [os.path.lexists(os.path.join(self.DATA_PATH, path)) for path in paths]
+        )
+        added: bytes = "\0".join(path for path, exists in zip(paths, existing) if exists).encode()
+        removed: bytes = "\0".join(
+            path for path, exists in zip(paths, existing) if not exists
+        ).encode()
+        pathspec: Tuple[str, ...] = ("--pathspec-from-file=-", "--pathspec-file-nul")
+
+        steps: List[Tuple[Tuple[str, ...], bytes]] = []
+        if added:
+            steps.append((("add", "--all", *pathspec), added))
+        if removed:
+            steps.append((("rm", "--cached", "--quiet", "--ignore-unmatch", *pathspec), removed))
+        for step, stdin_data in steps:
+            if not await self.run_git_step(*step, stdin_data=stdin_data):
+                return False
+
+        # `git diff --quiet` exits with 0 when nothing is staged, for example when a file was
+        # changed back, and with 1 when there is something to commit.
+        staged = await self.git.run("diff", "--cached", "--quiet")
+        if staged.returncode == 0:
+            print("The changed data files match the last commit, nothing to commit")
+            return True
+        if not await self.run_git_step("commit", "-m", commit_msg):
+            return False
+        self.outbox.add(commit_msg, time.time())
+        await self.save_outbox()
+        return True
+
+    """
+    Pushes the pending commits, after rebasing them onto the remote. A failed push is retried with
+    backoff. Returns True when the commits were pushed.
+    """
+
+    async def push_outbox(self) -> bool:
+        result: GitStepResult = await self.git.push_rebased("origin", "master")
+        if result.ok:
+            print(f"Pushed {len(self.outbox.commits)} data commits")
+            self.outbox.record_success(time.time())
+        else:
+            reason = "timed out" if result.timed_out else f"failed ({result.returncode})"
+            delay = self.outbox.record_failure(
+                f"git {result.step} {reason}: {result.output[-500:]}", time.time()
+            )
+            print(f"git {result.step} {reason}, retrying the push in {delay:.0f}s: {result.output}")
+        await self.save_outbox()
+        if not result.ok:
+            self.schedule_push_retry()
+        return result.ok
+
+    """
+    Starts the task that pushes the pending commits when their retry is due
+    """
+
+    def schedule_push_retry(self) -> None:
+        # The retry task schedules the next retry itself when the push fails again.
+        if self.push_retry and self.push_retry is not asyncio.current_task():
+            self.push_retry.cancel()
+        self.push_retry = asyncio.create_task(self.retry_push())
+
+    """
+    Waits until the retry of the push is due, and pushes the pending commits
+    """
+
+    async def retry_push(self) -> None:
+        next_attempt: float = self.outbox.next_attempt or time.time()
+        await asyncio.sleep(max(next_attempt - time.time(), 0))
+        async with self.commit_lock:
+            if self.outbox.is_due(time.time()):
+                await self.push_outbox()
+
+    """
+    Persists the outbox, so pending commits are pushed after a restart
+    """
+
+    async def save_outbox(self) -> None:
+        await asyncio.to_thread(self.outbox.save, self.outbox.dumps())
+
+    """
+    Runs a git command, and prints why it failed. Returns True when it succeeded.
+    """
+
+    async def run_git_step(self, *args: str, stdin_data: bytes = b"") -> bool:
+        result = await self.git.run(*args, stdin_data=stdin_data or None)
+        if not result.ok:
+            reason = "timed out" if result.timed_out else f"failed ({result.returncode})"
+            print(f"git {result.step} {reason} after {result.duration:.1f}s: {result.output}")
+        return result.ok
 
     """
     Checks if git is installed by checking the version
     """
 
     def is_git_installed(self) -> bool:
-        try:
-            subprocess.run(
-                ["git", "--version"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-            )
-        except subprocess.CalledProcessError as e:
+        # Looks git up on the PATH instead of running it, which would block the event loop.
+        if shutil.which("git") is None:
             # TODO: Do we use logging instead?
-            if e.returncode == 127:
-                print(
-                    "ERROR: Git isn't installed. Please install Git on the host or ensure the PATH"
-                    " variable has been set properly."
-                )
-            else:
-                print(f"ERROR: Unknown. Return code: {e.returncode}")
-                print(f"Standard output: {e.stdout}")
-                print(f"Standard error: {e.stderr}")
-
+            print(
+                "ERROR: Git isn't installed. Please install Git on the host or ensure the PATH"
+                " variable has been set properly."
+            )
             return False
         return True
 
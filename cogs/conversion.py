@@ -1,8 +1,9 @@
 import re
 
-import discord
 from discord.ext import commands
 
+from libs.message_router import RoutedMessage
+
 """
 Discord cog module for converting imperial units to metric.
 This can be loaded via an extension.
@@ -36,16 +37,27 @@ class ConversionCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot: commands.Bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    async def cog_load(self) -> None:
+        """
+        Registers the cog at the message router. Both units contain a number, so only messages with
+        a digit are routed to the cog.
+        """
+        self.bot.message_router.register(self.qualified_name, self.route_message, digits=True)
+
+    async def cog_unload(self) -> None:
+        """Removes the cog from the message router."""
+        self.bot.message_router.unregister(self.qualified_name)
+
+    async def route_message(self, routed_message: RoutedMessage) -> None:
         """
-        Listen to messages and converts height and weight values.
+        Converts the height and weight values of a routed message.
 
         Args:
-            message (discord.Message): The message sent by a user.
+            routed_message (RoutedMessage): The message sent by a user.
 
         """
 
+        message = routed_message.message
         if message.author == self.bot.user:
             return
 
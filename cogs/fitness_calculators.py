@@ -1,12 +1,32 @@
 import re
+from typing import Final, List
 
 from discord.ext import commands
 
+from libs.message_router import RoutedMessage
+
 
 class FitnessCalculators(commands.Cog):
+    # Define regular expressions for each data element
+    ACTIVITY_KEYWORDS: Final[List[str]] = ["cutting", "bulking", "maintaining"]
+    HEIGHT_REGEX = re.compile(r"(\d+(\.\d+)?)\s*cm")
+    WEIGHT_REGEX = re.compile(r"(\d+(\.\d+)?)\s*kg")
+    BF_REGEX = re.compile(r"(\d+(\.\d+)?)\s*bf")
+    GENDER_REGEX = re.compile(r"(male|female|gal|guy)")
+    AGE_REGEX = re.compile(r"(\d+)\s*(?:years?|yo)")
+    ACTIVITY_REGEX = re.compile("|".join(ACTIVITY_KEYWORDS), re.IGNORECASE)
+
     def __init__(self, bot):
         self.bot = bot
-        self.activity_keywords = ["cutting", "bulking", "maintaining"]
+        self.activity_keywords = FitnessCalculators.ACTIVITY_KEYWORDS
+
+    async def cog_load(self):
+        # Every calculation needs a height, weight or bodyfat number, so only messages with a digit
+        # are routed to the cog.
+        self.bot.message_router.register(self.qualified_name, self.route_message, digits=True)
+
+    async def cog_unload(self):
+        self.bot.message_router.unregister(self.qualified_name)
 
     @commands.command()
     async def calculators(self, ctx):
@@ -24,14 +44,14 @@ class FitnessCalculators(commands.Cog):
             )
         )
 
-    def extract_data(self, message_content):
-        # Define regular expressions for each data element
-        height_regex = re.compile(r"(\d+(\.\d+)?)\s*cm")
-        weight_regex = re.compile(r"(\d+(\.\d+)?)\s*kg")
-        bf_regex = re.compile(r"(\d+(\.\d+)?)\s*bf")
-        gender_regex = re.compile(r"(male|female|gal|guy)")
-        age_regex = re.compile(r"(\d+)\s*(?:years?|yo)")
-        activity_regex = re.compile("|".join(self.activity_keywords), re.IGNORECASE)
+    def extract_data(self, message_content, lowercase_content=None):
+        lowercase_content = lowercase_content or message_content.lower()
+        height_regex = FitnessCalculators.HEIGHT_REGEX
+        weight_regex = FitnessCalculators.WEIGHT_REGEX
+        bf_regex = FitnessCalculators.BF_REGEX
+        gender_regex = FitnessCalculators.GENDER_REGEX
+        age_regex = FitnessCalculators.AGE_REGEX
+        activity_regex = FitnessCalculators.ACTIVITY_REGEX
 
         # Initialize variables
         height, weight, bodyfat, gender, age, activity = None, None, None, None, None, None
@@ -46,25 +66,27 @@ class FitnessCalculators(commands.Cog):
         if bf_match := bf_regex.search(message_content):
             bodyfat = float(bf_match.group(1))
 
-        if gender_match := gender_regex.search(message_content.lower()):
+        if gender_match := gender_regex.search(lowercase_content):
             gender = gender_match.group()
 
-        if age_match := age_regex.search(message_content.lower()):
+        if age_match := age_regex.search(lowercase_content):
             age = int(age_match.group(1))
 
-        if activity_match := activity_regex.search(message_content.lower()):
+        if activity_match := activity_regex.search(lowercase_content):
             activity = activity_match.group()
 
         return height, weight, bodyfat, gender, age, activity
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    async def route_message(self, routed_message: RoutedMessage):
+        message = routed_message.message
         # Check if the message is from a bot or not in a direct message
         # if message.author.bot or not message.guild:
         #    return
 
         # Extract data from the message
-        height, weight, bodyfat, gender, age, activity = self.extract_data(message.content)
+        height, weight, bodyfat, gender, age, activity = self.extract_data(
+            routed_message.content, routed_message.lowercase_content
+        )
 
         # Check if two or more variables are filled
         filled_variables = [
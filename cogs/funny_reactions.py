@@ -1,8 +1,9 @@
 from typing import Dict, Final, List
 
-import discord
 from discord.ext import commands
 
+from libs.message_router import RoutedMessage
+
 
 class FunnyReactionsCog(commands.Cog):
     """
@@ -23,13 +24,20 @@ class FunnyReactionsCog(commands.Cog):
     async def on_ready(self) -> None:
         print("Module: FunnyReactions")
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    async def cog_load(self) -> None:
+        self.bot.message_router.register(
+            self.qualified_name, self.route_message, keywords=FunnyReactionsCog.BUZZWORDS
+        )
+
+    async def cog_unload(self) -> None:
+        self.bot.message_router.unregister(self.qualified_name)
+
+    async def route_message(self, routed_message: RoutedMessage) -> None:
         # TODO: Do we need to loop through all the different buzzwords if they all have the same
         # response?
-        lowercase_content = message.content.lower()
+        message = routed_message.message
         for word in FunnyReactionsCog.BUZZWORDS:
-            if word in lowercase_content:
+            if word in routed_message.keywords:
                 await message.add_reaction(FunnyReactionsCog.REACTIONS["eddieleftarm"])
                 await message.add_reaction(FunnyReactionsCog.REACTIONS["eddieshitting"])
                 await message.add_reaction(FunnyReactionsCog.REACTIONS["eddierightarm"])
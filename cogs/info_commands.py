@@ -58,6 +58,10 @@ class InfoCommandsCog(commands.Cog):
         info_filename: str = f"{self.INFO_COMMANDS_PATH}/{command.lower()}.txt"
         with open(info_filename, "w") as file:
             file.write(message)
+        # The data commit only stages files that are marked as changed.
+        self.bot.dirty_paths.mark(info_filename)
+        # Other cogs that depend on the info commands, like the SourceCog, update their caches.
+        self.bot.dispatch("info_commands_changed")
         await ctx.send(f"Command '{command.lower()}' learned and saved.")
 
     @commands.command()
@@ -116,6 +120,8 @@ class InfoCommandsCog(commands.Cog):
         info_file_found: bool = os.path.isfile(info_filename)
         if info_file_found:
             os.remove(info_filename)
+            self.bot.dirty_paths.mark(info_filename)
+            self.bot.dispatch("info_commands_changed")
             await ctx.send(f"Command '{command}' removed.")
         else:
             await ctx.send(f"No command named '{command}' found.")
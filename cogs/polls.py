@@ -6,6 +6,8 @@ from discord.ext.commands.bot import Bot
 from discord.ext.commands.cog import Cog
 from discord.message import Message
 
+from libs.message_router import RoutedMessage
+
 """
 Module which contains a Cog for a bot to automatically create polls.
 """
@@ -50,14 +52,26 @@ class PollsCog(Cog):
         """
         print(f"Module: {self.__class__.__name__}")
 
-    @Cog.listener()
-    async def on_message(self, message: Message) -> None:
+    async def cog_load(self) -> None:
+        """
+        Registers the cog at the message router for messages in the polls channel.
+        """
+        self.BOT.message_router.register(
+            self.qualified_name, self.route_message, channels=[self.CONFIG["polls_channel_id"]]
+        )
+
+    async def cog_unload(self) -> None:
+        """
+        Removes the cog from the message router.
+        """
+        self.BOT.message_router.unregister(self.qualified_name)
+
+    async def route_message(self, routed_message: RoutedMessage) -> None:
         """
-        Listener that gets called when a discord message is send in any channel that the bot is
-        present in.
+        Handler that gets called by the message router when a discord message is send in the polls
+        channel.
         """
-        if message.channel.id == self.CONFIG["polls_channel_id"]:
-            await PollsCog.create_poll(message)
+        await PollsCog.create_poll(routed_message.message)
 
     @classmethod
     async def create_poll(cls, message: Message) -> None:
@@ -1,12 +1,16 @@
-import os
+import asyncio
 from pathlib import Path
-from typing import Any, Dict, Final, List
+from typing import Any, Dict, Final, List, Optional, Tuple
 
 import discord
-import spacy
 import yaml
 from discord.ext import commands
 
+from libs.document_index import DocumentVectorIndex
+from libs.message_router import RoutedMessage
+from libs.nlp_pool import NlpProcessPool
+from libs.query_cache import SourceQueryCache, normalize_query
+
 """
 Discord cog module that can be loaded through an extension. It can be used to prove/disprove claims
 made by other users.
@@ -25,10 +29,11 @@ class SourceCog(commands.Cog):
 
         <user1> Carbs are unhealthy
         <user2> key phrase (Replies to `Carbs are unhealthy`)
-        <bot> Content of the most relevant file (carbs.txt) Carbohydrates are not bad...
+        <bot> Most relevant part of carbs: Carbohydrates are not bad...
 
 
-    If relevant information about a topic cannot be found then the cog won't reply with a message.
+    The reply is the paragraph of the info command files that is most similar to the message. If
+    no paragraph is similar enough, then the cog won't reply with a message.
     """
 
     CONFIG_PATH: Final[str] = Path("./config.yaml")
@@ -41,99 +46,175 @@ class SourceCog(commands.Cog):
     Key phrase to listen to for sourcing information.
     """
 
-    PREPROCESS_PIPELINE: Final[spacy.lang.en.English] = spacy.load("en_core_web_md")
+    PIPELINE_MODEL: Final[str] = "en_core_web_md"
     """
-    Medium English NLP pipeline that preprocesses text documents. 
-    It can also extract a similarity metric.
+    Medium English NLP pipeline that preprocesses text documents. Its document vectors are used to
+    compute the similarity of texts.
     """
 
     def __init__(self, bot: commands.bot):
         self.BOT: Final[commands.bot] = bot
         self.CONFIG: Final[Dict[str, Any]] = self.get_config()
         self.INFO_COMMANDS_PATH: Final[str] = self.CONFIG["info-commands-path"]
+        # The document vectors of the info files are kept in a persisted matrix, so a search
+        # doesn't run the pipeline over every file.
+        self.document_index: Final[DocumentVectorIndex] = DocumentVectorIndex(
+            self.CONFIG.get("source-index-path", "./source_index.npz")
+        )
+        # The pipeline runs in worker processes, so a burst of searches doesn't block the bot. The
+        # pool is shared with the cogs of later reloads, which don't load the model again.
+        self.nlp_pool: Final[NlpProcessPool] = NlpProcessPool.shared(
+            SourceCog.PIPELINE_MODEL,
+            self.CONFIG.get("source-nlp-workers", 2),
+            self.CONFIG.get("source-nlp-timeout-seconds", 10),
+        )
+        self.nlp_pool_start: Optional[asyncio.Task] = None
+        # The best keyword matches are re-ranked by their vectors, and weak matches are not posted.
+        self.SEARCH_CANDIDATES: Final[int] = self.CONFIG.get("source-bm25-candidates", 20)
+        self.MIN_SIMILARITY: Final[float] = self.CONFIG.get("source-min-similarity", 0.5)
+        # The same claims are sourced over and over, so recent search results are kept in memory.
+        self.query_cache: Final[SourceQueryCache] = SourceQueryCache(
+            self.CONFIG.get("source-query-cache-size", 256)
+        )
+
+    async def cog_load(self) -> None:
+        """
+        Loads the document index and registers the cog at the message router for replies that
+        contain the key phrase. The worker processes load their pipelines in the background, so
+        the bot doesn't wait for the model to connect.
+        """
+        await asyncio.to_thread(self.document_index.load)
+        if not self.nlp_pool.worker_load_seconds:
+            self.nlp_pool_start = asyncio.create_task(self.nlp_pool.start())
+        self.BOT.message_router.register(
+            self.qualified_name,
+            self.route_message,
+            keywords=[SourceCog.KEY_PHRASE],
+            reply=True,
+        )
+
+    async def cog_unload(self) -> None:
+        """
+        Removes the cog from the message router. The worker processes keep running for the next
+        load of the cog.
+        """
+        self.BOT.message_router.unregister(self.qualified_name)
 
     @commands.Cog.listener()
-    async def on_message(self, message: discord.Message) -> None:
+    async def on_info_commands_changed(self) -> None:
+        """
+        Invalidates the cached search results when an info command is learned or removed.
         """
-        Listen for messages and replies to the 'source that' message with a relevant source.
+        self.query_cache.invalidate()
+
+    async def route_message(self, routed_message: RoutedMessage) -> None:
+        """
+        Replies to the 'source that' message with a relevant source.
         The user replies to a message with "source that" when they want a source.
 
         Args:
-            message (discord.Message): The message sent by a user.
+            routed_message (RoutedMessage): The message sent by a user.
 
         """
+        message: discord.Message = routed_message.message
         if message.author == self.BOT.user:
             return
 
-        lowercase_content = message.content.lower()
-        # Checks if the key phrase is stated
-        if SourceCog.KEY_PHRASE in lowercase_content:
+        # The router only routes replies that contain the key phrase
+        if SourceCog.KEY_PHRASE in routed_message.keywords:
             replied_message: bool = message.reference.resolved if message.reference else None
             # Checks if the user actually replied to a message
             if replied_message:
-                relevant_file = await self.search_files(replied_message.content)
-                # Has a relevant file been found?
-                if relevant_file:
-                    file_content = await self.get_file_content(relevant_file)
-                    # Can the file content be extracted?
-                    if file_content:
-                        channel = message.channel
-                        await channel.send(
-                            f"Content of the most relevant file ({relevant_file}):\n"
-                            f"{file_content}\n"
-                        )
-
-    async def search_files(self, input_text: str):
-        """
-        Searches through all of the info command files to determine the most relevant file via the
-        max similarity score. It assumes that the relevant info text file is in .txt format.
-
-        Args:
-            input_text (str): Input text from the replied message.
+                relevant_paragraph = await self.search_files(replied_message.content)
+                # Has a relevant paragraph been found?
+                if relevant_paragraph:
+                    relevant_file, paragraph = relevant_paragraph
+                    channel = message.channel
+                    await channel.send(
+                        f"Most relevant part of {relevant_file}:\n"
+                        f"{paragraph}\n"
+                    )
+
+    async def search_files(self, input_text: str) -> Optional[Tuple[str, str]]:
         """
-        relevant_info_file: Path | None = None
-        max_similarity = 0.0
-
-        # Preprocess the input text to later compute similarity
-        preprocessed_input_doc: spacy.tokens.doc.Doc = SourceCog.PREPROCESS_PIPELINE(input_text)
-
-        # Iterate through each file in the directory
-        saved_files: List[str] = os.listdir(self.INFO_COMMANDS_PATH)
-        txt_files: List[str] = sorted([file[:-4] for file in saved_files if file.endswith(".txt")])
-        for info_file_name in txt_files:
-            info_file_path: str = os.path.join(self.INFO_COMMANDS_PATH, f"{info_file_name}.txt")
+        Determines the most relevant paragraph of the info command files. It assumes that the info
+        text files are in .txt format.
 
-            # Read the contents of the info command file
-            with open(info_file_path, "r") as info_file:
-                content = info_file.read()
+        Results are cached by the normalized input text, until the info commands change. Otherwise
+        the document index is brought up to date first, which only runs the pipeline on files that
+        changed since they were indexed. The paragraphs that share the most (rare) words with the
+        input are then re-ranked by their similarity. No paragraph is found when none is similar
+        enough, or when the pipeline doesn't answer in time.
 
-                # Preprocess the file content
-                content_doc: spacy.tokens.doc.Doc = SourceCog.PREPROCESS_PIPELINE(content)
+        Args:
+            input_text (str): Input text from the replied message.
 
-                # Calculate the similarity between input text and file content
-                similarity: float = preprocessed_input_doc.similarity(content_doc)
+        Returns:
+            The name of the info command and the text of the paragraph, or None.
+        """
+        query: str = normalize_query(input_text)
+        best_matches = self.query_cache.get(query)
+        if best_matches is None:
+            best_matches = await self.search_index(input_text, query)
+        if not best_matches:
+            return None
+        relevant_info_file_path, paragraph, _ = best_matches[0]
+        return Path(relevant_info_file_path).stem, paragraph
 
-                # Update the most relevant file if similarity is higher
-                if similarity > max_similarity:
-                    max_similarity = similarity
-                    relevant_info_file = info_file_name
+    async def search_index(self, input_text: str, query: str) -> List[Tuple[str, str, float]]:
+        """
+        Searches the document index for the paragraphs that are most relevant to the input text,
+        and caches the result.
 
-        return relevant_info_file
+        Args:
+            input_text (str): Input text from the replied message.
+            query (str): The normalized input text, which the result is cached by.
 
-    async def get_file_content(self, file_name: str):
+        Returns:
+            The file path, text and similarity of the best paragraphs. It is empty when the
+            pipeline doesn't answer in time.
+        """
+        generation: int = self.query_cache.generation
+        try:
+            refreshed = await asyncio.to_thread(
+                self.document_index.refresh, self.INFO_COMMANDS_PATH, self.nlp_pool.vectorize
+            )
+        except TimeoutError as error:
+            # The index that is already loaded is searched, and the next search refreshes it.
+            print(f"The source index refresh timed out: {error}")
+            refreshed = False
+        if refreshed:
+            # The files were changed without .learn or .rm, for example by a data update.
+            self.query_cache.invalidate()
+            generation = self.query_cache.generation
+            await asyncio.to_thread(self.document_index.save)
+
+        # Preprocess the input text to compute its similarity with the paragraphs
+        try:
+            input_vector = await self.nlp_pool.vector(input_text)
+        except asyncio.TimeoutError:
+            print(f"The source search timed out. {self.nlp_pool.metrics()}")
+            return []
+        best_matches = self.document_index.search(
+            input_text,
+            input_vector,
+            candidates=self.SEARCH_CANDIDATES,
+            min_similarity=self.MIN_SIMILARITY,
+        )
+        self.query_cache.put(query, best_matches, generation)
+        return best_matches
+
+    @commands.has_role("bot-input")
+    @commands.command()
+    async def source_metrics(self, ctx: commands.Context) -> None:
         """
-        Extracts file content through a specified file name.
+        Displays the queue depth and latency of the NLP worker processes, and the hit rate of the
+        query cache.
 
         Args:
-            file_name (str): Name of the file to extract content from.
+            ctx (commands.Context): The command context.
         """
-        file_path: str = os.path.join(self.INFO_COMMANDS_PATH, file_name)
-        try:
-            with open(f"{file_path}.txt", "r") as file:
-                content = file.read()
-                return content
-        except FileNotFoundError:
-            return None
+        await ctx.send(f"```{self.nlp_pool.metrics()}\n{self.query_cache.metrics()}```")
 
     def get_config(self) -> Dict[str, Any]:
         """
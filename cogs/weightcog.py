@@ -1,15 +1,30 @@
-import csv
-import os
-from datetime import date, datetime, timedelta
+import asyncio
+import io
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, Final, List
+from typing import Any, Dict, Final, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
+import aiohttp
 import discord
-import matplotlib.pyplot as plt
 import numpy as np
 import yaml
 from discord.ext import commands
 
+from libs import weight_stats
+from libs.async_weight_repository import AsyncWeightRepository
+from libs.plot_cache import PlotCache
+from libs.weigh_in_reminders import (REMINDER_FREQUENCIES, ReminderSchedule,
+                                     ReminderSubscription)
+from libs.weight_aggregates import UserSummary, WeightAggregateIndex
+from libs.weight_export import ZipExportWriter
+from libs.weight_import import WeightImportParser
+from libs.weight_plot import WeightPlotRenderer
+from libs.weight_repository import (DATE_FORMAT, WeightEntry,
+                                    create_weight_repository)
+from libs.weight_series_cache import WeightSeries, WeightSeriesCache
+from libs.weight_trend import WeightTrend, WeightTrendStore
+
 """
 Discord cog module that stores, reads and removes weight data.
 This cog can be loaded using an extension.
@@ -53,10 +68,142 @@ class WeightCog(commands.Cog):
     The bot config path
     """
 
+    IMPORT_CHUNK_SIZE: Final[int] = 64 * 1024
+    """
+    The number of bytes of an imported file that are downloaded and validated at once.
+    """
+
+    UPLOAD_LIMIT_MARGIN: Final[int] = 64 * 1024
+    """
+    The number of bytes an export archive stays below the upload limit, for the rest of the upload
+    request.
+    """
+
+    REBUILD_CHECKPOINT_USERS: Final[int] = 50
+    """
+    The number of users after which a rebuild of the server statistics saves its progress.
+    """
+
+    REMINDER_MENTIONS_PER_MESSAGE: Final[int] = 50
+    """
+    The number of users that are mentioned in a single reminder message.
+    """
+
+    REMINDER_SEND_INTERVAL: Final[float] = 1.0
+    """
+    The seconds between two reminder messages, which keeps a burst of reminders below the message
+    rate limit of Discord.
+    """
+
+    REMINDER_MAX_SLEEP: Final[float] = 60.0
+    """
+    The longest the reminder scheduler sleeps at once, so it notices changes of the system clock.
+    """
+
     def __init__(self, bot: commands.Bot):
         self.BOT = bot
         self.CONFIG: Final[Dict[str, Any]] = self.get_config()
         self.WEIGHT_COG_DATA_PATH: Final[str] = self.CONFIG["weight-cog-data-path"]
+        # Parsed weight histories are kept in memory as compact arrays, within a memory budget.
+        self.series_cache: Final[WeightSeriesCache] = WeightSeriesCache(
+            int(self.CONFIG.get("weight-series-cache-mb", 16) * 1024 * 1024)
+        )
+        # All file and database I/O runs in a thread pool, outside of the event loop.
+        self.weight_repository: Final[AsyncWeightRepository] = AsyncWeightRepository(
+            create_weight_repository(self.CONFIG),
+            self.CONFIG.get("weight-io-workers", 4),
+            self.series_cache,
+            # Weight logs of many users are written together, see `DURABILITY_MODES`.
+            self.CONFIG.get("weight-write-durability", "sync"),
+            self.CONFIG.get("weight-write-flush-ms", 200) / 1000,
+            self.CONFIG.get("weight-write-flush-entries", 256),
+            # Written files are marked for the next data commit, see `CommitDataCog`.
+            self.mark_user_dirty,
+        )
+        # Plots are rendered in worker processes, because drawing long histories is CPU bound.
+        self.plot_renderer: Final[WeightPlotRenderer] = WeightPlotRenderer(
+            self.CONFIG.get("weight-plot-workers", 2)
+        )
+        # Long histories are downsampled to about as many points as the plot has room for.
+        self.PLOT_MAX_POINTS: Final[int] = self.CONFIG.get("weight-plot-max-points", 500)
+        # Rendered plots are served from memory when the weight data didn't change.
+        self.plot_cache: Final[PlotCache] = PlotCache(
+            self.CONFIG.get("weight-plot-cache-size", 128)
+        )
+        # The server statistics are updated with every change, instead of scanning all users.
+        self.aggregate_index: Final[WeightAggregateIndex] = WeightAggregateIndex(
+            self.CONFIG.get("weight-aggregates-path", "./BSF-bot-data/weight_aggregates.json")
+        )
+        self.aggregate_save_lock: Final[asyncio.Lock] = asyncio.Lock()
+        # The server statistics are saved as a checkpoint at most once per interval, instead of
+        # with every change. After a crash they are rebuilt from the weight data.
+        self.AGGREGATES_CHECKPOINT_INTERVAL: Final[float] = self.CONFIG.get(
+            "weight-aggregates-checkpoint-seconds", 60
+        )
+        self.aggregates_checkpoint: Optional[asyncio.Task] = None
+        # The weight trend of every user is updated with every new entry, for the goal projection.
+        self.trend_store: Final[WeightTrendStore] = WeightTrendStore(
+            self.CONFIG.get("weight-trends-path", "./BSF-bot-data/weight_trends/")
+        )
+        self.aggregate_rebuild: Optional[asyncio.Task] = None
+        # The trends and the server statistics are derived from the weight data, so they are
+        # updated once per user after a burst of logs, instead of with every log. The new entries
+        # of every user wait in `derived_pending` until then.
+        self.DERIVED_UPDATE_DELAY: Final[float] = self.CONFIG.get(
+            "weight-derived-update-seconds", 5
+        )
+        self.derived_pending: Final[Dict[str, List[WeightEntry]]] = {}
+        self.derived_update: Optional[asyncio.Task] = None
+        self.derived_lock: Final[asyncio.Lock] = asyncio.Lock()
+        # A single task sends the reminders of all users, in the order of a heap of due times.
+        self.reminder_schedule: Final[ReminderSchedule] = ReminderSchedule(
+            self.CONFIG.get("weight-reminders-path", "./BSF-bot-data/weigh_in_reminders.json")
+        )
+        self.reminder_save_lock: Final[asyncio.Lock] = asyncio.Lock()
+        self.reminder_wakeup: Final[asyncio.Event] = asyncio.Event()
+        self.reminder_scheduler: Optional[asyncio.Task] = None
+
+    async def cog_load(self) -> None:
+        """
+        Loads the server statistics when the cog is loaded. They are rebuilt in the background when
+        they don't exist yet, when the bot crashed since their last checkpoint, or when a rebuild
+        was interrupted.
+        """
+        loaded = await self.weight_repository.run(self.aggregate_index.load)
+        if not loaded or not self.aggregate_index.saved_at_shutdown:
+            self.aggregate_index.start_rebuild(await self.weight_repository.user_ids())
+        # The saved index is marked as a checkpoint right away, so a crash is noticed on the next
+        # start.
+        await self.save_aggregates()
+        if self.aggregate_index.rebuild_pending:
+            self.aggregate_rebuild = asyncio.create_task(self.rebuild_aggregates())
+
+        await self.weight_repository.run(self.reminder_schedule.load, datetime.now(timezone.utc))
+        self.reminder_scheduler = asyncio.create_task(self.send_reminders())
+        # The database of the SQLite storage is completed from its write-ahead log right before
+        # the data commit.
+        self.BOT.dirty_paths.checkpoints[self.__class__.__name__] = (
+            self.weight_repository.repository.checkpoint
+        )
+
+    async def cog_unload(self) -> None:
+        """Waits for pending writes and closes the weight repository when the cog is unloaded."""
+
+        self.BOT.dirty_paths.checkpoints.pop(self.__class__.__name__, None)
+        if self.aggregate_rebuild:
+            self.aggregate_rebuild.cancel()
+        if self.reminder_scheduler:
+            self.reminder_scheduler.cancel()
+        if self.aggregates_checkpoint:
+            self.aggregates_checkpoint.cancel()
+        if self.derived_update:
+            self.derived_update.cancel()
+        await self.weight_repository.flush()
+        await self.update_derived()
+        await self.save_aggregates(saved_at_shutdown=True)
+        self.plot_renderer.close()
+        # Waiting for the I/O threads to finish would block the event loop.
+        await asyncio.to_thread(self.weight_repository.close)
 
     @commands.Cog.listener()
     async def on_ready(self) -> None:
@@ -97,35 +244,15 @@ class WeightCog(commands.Cog):
 
         user = user or ctx.author
         user_id: str = str(user.id)
-        if not date:
-            date = str(ctx.message.created_at.date())
-
-        file_path = os.path.join(self.data_folder, f"{user_id}_goal_weight.csv")
-
-        # Read existing entries
-        entries = []
-        header_row = ["Date", "Weight"]
-
-        if os.path.exists(file_path):
-            with open(file_path, "r") as csvfile:
-                csv_reader = csv.reader(csvfile)
-                header_row = next(csv_reader)  # Read the header row
-                for row in csv_reader:
-                    entries.append(row)
-
-        # Add the new entry
-        entries.append([date, weight])
-
-        # Sort entries by date
-        entries.sort(key=lambda entry: entry[0])
+        entry_date = await self.parse_date(ctx, date)
+        if not entry_date:
+            return
 
-        # Rewrite the CSV file with sorted entries
-        with open(file_path, "w", newline="") as csvfile:
-            csv_writer = csv.writer(csvfile)
-            csv_writer.writerow(header_row)  # Write header row
-            csv_writer.writerows(entries)
+        await self.weight_repository.upsert_goal(user_id, entry_date, weight)
 
-        await ctx.send(f"Weight goal recorded for {date} ({user.display_name}): {weight} kg.")
+        await ctx.send(
+            f"Weight goal recorded for {entry_date} ({user.display_name}): {weight} kg."
+        )
 
     @commands.command()
     async def weight(
@@ -160,161 +287,360 @@ class WeightCog(commands.Cog):
             await ctx.send("Not a valid weight.")
         user = user or ctx.author
         user_id = str(user.id)
-        if not date:
-            date = str(ctx.message.created_at.date())
+        entry_date = await self.parse_date(ctx, date)
+        if not entry_date:
+            return
+
+        await self.weight_repository.upsert(user_id, entry_date, weight)
+        self.schedule_derived_update(user_id, [(entry_date, weight)])
+        await ctx.send(f"Weight recorded for {entry_date} ({user.display_name}): {weight} kg.")
+
+    @commands.command()
+    async def import_weights(self, ctx: commands.Context, user: discord.Member = None) -> None:
+        """
+        Imports the weights of an attached csv or json file, for example an export of another app.
+        Weights of dates that already have a weight are replaced.
 
-        file_path = os.path.join(self.data_folder, f"{user_id}.csv")
+        The csv file has a date,weight row per line. The json file has a list of
+        {"date": ..., "weight": ...} objects. Dates use the format YYYY-MM-DD.
 
-        # Read existing entries
-        entries = []
-        header_row = ["Date", "Weight"]
+        Usage:
+        .import_weights [user] (with the file attached)
+        Example:
+        .import_weights @user
+
+        Args:
+            user: (discord.Member, optional): The user for whom the weights are imported
+                  (default: yourself).
+        """
+        if user and (user != ctx.author) and not has_bot_input_perms(ctx):
+            await ctx.send(
+                "You don't have the bot-input role and are therefore not allowed to specify other"
+                " users."
+            )
+            return
+
+        if not ctx.message.attachments:
+            await ctx.send("Attach a csv or json file with the weights to import.")
+            return
+
+        attachment = ctx.message.attachments[0]
+        file_format = Path(attachment.filename).suffix.lower().lstrip(".")
+        if file_format not in ("csv", "json"):
+            await ctx.send("Only csv and json files can be imported.")
+            return
 
-        if os.path.exists(file_path):
-            with open(file_path, "r") as csvfile:
-                csv_reader = csv.reader(csvfile)
-                header_row = next(csv_reader)  # Read the header row
-                for row in csv_reader:
-                    entries.append(row)
+        max_megabytes = self.CONFIG.get("weight-import-max-mb", 5)
+        if attachment.size > max_megabytes * 1024 * 1024:
+            await ctx.send(
+                f"The file is too large. Files up to {max_megabytes} MB can be imported."
+            )
+            return
+
+        user = user or ctx.author
+        user_id = str(user.id)
+
+        # The file is validated chunk by chunk while it is downloaded. Validating runs in the I/O
+        # threads, so a large file doesn't block the event loop.
+        parser = WeightImportParser(file_format)
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(attachment.url, raise_for_status=True) as response:
+                    async for chunk in response.content.iter_chunked(WeightCog.IMPORT_CHUNK_SIZE):
+                        await self.weight_repository.run(parser.feed, chunk)
+        except aiohttp.ClientError:
+            await ctx.send("The file could not be downloaded. Please try again.")
+            return
+        entries = await self.weight_repository.run(parser.finish)
+
+        summary = ""
+        if parser.invalid_rows:
+            summary = f"\nSkipped {parser.invalid_rows} invalid rows:\n" + "\n".join(
+                f"- {error}" for error in parser.errors
+            )
+            if parser.invalid_rows > len(parser.errors):
+                summary += "\n- ..."
 
-        # Add the new entry
-        entries.append([date, weight])
+        if not entries:
+            await ctx.send(f"No valid weights found in {attachment.filename}.{summary}")
+            return
 
-        # Sort entries by date
-        entries.sort(key=lambda entry: entry[0])
+        existing_series = await self.weight_repository.read_series(user_id)
+        existing_ordinals = set(existing_series.ordinals.tolist())
+        replaced = sum(entry_date.toordinal() in existing_ordinals for entry_date, _ in entries)
 
-        # Rewrite the CSV file with sorted entries
-        with open(file_path, "w", newline="") as csvfile:
-            csv_writer = csv.writer(csvfile)
-            csv_writer.writerow(header_row)  # Write header row
-            csv_writer.writerows(entries)
-        await ctx.send(f"Weight recorded for {date} ({user.display_name}): {weight} kg.")
+        # All entries are merged into the existing weights with a single write.
+        await self.weight_repository.upsert_many(user_id, entries)
+        self.schedule_derived_update(user_id, entries)
+        await ctx.send(
+            f"Imported {len(entries)} weights for {user.display_name}"
+            f" ({len(entries) - replaced} new, {replaced} replaced).{summary}"
+        )
 
-    def date_inside_period(self, period: str, date: date) -> bool:
+    def schedule_derived_update(self, user_id: str, entries: List[WeightEntry]) -> None:
         """
-        Check if a date is inside of a period.
+        Schedules the update of the trend and the server statistics after new weight entries of a
+        user. The updates of all users with new entries run together after the derived update
+        delay.
+
         Args:
-            period (str): The period being referred to
-            date (str): The date that may or may not be inside a period
+            user_id (str): The Discord ID of the user
+            entries (List[WeightEntry]): The added (date, weight) entries.
+        """
+        self.derived_pending.setdefault(user_id, []).extend(entries)
+        if self.derived_update is None:
+            self.derived_update = asyncio.create_task(self.update_derived_later())
+
+    async def update_derived_later(self) -> None:
+        """Waits for the derived update delay and updates the trends and the server statistics."""
+        await asyncio.sleep(self.DERIVED_UPDATE_DELAY)
+        # New entries during the update schedule the next update.
+        self.derived_update = None
+        await self.update_derived()
+
+    async def update_derived(self, user_id: Optional[str] = None) -> None:
+        """
+        Updates the trends and the server statistics of the users with new weight entries. It is
+        also called before they are read, so they are never behind the weight data.
 
-        Returns True if date is inside a period.
+        Args:
+            user_id (str | None): The Discord ID of the only user to update, or None to update all
+                                  users with new entries.
         """
-        today = datetime.now().date()
+        async with self.derived_lock:
+            user_ids = list(self.derived_pending) if user_id is None else [user_id]
+            pending = {
+                pending_user_id: self.derived_pending.pop(pending_user_id)
+                for pending_user_id in user_ids
+                if pending_user_id in self.derived_pending
+            }
+            # The users are updated concurrently, as many at a time as there are I/O threads.
+            await asyncio.gather(
+                *(
+                    self.update_derived_user(pending_user_id, entries)
+                    for pending_user_id, entries in pending.items()
+                )
+            )
 
-        if period == "all":
-            return True
+    async def update_derived_user(self, user_id: str, entries: List[WeightEntry]) -> None:
+        """
+        Updates the trend and the server statistics of a user after new weight entries.
 
+        Args:
+            user_id (str): The Discord ID of the user
+            entries (List[WeightEntry]): The added (date, weight) entries.
+        """
         try:
-            days = WeightCog.MOVING_AVG_PERIODS[period]
-            time_delta: timedelta = timedelta(days)
-        except ValueError:
-            raise ValueError(f"Invalid period: {period}.")
+            await self.update_aggregates(user_id)
+            await self.update_trend(user_id, entries)
+        except Exception as error:
+            # A trend that doesn't match the weight data is recomputed when it is needed.
+            print(f"Failed to update the trend and stats of {user_id}: {error}")
+
+    async def discard_derived(self, user_id: str) -> None:
+        """
+        Drops the pending trend update of a user whose trend is deleted, because it is recomputed
+        from the whole series anyway.
 
-        start = today - time_delta
-        return start <= date <= today
+        Args:
+            user_id (str): The Discord ID of the user
+        """
+        async with self.derived_lock:
+            self.derived_pending.pop(user_id, None)
 
-    # TODO: Put this function into WeightRepository
-    def read_weight_data(self, user_weight_path: str, period):
+    async def update_aggregates(self, user_id: str) -> None:
         """
-        Reads all of the user weight data relevant inside a period
+        Updates the server statistics after the weight data of a user changed.
 
         Args:
-            user_weight_path (str): The path to the user's weight data
-            period (): The period to read the weight data inside of (e.g. week, month, year)
+            user_id (str): The Discord ID of the user
+        """
+        series = await self.weight_repository.read_series(user_id)
+        self.aggregate_index.update(
+            user_id, UserSummary.from_arrays(series.ordinals, series.weights)
+        )
+        self.schedule_aggregates_checkpoint()
 
-        Returns the user's weight data from a period
+    async def update_trend(self, user_id: str, entries: List[WeightEntry]) -> None:
         """
-        user_weight_data_from_period = []
-        with open(user_weight_path, "r") as csvfile:
-            csv_reader: csv.reader = csv.reader(csvfile)
-            # Skips the header row
-            next(csv_reader)
-            for row in csv_reader:
-                if row == WeightCog.HEADER_ROW:
-                    continue
-                date: datetime = datetime.strptime(row[0], "%Y-%m-%d").date()
-                if self.date_inside_period(period, date):
-                    weight = float(row[1])
-                    user_weight_data_from_period.append((date, weight))
-
-        return user_weight_data_from_period
-
-    def create_weight_plot(
-        self, dates, weights, user, moving_averages=None, moving_avg_dates=None
-    ) -> None:
+        Adds new weight entries to the stored trend of a user. Entries after the last entry are
+        added in O(1), other entries mark the trend to be recomputed when it is needed.
+
+        Args:
+            user_id (str): The Discord ID of the user
+            entries (List[WeightEntry]): The added (date, weight) entries.
+        """
+        async with self.weight_repository.user_lock(user_id):
+            trend = await self.weight_repository.run(self.trend_store.load, user_id)
+            trend = trend or WeightTrend()
+            for entry_date, weight in sorted(entries):
+                trend.add(entry_date.toordinal(), weight)
+            await self.weight_repository.run(self.trend_store.save, user_id, trend)
+            self.mark_trend_dirty(user_id)
+
+    async def current_trend(self, user_id: str) -> WeightTrend:
         """
-        Creates a time series line plot of how weight increases over time with the option to create
-        a moving average line.
+        Returns the trend of a user. A trend that is stale, or doesn't match the weight data
+        anymore, is recomputed from the series and stored again.
 
         Args:
-            dates (): The dates extracted from the weight entries.
-            weights (): The weights extracted from the weight entries.
-            user (): The details of the user (we use the display name).
-            moving_averages (| None): The moving averages for each weight data point.
-            moving_avg_dates (| None): The moving average dates for each weight entry.
-        """
-
-        has_moving_averages: bool = moving_averages is not None and moving_avg_dates is not None
-
-        plt.figure(figsize=(10, 6))
-        # Weight data
-        plt.plot(dates, weights, marker="o", color="red", linewidth=3)
-        if has_moving_averages:
-            # Moving average data
-            plt.plot(
-                moving_avg_dates,
-                moving_averages,
-                color="white",
-                linewidth=3,
-                label="Moving Average",
-            )
+            user_id (str): The Discord ID of the user
+        """
+        await self.update_derived(user_id)
+        async with self.weight_repository.user_lock(user_id):
+            series = await self.weight_repository.read_series(user_id)
+            trend = await self.weight_repository.run(self.trend_store.load, user_id)
+            if trend is None or not trend.matches(series.ordinals):
+                trend = await self.weight_repository.run(
+                    WeightTrend.from_arrays, series.ordinals, series.weights
+                )
+                await self.weight_repository.run(self.trend_store.save, user_id, trend)
+                self.mark_trend_dirty(user_id)
+            return trend
 
-        plt.xlabel("Date", fontsize=16, color="white")
-        plt.ylabel("Weight (kg)", fontsize=16, color="white")
-        plt.title(f"Weight Record for {user.display_name}", fontsize=18, color="white")
-        plt.xticks(rotation=45, fontsize=12, color="white")
-        plt.yticks(fontsize=12, color="white")
-        plt.gca().spines["top"].set_visible(False)
-        plt.gca().spines["right"].set_visible(False)
-        plt.gca().spines["bottom"].set_color("white")
-        plt.gca().spines["left"].set_color("white")
-        plt.gca().tick_params(axis="x", colors="white")
-        plt.gca().tick_params(axis="y", colors="white")
-        plt.tight_layout()
-
-        if has_moving_averages:
-            plt.legend()
-
-    # TODO: Put this code into a WeightRepository
-    def remove_weight_record(
-        self, user_weights_path: str, temp_user_weights_path: str, date: date
-    ) -> bool:
-        """
-        Removes the weight record for a user on a specific date
+    async def goal_label(self, user_id: str, goal_weight: float) -> str:
+        """
+        Describes the goal of a user and the projected date of reaching it.
 
         Args:
-            user_weights_path (str): Path for a user's weight data
-            temp_user_weights_path (str): Temporary path for a user's weight data. We then use this
-                                          to replace the original weight path
-            date (date): The date of the weight record to remove
+            user_id (str): The Discord ID of the user
+            goal_weight (float): The goal weight of the user.
+        """
+        projected_date = (await self.current_trend(user_id)).projected_date(goal_weight)
+        if projected_date is None:
+            return f"Goal: {goal_weight} kg (not moving towards it)"
+        return f"Goal: {goal_weight} kg (projected {projected_date})"
 
-        Returns the boolean result of whether the weight record was found and removed.
+    def schedule_aggregates_checkpoint(self) -> None:
+        """
+        Saves the server statistics after the checkpoint interval, unless a checkpoint is already
+        scheduled.
         """
+        if self.aggregates_checkpoint is None:
+            self.aggregates_checkpoint = asyncio.create_task(self.checkpoint_aggregates())
 
-        removed = False
-        with open(user_weights_path, "r") as input_file, open(
-            temp_user_weights_path, "w", newline=""
-        ) as output_file:
-            csv_reader: csv.reader = csv.reader(input_file)
-            csv_writer: csv.writer = csv.writer(output_file)
+    async def checkpoint_aggregates(self) -> None:
+        """Waits for the checkpoint interval and saves the server statistics."""
+        await asyncio.sleep(self.AGGREGATES_CHECKPOINT_INTERVAL)
+        # Changes during the save schedule the next checkpoint.
+        self.aggregates_checkpoint = None
+        await self.save_aggregates()
 
-            for row in csv_reader:
-                if row[0] == date:
-                    removed = True
-                else:
-                    csv_writer.writerow(row)
+    async def save_aggregates(self, saved_at_shutdown: bool = False) -> None:
+        """
+        Saves the server statistics. The index is serialized while holding the lock, so the last
+        save always writes the latest state.
 
-        os.replace(temp_user_weights_path, user_weights_path)
-        return removed
+        Args:
+            saved_at_shutdown (bool): True for the last save before the cog is unloaded.
+        """
+        async with self.aggregate_save_lock:
+            index_json = self.aggregate_index.dumps(saved_at_shutdown)
+            await self.weight_repository.run(self.aggregate_index.save, index_json)
+        self.BOT.dirty_paths.mark(self.aggregate_index.PATH)
+
+    def mark_user_dirty(self, user_id: str) -> None:
+        """
+        Marks the weight data files of a user as changed, for the next data commit.
+
+        Args:
+            user_id (str): The Discord ID of the user
+        """
+        self.BOT.dirty_paths.mark(*self.weight_repository.repository.data_paths(user_id))
+
+    def mark_trend_dirty(self, user_id: str) -> None:
+        """
+        Marks the trend file of a user as changed, for the next data commit. The path it had
+        before it was moved into its shard is marked too, so the move is committed.
+
+        Args:
+            user_id (str): The Discord ID of the user
+        """
+        trend_path = self.trend_store.path(user_id)
+        self.BOT.dirty_paths.mark(trend_path, self.trend_store.paths.legacy_path(trend_path))
+
+    async def rebuild_aggregates(self) -> None:
+        """
+        Rebuilds the server statistics from the weight data of all users, one user at a time. The
+        progress is saved regularly, so the rebuild resumes after a restart.
+        """
+        pending = self.aggregate_index.rebuild_pending
+        while pending:
+            user_id = pending[-1]
+            # The lock keeps a concurrent change of the user from being overwritten by a summary
+            # of the data before the change.
+            async with self.weight_repository.user_lock(user_id):
+                series = await self.weight_repository.read_series(user_id, cache=False)
+                self.aggregate_index.update(
+                    user_id, UserSummary.from_arrays(series.ordinals, series.weights)
+                )
+            pending.pop()
+            if len(pending) % WeightCog.REBUILD_CHECKPOINT_USERS == 0:
+                await self.save_aggregates()
+
+        self.aggregate_index.rebuild_pending = None
+        await self.save_aggregates()
+        print(f"Rebuilt the server weight stats of {len(self.aggregate_index.summaries)} users")
+
+    async def parse_date(self, ctx: commands.Context, date_text: Optional[str]) -> Optional[date]:
+        """
+        Parses the date argument of a command. The date of the message is used when no date is
+        given. An error is send to the user when the date is invalid.
+
+        Args:
+            ctx (commands.Context): The context of the command.
+            date_text (str | None): The date in the YYYY-MM-DD format.
+
+        Returns the parsed date, or None when it is invalid.
+        """
+        if not date_text:
+            return ctx.message.created_at.date()
+
+        try:
+            return datetime.strptime(date_text, DATE_FORMAT).date()
+        except ValueError:
+            await ctx.send("Not a valid date. Use the format YYYY-MM-DD.")
+            return None
+
+    def period_bounds(self, period: str) -> Tuple[Optional[date], date]:
+        """
+        Computes the first and last date of a period, relative to today.
+
+        Args:
+            period (str): The period being referred to
+
+        Returns the (start, end) dates of the period. The start is None for the period "all".
+        """
+        today = datetime.now().date()
+
+        if period == "all":
+            return None, today
+
+        try:
+            days = WeightCog.MOVING_AVG_PERIODS[period]
+        except KeyError:
+            raise ValueError(f"Invalid period: {period}.")
+
+        return today - timedelta(days), today
+
+    async def read_weight_data(
+        self, user_id: str, period: str, lookback_days: int = 0
+    ) -> WeightSeries:
+        """
+        Reads all of the user weight data relevant inside a period
+
+        Args:
+            user_id (str): The Discord ID of the user
+            period (str): The period to read the weight data inside of (e.g. week, month, year)
+            lookback_days (int): Extra days to read before the start of the period, for example
+                                 for the window of a moving average.
+
+        Returns the user's weight data from a period
+        """
+        start, end = self.period_bounds(period)
+        if start:
+            start -= timedelta(lookback_days)
+        return await self.weight_repository.read_series(user_id, start, end)
 
     def get_config(self) -> Dict[str, Any]:
         """
@@ -367,101 +693,131 @@ class WeightCog(commands.Cog):
             )
             return
 
+        # Calculate the moving average period (in days) based on the provided argument
+        moving_avg_period: Optional[int] = None
+        if moving_average != "no_avg":
+            is_average = moving_average.endswith("_avg")
+            if not is_average or moving_average not in WeightCog.MOVING_AVG_PERIODS:
+                await ctx.send(
+                    "Invalid moving average. Use 'weekly_avg', 'monthly_avg', or 'yearly_avg'."
+                )
+                return
+            moving_avg_period = WeightCog.MOVING_AVG_PERIODS[moving_average]
+
+        if period != "all" and period not in WeightCog.MOVING_AVG_PERIODS:
+            await ctx.send(
+                f"Invalid period. Use 'all' or one of: {', '.join(WeightCog.MOVING_AVG_PERIODS)}."
+            )
+            return
+
         user = user or ctx.author
         user_id = str(user.id)
-        file_path = os.path.join(self.data_folder, f"{user_id}.csv")
 
-        if not os.path.exists(file_path):
+        if not await self.weight_repository.has_data(user_id):
             await ctx.send("No weight data found for this user.")
             return
 
-        # Read weight data from CSV, skipping the header row
-        data = []
-        with open(file_path, "r") as csvfile:
-            csv_reader = csv.reader(csvfile)
-            next(csv_reader)  # Skip the header row
-            for row in csv_reader:
-                date = datetime.strptime(row[0], "%Y-%m-%d").date()
-                if self.date_inside_period(period, date):
-                    weight = float(row[1])
-                    data.append((date, weight))
-
-        # Separate dates and weights
-        dates, weights = zip(*data)
-
-        # Calculate the moving average based on the provided argument
-        if moving_average != "no_avg":
-            if moving_average == "weekly_avg":
-                moving_avg_period = 7  # 7 days for weekly average
-            elif moving_average == "monthly_avg":
-                moving_avg_period = 30  # Approximately 30 days for monthly average
-            elif moving_average == "yearly_avg":
-                moving_avg_period = 365  # 365 days for yearly average
-            else:
-                await ctx.send(
-                    "Invalid moving average. Use 'weekly_avg', 'monthly_avg', or 'yearly_avg'."
-                )
+        goals = await self.weight_repository.read_goals(user_id)
+        goal_weight = goals[-1][1] if goals else None
+
+        # The key contains everything the plot is rendered from. The period moves with the current
+        # date, and the display name is part of the title.
+        plot_key = (
+            user_id,
+            await self.weight_repository.data_version(user_id),
+            period,
+            moving_average,
+            datetime.now().date(),
+            user.display_name,
+            goal_weight,
+        )
+        png = self.plot_cache.get(plot_key)
+        if png is None:
+            # The history before the period is read as well, so the moving average covers the
+            # whole period.
+            data = await self.read_weight_data(user_id, period, moving_avg_period or 0)
+            period_start, _ = self.period_bounds(period)
+            if not len(data) or (period_start and data.ordinals[-1] < period_start.toordinal()):
+                await ctx.send("No weight data found for this period.")
                 return
 
-            moving_averages = []
-            for i in range(len(weights) - moving_avg_period + 1):
-                avg = np.mean(weights[i : i + moving_avg_period])
-                moving_averages.append(avg)
-
-            # Adjust dates to match the moving average data length
-            moving_avg_dates = dates[moving_avg_period - 1 :]
-
-            # Create and save the plot with moving average
-            plt.figure(figsize=(10, 6))
-            plt.plot(
-                dates, weights, marker="o", color="red", linewidth=3, label="Weight"
-            )  # Weight data
-            plt.plot(
-                moving_avg_dates,
-                moving_averages,
-                color="white",
-                linewidth=3,
-                label="Moving Average",
-            )  # Moving average
-            plt.xlabel("Date", fontsize=16, color="white")
-            plt.ylabel("Weight (kg)", fontsize=16, color="white")
-            plt.title(f"Weight Record for {user.display_name}", fontsize=18, color="white")
-            plt.xticks(rotation=45, fontsize=12, color="white")
-            plt.yticks(fontsize=12, color="white")
-            plt.gca().spines["top"].set_visible(False)
-            plt.gca().spines["right"].set_visible(False)
-            plt.gca().spines["bottom"].set_color("white")
-            plt.gca().spines["left"].set_color("white")
-            plt.gca().tick_params(axis="x", colors="white")
-            plt.gca().tick_params(axis="y", colors="white")
-            plt.legend()
-            plt.tight_layout()
-
-        else:
-            # Create and save the plot without moving average
-            plt.figure(figsize=(10, 6))
-            plt.plot(dates, weights, marker="o", color="red", linewidth=3)  # Weight data
-            plt.xlabel("Date", fontsize=16, color="white")
-            plt.ylabel("Weight (kg)", fontsize=16, color="white")
-            plt.title(f"Weight Record for {user.display_name}", fontsize=18, color="white")
-            plt.xticks(rotation=45, fontsize=12, color="white")
-            plt.yticks(fontsize=12, color="white")
-            plt.gca().spines["top"].set_visible(False)
-            plt.gca().spines["right"].set_visible(False)
-            plt.gca().spines["bottom"].set_color("white")
-            plt.gca().spines["left"].set_color("white")
-            plt.gca().tick_params(axis="x", colors="white")
-            plt.gca().tick_params(axis="y", colors="white")
-            plt.tight_layout()
-
-        plot_path = os.path.join(self.data_folder, f"{user_id}_plot.png")
-        plt.savefig(plot_path, transparent=True)
-        plt.close()
+            goal_label = await self.goal_label(user_id, goal_weight) if goal_weight else None
+            png = await self.render_stats_plot(
+                user, data, period_start, moving_avg_period, goal_weight, goal_label
+            )
+            self.plot_cache.put(plot_key, png)
 
         # Send the plot as an embedded image
         plot_embed = discord.Embed(title=f"Weight Record for {user.display_name}")
         plot_embed.set_image(url="attachment://plot.png")
-        await ctx.send(file=discord.File(plot_path, "plot.png"))
+        await ctx.send(file=discord.File(io.BytesIO(png), "plot.png"))
+
+    async def render_stats_plot(
+        self,
+        user: discord.Member,
+        data: WeightSeries,
+        period_start: Optional[date],
+        moving_avg_period: Optional[int],
+        goal_weight: Optional[float] = None,
+        goal_label: Optional[str] = None,
+    ) -> bytes:
+        """
+        Renders the weight plot of the stats command.
+
+        Args:
+            user (discord.Member): The user of the weight data.
+            data (WeightSeries): The weight entries, including the history that is needed for the
+                                 moving average.
+            period_start (date | None): The first date to plot, or None to plot all entries.
+            moving_avg_period (int | None): The moving average period in days, or None for no
+                                            average.
+            goal_weight (float | None): The goal weight to draw, or None for no goal.
+            goal_label (str | None): The legend label of the goal.
+
+        Returns the plot as a PNG image.
+        """
+        ordinals, weights = data.ordinals, data.weights
+        first_ordinal = period_start.toordinal() if period_start else ordinals[0]
+        in_period = ordinals >= first_ordinal
+        plot_ordinals, plot_weights = self.downsample(ordinals[in_period], weights[in_period])
+
+        moving_avg_dates, moving_averages = None, None
+        if moving_avg_period:
+            avg_ordinals, averages = weight_stats.moving_average(
+                ordinals, weights, moving_avg_period
+            )
+            avg_in_period = avg_ordinals >= first_ordinal
+            avg_ordinals, averages = self.downsample(
+                avg_ordinals[avg_in_period], averages[avg_in_period]
+            )
+            moving_avg_dates = weight_stats.ordinals_to_dates(avg_ordinals).tolist()
+            moving_averages = averages.tolist()
+
+        return await self.plot_renderer.render(
+            f"Weight Record for {user.display_name}",
+            weight_stats.ordinals_to_dates(plot_ordinals).tolist(),
+            plot_weights.tolist(),
+            moving_avg_dates,
+            moving_averages,
+            goal_weight,
+            goal_label,
+        )
+
+    def downsample(self, ordinals: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Downsamples a line to the number of points of the `weight-plot-max-points` setting with
+        Largest-Triangle-Three-Buckets, which keeps the minima and maxima of the line.
+
+        Args:
+            ordinals (np.ndarray): The day ordinals of the line.
+            values (np.ndarray): The values of the line.
+
+        Returns the day ordinals and the values of the downsampled line.
+        """
+        indices = weight_stats.largest_triangle_three_buckets(
+            ordinals, values, self.PLOT_MAX_POINTS
+        )
+        return ordinals[indices], values[indices]
 
     @commands.command()
     async def remove_weight(self, ctx, date: str, user: discord.Member = None) -> None:
@@ -488,35 +844,25 @@ class WeightCog(commands.Cog):
 
         user = user or ctx.author
         user_id: str = str(user.id)
-        user_weights_path: str = os.path.join(self.WEIGHT_COG_DATA_PATH, f"{user_id}.csv")
-        temp_user_weights_path: str = os.path.join(self.WEIGHT_COG_DATA_PATH, f"{user_id}_temp.csv")
 
-        if not os.path.exists(user_weights_path):
+        if not await self.weight_repository.has_data(user_id):
             await ctx.send("No weight data found for this user.")
             return
 
-        removed = False
-        with open(user_weights_path, "r") as input_file, open(
-            temp_user_weights_path, "w", newline=""
-        ) as output_file:
-            csv_reader = csv.reader(input_file)
-            csv_writer = csv.writer(output_file)
-
-            # Write header row
-            # csv_writer.writerow(["Date", "Weight"])
-
-            for row in csv_reader:
-                if row[0] == date:
-                    await ctx.send(f"Weight record for {row[0]} ({row[1]} kg) removed.")
-                    removed = True
-                else:
-                    csv_writer.writerow(row)
-
-        os.replace(temp_user_weights_path, user_weights_path)
-        if not removed:
+        entry_date = await self.parse_date(ctx, date)
+        if not entry_date:
+            return
+
+        removed_weight = await self.weight_repository.remove(user_id, entry_date)
+        await self.discard_derived(user_id)
+        await self.update_aggregates(user_id)
+        # The trend can't take out an entry, so it is recomputed when it is needed again.
+        await self.weight_repository.run(self.trend_store.delete, user_id)
+        self.mark_trend_dirty(user_id)
+        if removed_weight is None:
             await ctx.send(f"No weight record found for the date {date}.")
         else:
-            await ctx.send(f"Weight record for {date} removed.")
+            await ctx.send(f"Weight record for {entry_date} ({removed_weight} kg) removed.")
 
     @commands.command()
     async def export(self, ctx: commands.Context, user: discord.Member = None) -> None:
@@ -542,9 +888,8 @@ class WeightCog(commands.Cog):
 
         user = user or ctx.author
         user_id = str(user.id)
-        file_path = os.path.join(self.data_folder, f"{user_id}.csv")
 
-        if not os.path.exists(file_path):
+        if not await self.weight_repository.has_data(user_id):
             await ctx.send("No weight data found for this user.")
             return
 
@@ -554,11 +899,63 @@ class WeightCog(commands.Cog):
             return
 
         # Send the CSV file as an attachment
-        with open(file_path, "rb") as csv_file:
-            await ctx.send(
-                f"Weight data for {user.display_name}",
-                file=discord.File(csv_file, filename=f"{user.display_name}_weight_data.csv"),
-            )
+        csv_data = io.BytesIO(await self.weight_repository.export_csv(user_id))
+        await ctx.send(
+            f"Weight data for {user.display_name}",
+            file=discord.File(csv_data, filename=f"{user.display_name}_weight_data.csv"),
+        )
+
+    @commands.command()
+    async def export_all(self, ctx: commands.Context) -> None:
+        """
+        Export the weight data of all users as zip archives with a CSV file per user. The archives
+        are split to stay under the upload limit of the server.
+
+        Usage:
+        .export_all
+        """
+        if not ctx.author.guild_permissions.administrator:
+            await ctx.send("You don't have the necessary permissions to export other users' data.")
+            return
+
+        user_ids = await self.weight_repository.user_ids()
+        if not user_ids:
+            await ctx.send("No weight data found.")
+            return
+
+        # The users are added one by one, and every archive is sent and closed as soon as it is
+        # full. Only one user's CSV and one archive are held at a time, however many users there
+        # are.
+        writer = ZipExportWriter(ctx.guild.filesize_limit - WeightCog.UPLOAD_LIMIT_MARGIN)
+        archive_count = 0
+
+        async def send_archive(archive) -> None:
+            nonlocal archive_count
+            archive_count += 1
+            with archive:
+                await ctx.send(
+                    f"Weight data archive {archive_count}",
+                    file=discord.File(archive, filename=f"weight_data_{archive_count}.zip"),
+                )
+
+        exported_users = 0
+        for user_id in user_ids:
+            try:
+                csv_data = await self.weight_repository.export_csv(user_id)
+            except FileNotFoundError:
+                # The user deleted their data during the export.
+                continue
+            exported_users += 1
+            archive = await self.weight_repository.run(writer.add, f"{user_id}.csv", csv_data)
+            if archive:
+                await send_archive(archive)
+
+        archive = await self.weight_repository.run(writer.finish)
+        if archive:
+            await send_archive(archive)
+        await ctx.send(
+            f"Exported the weight data of {exported_users} users in {archive_count} archives."
+        )
 
     @commands.command()
     async def delete_all_user_data(
@@ -584,10 +981,9 @@ class WeightCog(commands.Cog):
 
         user = user or ctx.author
         user_id = str(user.id)
-        file_path = os.path.join(self.data_folder, f"{user_id}.csv")
 
-        # if the file/data for user does not exist
-        if not os.path.exists(file_path):
+        # if the data for user does not exist
+        if not await self.weight_repository.has_data(user_id):
             await ctx.send("No weight data found for this user.")
             return
         else:
@@ -606,7 +1002,13 @@ class WeightCog(commands.Cog):
 
             option, _ = await self.BOT.wait_for("reaction_add", check=option_check, timeout=30)
             if option.emoji == "✅":
-                os.remove(file_path)
+                await self.weight_repository.delete_user(user_id)
+                await self.discard_derived(user_id)
+                await self.update_aggregates(user_id)
+                await self.weight_repository.run(self.trend_store.delete, user_id)
+                self.mark_trend_dirty(user_id)
+                if self.reminder_schedule.unsubscribe(user_id):
+                    await self.save_reminders()
                 embed = discord.Embed(
                     title="All logs have been deleted",
                     timestamp=datetime.utcnow(),
@@ -623,6 +1025,199 @@ class WeightCog(commands.Cog):
                 await ctx.send(embed=embed)
                 return
 
+    @commands.command()
+    async def server_stats(self, ctx: commands.Context) -> None:
+        """
+        Displays the weight statistics of all users of the server.
+
+        Usage:
+        .server_stats
+        """
+        await self.update_derived()
+        report = self.aggregate_index.report(datetime.now().date())
+        await ctx.send(f"**Server weight stats**\n{report}")
+
+    @commands.command()
+    async def rebuild_server_stats(self, ctx: commands.Context) -> None:
+        """
+        Rebuilds the server weight statistics from the weight data of all users, for example after
+        the data has been changed outside of the bot.
+
+        Usage:
+        .rebuild_server_stats
+        """
+        if not has_bot_input_perms(ctx):
+            await ctx.send("You don't have the bot-input role and are therefore not allowed to"
+                           " rebuild the server stats.")
+            return
+
+        if self.aggregate_rebuild and not self.aggregate_rebuild.done():
+            await ctx.send("The server stats are already being rebuilt.")
+            return
+
+        self.aggregate_index.start_rebuild(await self.weight_repository.user_ids())
+        self.aggregate_rebuild = asyncio.create_task(self.rebuild_aggregates())
+        await ctx.send(
+            f"Rebuilding the server stats of {len(self.aggregate_index.rebuild_pending)} users."
+        )
+
+    @commands.command()
+    async def weigh_in_reminder(
+        self, ctx: commands.Context, frequency: str, local_time: str, user_timezone: str = "UTC"
+    ) -> None:
+        """
+        Subscribes to a daily or weekly reminder to log your weight, in this channel. Weekly
+        reminders are sent on the weekday of the subscription. The reminder is skipped on days you
+        already logged your weight.
+
+        Usage:
+          .weigh_in_reminder <daily|weekly> <HH:MM> <timezone>
+        Example:
+          .weigh_in_reminder daily 07:30 Europe/Amsterdam
+
+        Args:
+            frequency (str): "daily" or "weekly".
+            local_time (str): The time of the reminder in your timezone.
+            user_timezone (str): Your IANA timezone. Defaults to UTC.
+        """
+        if frequency not in REMINDER_FREQUENCIES:
+            await ctx.send(f"Invalid frequency. Use one of: {', '.join(REMINDER_FREQUENCIES)}")
+            return
+        try:
+            reminder_time = datetime.strptime(local_time, "%H:%M").time()
+        except ValueError:
+            await ctx.send("Invalid time format. Use HH:MM.")
+            return
+        try:
+            now = datetime.now(timezone.utc)
+            subscription = ReminderSubscription(
+                ctx.channel.id,
+                frequency,
+                reminder_time,
+                user_timezone,
+                now.astimezone(ZoneInfo(user_timezone)).weekday(),
+            )
+        except (ValueError, ZoneInfoNotFoundError):
+            await ctx.send("Unknown timezone. Use a name like Europe/Amsterdam.")
+            return
+
+        self.reminder_schedule.subscribe(str(ctx.author.id), subscription, now)
+        self.reminder_wakeup.set()
+        await self.save_reminders()
+        next_due = self.reminder_schedule.due_times[str(ctx.author.id)]
+        await ctx.send(
+            f"Weigh-in reminder set ({frequency}). The next reminder is on"
+            f" {next_due.strftime('%A %Y-%m-%d %H:%M')} ({user_timezone})."
+        )
+
+    @commands.command()
+    async def stop_weigh_in_reminder(self, ctx: commands.Context) -> None:
+        """
+        Cancels your weigh-in reminder.
+
+        Usage:
+          .stop_weigh_in_reminder
+        """
+        if not self.reminder_schedule.unsubscribe(str(ctx.author.id)):
+            await ctx.send("You don't have a weigh-in reminder.")
+            return
+
+        await self.save_reminders()
+        await ctx.send("Weigh-in reminder cancelled.")
+
+    async def save_reminders(self) -> None:
+        """Persists the reminder subscriptions of all users."""
+        async with self.reminder_save_lock:
+            subscriptions_json = self.reminder_schedule.dumps()
+            await self.weight_repository.run(self.reminder_schedule.save, subscriptions_json)
+        self.BOT.dirty_paths.mark(self.reminder_schedule.PATH)
+
+    async def send_reminders(self) -> None:
+        """
+        Sends the weigh-in reminders when they are due. The task sleeps until the first reminder of
+        the heap is due, or until a subscription changes.
+        """
+        while True:
+            # An error must not end the task, or no reminder is ever sent again.
+            try:
+                self.reminder_wakeup.clear()
+                next_due = self.reminder_schedule.next_due()
+                timeout = self.REMINDER_MAX_SLEEP
+                if next_due is not None:
+                    seconds_left = (next_due - datetime.now(timezone.utc)).total_seconds()
+                    timeout = min(timeout, max(seconds_left, 0))
+                try:
+                    await asyncio.wait_for(self.reminder_wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+                due_reminders = self.reminder_schedule.pop_due(datetime.now(timezone.utc))
+                if due_reminders:
+                    await self.send_reminder_batches(due_reminders)
+            except Exception as error:
+                print(f"Failed to send the weigh-in reminders: {error}")
+
+    async def send_reminder_batches(self, due_reminders: List[Tuple[str, datetime]]) -> None:
+        """
+        Sends the reminders that are due at the same time. The users of a channel are mentioned
+        together in as few messages as possible, and the messages are sent at a steady pace.
+
+        Users who already logged their weight on the local date of their reminder are skipped.
+        This is a lookup in the server statistics, which know the last date every user logged.
+
+        Args:
+            due_reminders (List[Tuple[str, datetime]]): The user IDs with their due time.
+        """
+        await self.update_derived()
+        channel_users: Dict[int, List[str]] = {}
+        for user_id, due in due_reminders:
+            summary = self.aggregate_index.summaries.get(user_id)
+            if summary is not None and summary.last_logged >= due.date():
+                continue
+            # The user may have stopped the reminders while the derived data was updated.
+            subscription = self.reminder_schedule.subscriptions.get(user_id)
+            if subscription is None:
+                continue
+            channel_users.setdefault(subscription.channel_id, []).append(user_id)
+
+        for channel_id, user_ids in channel_users.items():
+            channel = self.BOT.get_channel(channel_id)
+            if channel is None:
+                print(f"Skipped weigh-in reminders of {len(user_ids)} users: unknown channel")
+                continue
+            for start in range(0, len(user_ids), self.REMINDER_MENTIONS_PER_MESSAGE):
+                mentions = " ".join(
+                    f"<@{user_id}>"
+                    for user_id in user_ids[start : start + self.REMINDER_MENTIONS_PER_MESSAGE]
+                )
+                try:
+                    await channel.send(
+                        f"Time to weigh in! Log your weight with `.weight`. {mentions}"
+                    )
+                except discord.HTTPException as error:
+                    print(f"Failed to send weigh-in reminders: {error}")
+                await asyncio.sleep(self.REMINDER_SEND_INTERVAL)
+
+    @commands.command()
+    async def weight_metrics(self, ctx: commands.Context) -> None:
+        """
+        Displays the performance metrics of the weight cog.
+
+        Usage:
+        .weight_metrics
+        """
+        if not has_bot_input_perms(ctx):
+            await ctx.send("You don't have the bot-input role and are therefore not allowed to view"
+                           " the weight metrics.")
+            return
+
+        write_buffer = self.weight_repository.write_buffer
+        write_buffer_metrics = f"\n{write_buffer.metrics()}" if write_buffer else ""
+        await ctx.send(
+            f"```{self.plot_renderer.metrics()}\n{self.plot_cache.metrics()}\n"
+            f"{self.series_cache.metrics()}{write_buffer_metrics}```"
+        )
+
 
 async def setup(bot: commands.Bot):
     """Setup function to add the ConversionCog cog to the bot.
@@ -0,0 +1,442 @@
+import asyncio
+import contextlib
+import functools
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import (Any, Callable, Dict, Final, Hashable, Iterable, List,
+                    Optional, Set, Tuple)
+
+from libs.weight_repository import WeightEntry, WeightRepository
+from libs.weight_series_cache import WeightSeries, WeightSeriesCache
+from libs.weight_write_buffer import DURABILITY_MODES, WeightWriteBuffer
+
+"""
+This module contains the asyncio interface of the weight repositories, which keeps the blocking
+file and database I/O off of the event loop.
+"""
+
+
+class AsyncWeightRepository:
+    """
+    Runs the calls of a `WeightRepository` in a thread pool, so slow disks don't block the event
+    loop (and with it the gateway heartbeat and every other cog).
+
+    Mutations of the same user are serialized with an asyncio lock per user. A read-modify-write of
+    one command can therefore never overwrite the result of another command for the same user.
+    Reads don't take the lock, because the repositories replace their files atomically.
+
+    With a series cache, the weight history of a user is parsed once and kept in memory. Changes
+    made through this class are written through to the cache, and changes made somewhere else are
+    noticed through the data version of the user.
+
+    Outside of the "sync" durability mode, weight logs go to a write-behind buffer. The buffer is
+    written as a group when the flush interval has passed since its first log, or when enough logs
+    came in since the last flush. A group takes the locks of all of its users and is written with a
+    single `WeightRepository.upsert_groups`, so a burst of logs costs one thread hop and one wait
+    for the disk (one SQLite transaction, or one sync pass over the files), instead of a thread hop
+    and a synced write per log. Reads merge the buffered logs of a user into the stored data, so
+    the buffer is invisible to the callers.
+    """
+
+    def __init__(
+        self,
+        repository: WeightRepository,
+        max_workers: int = 4,
+        series_cache: Optional[WeightSeriesCache] = None,
+        durability: str = "sync",
+        flush_interval: float = 0.2,
+        flush_entries: int = 256,
+        on_change: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        """
+        Initializes an AsyncWeightRepository instance.
+
+        :param repository: The repository that does the blocking I/O.
+        :param max_workers: The number of I/O threads.
+        :param series_cache: The cache of the weight series, or None to read every series from the
+                             repository.
+        :param durability: One of `DURABILITY_MODES`.
+        :param flush_interval: The seconds a buffered log waits at most before it is written.
+        :param flush_entries: The number of logs since the last flush at which the buffer is
+                              written right away.
+        :param on_change: Called with the user ID after the data of a user has been written. It
+                          is called in the I/O threads.
+        """
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}")
+        self.repository: Final[WeightRepository] = repository
+        self.series_cache: Final[Optional[WeightSeriesCache]] = series_cache
+        self.MAX_WORKERS: Final[int] = max_workers
+        self.DURABILITY: Final[str] = durability
+        self.FLUSH_INTERVAL: Final[float] = flush_interval
+        self.FLUSH_ENTRIES: Final[int] = flush_entries
+        self.on_change: Final[Optional[Callable[[str], None]]] = on_change
+        self.write_buffer: Final[Optional[WeightWriteBuffer]] = (
+            None if durability == "sync" else WeightWriteBuffer()
+        )
+        self.group_written: Optional[asyncio.Future] = None
+        """
+        Resolves when the group of the currently buffered logs has been written.
+        """
+        self.flush_timer: Optional[asyncio.TimerHandle] = None
+        self.logs_since_flush: int = 0
+        self.flush_tasks: Final[Set[asyncio.Task]] = set()
+        self.executor: Final[ThreadPoolExecutor] = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="weight-io"
+        )
+        # A lock only lives as long as a coroutine holds or waits for it, so the locks of inactive
+        # users don't pile up.
+        self.user_locks: Final[weakref.WeakValueDictionary] = weakref.WeakValueDictionary()
+
+    def user_lock(self, user_id: str) -> asyncio.Lock:
+        """
+        Returns the lock that serializes the mutations of a user.
+
+        :param user_id: The Discord user ID.
+        """
+        lock = self.user_locks.get(user_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self.user_locks[user_id] = lock
+        return lock
+
+    async def run(self, function: Callable, *args) -> Any:
+        """
+        Runs a blocking function in the I/O thread pool.
+
+        :param function: The blocking function.
+        :param args: The arguments of the function.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(function, *args))
+
+    async def mutate(
+        self,
+        user_id: str,
+        function: Callable,
+        *args,
+        update_series: Optional[Callable[[WeightSeries, Hashable], WeightSeries]] = None,
+    ) -> Any:
+        """
+        Runs a blocking function that changes the data of a user, while holding the user's lock.
+
+        :param user_id: The Discord user ID.
+        :param function: The blocking function.
+        :param args: The arguments of the function.
+        :param update_series: Applies the change to a cached series and the new data version, or
+                              None when the change doesn't affect the weight series.
+        """
+        async with self.user_lock(user_id):
+
+            def mutate_versioned() -> Tuple[Any, Hashable, Hashable]:
+                version_before = self.repository.data_version(user_id)
+                result = function(*args)
+                if self.on_change is not None:
+                    self.on_change(user_id)
+                return result, version_before, self.repository.data_version(user_id)
+
+            result, version_before, version_after = await self.run(mutate_versioned)
+            if self.series_cache is None or update_series is None:
+                return result
+            self.series_cache.write_through(
+                user_id,
+                version_before,
+                version_after,
+                lambda series: update_series(series, version_after),
+            )
+            return result
+
+    async def upsert(self, user_id: str, entry_date: date, weight: float) -> None:
+        """
+        See `WeightRepository.upsert`. Outside of the "sync" durability mode the entry is buffered,
+        and in the "async" mode this returns before the entry is written.
+        """
+        if self.write_buffer is not None:
+            self.write_buffer.add(user_id, entry_date, weight)
+            group_written = self.schedule_flush()
+            if self.DURABILITY == "group":
+                await asyncio.shield(group_written)
+                # The entries may have been taken by an earlier flush of the user, which holds the
+                # lock until they are written.
+                async with self.user_lock(user_id):
+                    pass
+            return
+
+        await self.mutate(
+            user_id,
+            self.repository.upsert,
+            user_id,
+            entry_date,
+            weight,
+            update_series=lambda series, version: series.upsert([(entry_date, weight)], version),
+        )
+
+    async def upsert_many(self, user_id: str, entries: Iterable[WeightEntry]) -> None:
+        """See `WeightRepository.upsert_many`."""
+        entries = list(entries)
+        await self.flush_user(user_id)
+        await self.mutate(
+            user_id,
+            self.repository.upsert_many,
+            user_id,
+            entries,
+            update_series=lambda series, version: series.upsert(entries, version),
+        )
+
+    async def remove(self, user_id: str, entry_date: date) -> Optional[float]:
+        """See `WeightRepository.remove`."""
+        await self.flush_user(user_id)
+        return await self.mutate(
+            user_id,
+            self.repository.remove,
+            user_id,
+            entry_date,
+            update_series=lambda series, version: series.remove(entry_date, version),
+        )
+
+    async def delete_user(self, user_id: str) -> bool:
+        """See `WeightRepository.delete_user`."""
+        await self.flush_user(user_id)
+        deleted = await self.mutate(user_id, self.repository.delete_user, user_id)
+        if self.series_cache is not None:
+            self.series_cache.invalidate(user_id)
+        return deleted
+
+    def schedule_flush(self) -> asyncio.Future:
+        """
+        Schedules the write of the buffered logs, after the flush interval or right away when the
+        buffer is full.
+
+        :returns: The future that resolves when the group of the buffered logs has been written.
+        """
+        group_written = self.group_written
+        if group_written is None:
+            loop = asyncio.get_running_loop()
+            group_written = self.group_written = loop.create_future()
+            self.flush_timer = loop.call_later(self.FLUSH_INTERVAL, self.start_flush)
+        self.logs_since_flush += 1
+        if self.logs_since_flush >= self.FLUSH_ENTRIES:
+            self.start_flush()
+        return group_written
+
+    def start_flush(self) -> None:
+        """Starts to write the buffered logs as a group in the background."""
+        if self.group_written is None:
+            return
+        self.flush_timer.cancel()
+        self.logs_since_flush = 0
+        task = asyncio.create_task(
+            self.write_group(list(self.write_buffer.pending), self.group_written)
+        )
+        self.flush_tasks.add(task)
+        task.add_done_callback(self.flush_tasks.discard)
+        self.group_written, self.flush_timer = None, None
+
+    async def write_group(self, user_ids: List[str], group_written: asyncio.Future) -> None:
+        """
+        Writes the buffered logs of users as a group. The buffered entries are taken while holding
+        the locks of all users, so entries of the same user are always written in order.
+
+        :param user_ids: The users whose logs are written.
+        :param group_written: The future that is resolved when the group has been written.
+        """
+        error = None
+        try:
+            async with contextlib.AsyncExitStack() as locks:
+                for user_id in sorted(user_ids):
+                    await locks.enter_async_context(self.user_lock(user_id))
+                batch = self.write_buffer.take(user_ids)
+                try:
+                    results = await self.run(self.write_batch, batch)
+                except Exception as batch_error:
+                    results = {user_id: (None, None, batch_error) for user_id in batch}
+
+            self.write_buffer.flushes += 1
+            for user_id, entries in batch.items():
+                version_before, version_after, user_error = results[user_id]
+                self.write_buffer.finish(user_id, user_error is None)
+                if user_error is not None:
+                    print(f"Failed to write the buffered weights of {user_id}: {user_error}")
+                    error = error or user_error
+                elif self.series_cache is not None:
+                    self.series_cache.write_through(
+                        user_id,
+                        version_before,
+                        version_after,
+                        lambda series: series.upsert(entries, version_after),
+                    )
+        except BaseException as group_error:
+            error = group_error
+            raise
+        finally:
+            if not group_written.done():
+                if error is None:
+                    group_written.set_result(None)
+                else:
+                    group_written.set_exception(error)
+                    # Waiters of the "async" mode don't retrieve the error, it has been printed.
+                    group_written.exception()
+            if error is not None and self.write_buffer.pending:
+                self.schedule_flush()
+
+    def write_batch(
+        self, batch: Dict[str, List[WeightEntry]]
+    ) -> Dict[str, Tuple[Hashable, Hashable, Optional[Exception]]]:
+        """
+        Writes the entries of a group of users with `WeightRepository.upsert_groups`. This blocks,
+        and runs in an I/O thread.
+
+        :param batch: The entries of every user.
+        :returns: The data version before and after the write of every user, and the error when
+                  the write failed.
+        """
+        versions_before = {user_id: self.repository.data_version(user_id) for user_id in batch}
+        try:
+            errors = self.repository.upsert_groups(batch)
+        except Exception as error:
+            errors = dict.fromkeys(batch, error)
+
+        results = {}
+        for user_id in batch:
+            if user_id in errors:
+                results[user_id] = (None, None, errors[user_id])
+                continue
+            try:
+                if self.on_change is not None:
+                    self.on_change(user_id)
+                results[user_id] = (
+                    versions_before[user_id],
+                    self.repository.data_version(user_id),
+                    None,
+                )
+            except Exception as error:
+                results[user_id] = (None, None, error)
+        return results
+
+    async def flush_user(self, user_id: str) -> None:
+        """
+        Writes the buffered logs of a user right away, before a change that has to come after them.
+
+        :param user_id: The Discord user ID.
+        """
+        if self.write_buffer is None or not self.write_buffer.has_entries(user_id):
+            return
+        await self.write_group([user_id], asyncio.get_running_loop().create_future())
+
+    async def flush(self) -> None:
+        """
+        Writes all buffered logs and waits for the writes in progress, for example before the
+        repository is closed.
+        """
+        if self.write_buffer is None:
+            return
+        self.start_flush()
+        await asyncio.gather(*self.flush_tasks, return_exceptions=True)
+
+    async def upsert_goal(self, user_id: str, entry_date: date, weight: float) -> None:
+        """See `WeightRepository.upsert_goal`."""
+        await self.mutate(user_id, self.repository.upsert_goal, user_id, entry_date, weight)
+
+    async def read_range(
+        self, user_id: str, start: Optional[date] = None, end: Optional[date] = None
+    ) -> List[WeightEntry]:
+        """See `WeightRepository.read_range`."""
+        if self.series_cache is None and not self.has_buffered_entries(user_id):
+            return await self.run(self.repository.read_range, user_id, start, end)
+        return (await self.read_series(user_id, start, end)).entries()
+
+    async def read_series(
+        self,
+        user_id: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        cache: bool = True,
+    ) -> WeightSeries:
+        """
+        Reads the weight entries of a user inside of a date range as a series. The series is served
+        from the series cache when the data of the user didn't change since it was cached.
+
+        :param user_id: The Discord user ID.
+        :param start: The first date of the range (inclusive), or None for no lower bound.
+        :param end: The last date of the range (inclusive), or None for no upper bound.
+        :param cache: False reads around the series cache, for scans of all users that would
+                      otherwise evict the series of the active users.
+        """
+        if self.series_cache is None or not cache:
+            series = await self.run(self.read_versioned, user_id, start, end)
+        else:
+            stored_version = await self.run(self.repository.data_version, user_id)
+            series = self.series_cache.get(user_id, stored_version)
+            if series is None:
+                # The whole history is read, so later reads of any range are served from the cache.
+                series = await self.run(self.read_versioned, user_id, None, None)
+                self.series_cache.put(user_id, series)
+            series = series.slice(start, end)
+
+        if self.has_buffered_entries(user_id):
+            series = series.upsert(
+                self.write_buffer.entries(user_id, start, end),
+                (series.version, self.write_buffer.versions[user_id]),
+            )
+        return series
+
+    def has_buffered_entries(self, user_id: str) -> bool:
+        """Checks if a user has weight logs in the write buffer."""
+        return self.write_buffer is not None and self.write_buffer.has_entries(user_id)
+
+    def read_versioned(
+        self, user_id: str, start: Optional[date], end: Optional[date]
+    ) -> WeightSeries:
+        """
+        Reads the weight entries of a user inside of a date range as a series, tagged with the data
+        version they have been read at.
+
+        The version is read before the entries. When the data changes in between, the series gets
+        an outdated version, which only causes a cache miss on the next read.
+        """
+        version = self.repository.data_version(user_id)
+        return WeightSeries(*self.repository.read_arrays(user_id, start, end), version)
+
+    async def read_goals(self, user_id: str) -> List[WeightEntry]:
+        """See `WeightRepository.read_goals`."""
+        return await self.run(self.repository.read_goals, user_id)
+
+    async def has_data(self, user_id: str) -> bool:
+        """See `WeightRepository.has_data`."""
+        if self.has_buffered_entries(user_id):
+            return True
+        return await self.run(self.repository.has_data, user_id)
+
+    async def user_ids(self) -> List[str]:
+        """See `WeightRepository.user_ids`."""
+        user_ids = await self.run(self.repository.user_ids)
+        if self.write_buffer is None:
+            return user_ids
+        return sorted(set(user_ids) | set(self.write_buffer.user_ids()))
+
+    async def data_version(self, user_id: str) -> Hashable:
+        """
+        See `WeightRepository.data_version`. Buffered logs are part of the version, so it changes
+        with every log.
+        """
+        version = await self.run(self.repository.data_version, user_id)
+        if self.has_buffered_entries(user_id):
+            return (version, self.write_buffer.versions[user_id])
+        return version
+
+    async def export_csv(self, user_id: str) -> bytes:
+        """See `WeightRepository.export_csv`."""
+        await self.flush_user(user_id)
+        return await self.run(self.repository.export_csv, user_id)
+
+    def close(self) -> None:
+        """
+        Waits for the pending I/O to finish and closes the repository. Buffered logs have to be
+        written with `flush` first. This blocks until the I/O threads are done, so the event loop
+        runs it in another thread.
+        """
+        if self.write_buffer is not None and self.write_buffer.pending:
+            print(f"Closing with {self.write_buffer.pending_entries} unwritten weight entries")
+        self.executor.shutdown(wait=True)
+        self.repository.close()
@@ -0,0 +1,83 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Final, List, Tuple
+
+import numpy as np
+
+"""
+This module contains the BM25 keyword index that the SourceCog uses to prefilter the chunks of the
+info command files.
+"""
+
+TOKEN_PATTERN: Final[re.Pattern] = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits a text into lowercase words."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class Bm25Index:
+    """
+    An inverted index that scores documents with Okapi BM25: documents that contain more of the
+    rare words of a query score higher, and long documents are not favored just for their length.
+
+    The BM25 weight of every term in every document is computed when the index is built, so a
+    query only adds up the weights of the posting lists of its terms.
+    """
+
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75) -> None:
+        """
+        Builds a Bm25Index instance.
+
+        :param documents: The texts of the documents. A document is identified by its position.
+        :param k1: How quickly repeating a term stops adding to the score.
+        :param b: How much the score is normalized by the length of the document.
+        """
+        self.DOCUMENTS: Final[int] = len(documents)
+        term_counts = [Counter(tokenize(document)) for document in documents]
+        lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float64)
+        average_length = lengths.mean() if self.DOCUMENTS and lengths.mean() > 0 else 1.0
+
+        rows: Dict[str, List[int]] = {}
+        frequencies: Dict[str, List[int]] = {}
+        for row, counts in enumerate(term_counts):
+            for term, frequency in counts.items():
+                rows.setdefault(term, []).append(row)
+                frequencies.setdefault(term, []).append(frequency)
+
+        self.postings: Final[Dict[str, Tuple[np.ndarray, np.ndarray]]] = {}
+        """
+        The rows of the documents that contain a term, with the BM25 weight of the term in them.
+        """
+        for term, term_rows in rows.items():
+            term_rows_array = np.array(term_rows, dtype=np.int64)
+            term_frequencies = np.array(frequencies[term], dtype=np.float64)
+            idf = math.log(1 + (self.DOCUMENTS - len(term_rows) + 0.5) / (len(term_rows) + 0.5))
+            length_norm = 1 - b + b * lengths[term_rows_array] / average_length
+            weights = idf * term_frequencies * (k1 + 1) / (term_frequencies + k1 * length_norm)
+            self.postings[term] = (term_rows_array, weights)
+
+    def scores(self, query: str) -> np.ndarray:
+        """Returns the BM25 score of every document for a query."""
+        scores = np.zeros(self.DOCUMENTS)
+        for term in set(tokenize(query)):
+            if term in self.postings:
+                term_rows, weights = self.postings[term]
+                scores[term_rows] += weights
+        return scores
+
+    def top(self, query: str, k: int) -> np.ndarray:
+        """
+        Finds the documents that match a query best.
+
+        :param query: The query text.
+        :param k: The most documents to return.
+        :returns: The rows of the documents with a positive score, best first.
+        """
+        scores = self.scores(query)
+        matching_rows = np.flatnonzero(scores > 0)
+        if len(matching_rows) > k:
+            matching_rows = matching_rows[np.argpartition(-scores[matching_rows], k - 1)[:k]]
+        return matching_rows[np.argsort(-scores[matching_rows], kind="stable")]
@@ -0,0 +1,103 @@
+import os
+import threading
+from typing import Callable, Dict, Final
+
+from libs.file_utils import atomic_write
+
+"""
+This module contains the journal of the data files that changed since the last data commit.
+"""
+
+
+class DirtyPathJournal:
+    """
+    Keeps the set of data files that changed since they were last committed, so the data commit
+    only stages those files, and is skipped completely when nothing changed.
+
+    Every path that becomes dirty is appended to a journal file, so the set survives a restart.
+    A path that is already dirty is not appended again. A commit takes a `snapshot` of the set and
+    `clear`s the snapshot once it is pushed, which rewrites the journal with the paths that are
+    left. A path that changed again while the commit ran stays dirty.
+
+    The cogs mark paths from the event loop and from I/O threads, so the journal is thread safe.
+
+    A cog whose files can be incomplete on disk (like a database with a write-ahead log) adds a
+    function to `checkpoints`, which the data commit runs right before it stages the files.
+    """
+
+    def __init__(self, journal_path: str) -> None:
+        """
+        Initializes a DirtyPathJournal instance, and loads the dirty paths of the journal file.
+
+        :param journal_path: The path of the journal file.
+        """
+        self.JOURNAL_PATH: Final[str] = journal_path
+        self.lock: Final[threading.Lock] = threading.Lock()
+        self.marks: int = 0
+        self.dirty: Final[Dict[str, int]] = {}
+        """
+        The dirty paths, with the number of the mark that last changed them.
+        """
+        self.checkpoints: Final[Dict[str, Callable[[], bool]]] = {}
+        """
+        The functions that write the files of a cog completely to disk, by the name of the cog.
+        They return False when the files can't be completed right now.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.JOURNAL_PATH)), exist_ok=True)
+        if os.path.exists(self.JOURNAL_PATH):
+            with open(self.JOURNAL_PATH, "r") as journal_file:
+                for line in journal_file:
+                    if line.strip():
+                        self.mark_in_memory(line.rstrip("\n"))
+
+    def mark_in_memory(self, path: str) -> bool:
+        """
+        Marks a path as dirty without journaling it. The caller holds the lock.
+
+        :returns: True when the path was clean before.
+        """
+        self.marks += 1
+        was_clean = path not in self.dirty
+        self.dirty[path] = self.marks
+        return was_clean
+
+    def mark(self, *paths: str) -> None:
+        """
+        Marks files as changed.
+
+        :param paths: The paths of the changed (or deleted) files.
+        """
+        with self.lock:
+            new_paths = [
+                path for path in map(os.path.abspath, paths) if self.mark_in_memory(path)
+            ]
+            if new_paths:
+                with open(self.JOURNAL_PATH, "a") as journal_file:
+                    journal_file.write("".join(f"{path}\n" for path in new_paths))
+
+    def snapshot(self) -> Dict[str, int]:
+        """Returns the dirty paths, to be passed to `clear` once they are committed."""
+        with self.lock:
+            return dict(self.dirty)
+
+    def clear(self, snapshot: Dict[str, int]) -> None:
+        """
+        Marks the paths of a snapshot as clean, unless they changed again since the snapshot.
+
+        :param snapshot: The snapshot that was returned by `snapshot`.
+        """
+        with self.lock:
+            for path, mark in snapshot.items():
+                if self.dirty.get(path) == mark:
+                    del self.dirty[path]
+            atomic_write(
+                self.JOURNAL_PATH, "".join(f"{path}\n" for path in self.dirty).encode()
+            )
+
+    def checkpoint(self) -> bool:
+        """
+        Runs every function of `checkpoints`. It blocks on file I/O, so it is run in a thread.
+
+        :returns: True when all files are complete on disk and can be committed.
+        """
+        return all([checkpoint() for checkpoint in list(self.checkpoints.values())])
@@ -0,0 +1,250 @@
+import io
+import os
+import re
+import threading
+from typing import Callable, Dict, Final, List, Tuple
+
+import numpy as np
+
+from libs.bm25_index import Bm25Index
+from libs.file_utils import atomic_write
+
+"""
+This module contains the document-vector index that the SourceCog searches for the most relevant
+paragraph of the info command files.
+"""
+
+Vectorizer = Callable[[List[str]], np.ndarray]
+"""
+Turns a list of texts into a matrix with one document vector per row.
+"""
+
+PARAGRAPH_SEPARATOR: Final[re.Pattern] = re.compile(r"\n\s*\n")
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Splits a text into its paragraphs, which are separated by blank lines."""
+    return [paragraph.strip() for paragraph in PARAGRAPH_SEPARATOR.split(text) if paragraph.strip()]
+
+
+class DocumentVectorIndex:
+    """
+    Keeps the document vector of every paragraph (chunk) of the `.txt` files of a directory in a
+    NumPy matrix, next to a BM25 keyword index of the chunks. The average vector of a long file
+    washes out its topics, so every paragraph is matched on its own.
+
+    A search takes the chunks that BM25 scores best as candidates, and re-ranks only those by the
+    cosine similarity of their vectors, which is what spaCy's `Doc.similarity` computes. When no
+    chunk shares a word with the query, every chunk is a candidate, so synonyms are still found.
+    Chunks below a minimum similarity are never returned.
+
+    The chunks of a file are keyed by the path and the modification time of the file. `refresh`
+    only vectorizes files that are new or changed since they were indexed, and drops the chunks of
+    deleted files. The vectors are persisted, so they are loaded without vectorizing anything on
+    startup. The BM25 index is rebuilt from the chunks whenever they change.
+
+    A refresh computes the new chunks, vectors and BM25 index without blocking searches, and only
+    takes `lock` to swap them in. Refreshes and loads are serialized by `refresh_lock`.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Initializes an empty DocumentVectorIndex instance.
+
+        :param path: The path of the `.npz` file of the index.
+        """
+        self.PATH: Final[str] = path
+        self.lock: Final[threading.Lock] = threading.Lock()
+        self.refresh_lock: Final[threading.Lock] = threading.Lock()
+        self.file_mtimes: Dict[str, int] = {}
+        """
+        The modification time of every indexed file, by path.
+        """
+        self.paths: List[str] = []
+        """
+        The path of the file of every chunk.
+        """
+        self.chunks: List[str] = []
+        self.vectors: np.ndarray = np.zeros((0, 0), dtype=np.float32)
+        """
+        The vectors of the chunks, one row per chunk, normalized to unit length.
+        """
+        self.bm25: Bm25Index = Bm25Index([])
+
+    def refresh(self, directory: str, vectorize: Vectorizer) -> bool:
+        """
+        Brings the index up to date with the `.txt` files of a directory.
+
+        :param directory: The directory of the files.
+        :param vectorize: Turns the chunks of new or changed files into document vectors.
+        :returns: True when the index changed, and should be saved.
+        """
+        mtimes: Dict[str, int] = {
+            entry.path: entry.stat().st_mtime_ns
+            for entry in os.scandir(directory)
+            if entry.name.endswith(".txt") and entry.is_file()
+        }
+        with self.refresh_lock:
+            with self.lock:
+                file_mtimes, old_paths, old_chunks, old_vectors = (
+                    self.file_mtimes,
+                    self.paths,
+                    self.chunks,
+                    self.vectors,
+                )
+            changed_paths: List[str] = [
+                path for path, mtime in mtimes.items() if file_mtimes.get(path) != mtime
+            ]
+            if not changed_paths and file_mtimes.keys() == mtimes.keys():
+                return False
+
+            changed = set(changed_paths)
+            kept_rows = [
+                row for row, path in enumerate(old_paths) if path in mtimes and path not in changed
+            ]
+            chunk_paths, chunks, vectors = chunk_files(changed_paths, vectorize)
+            if kept_rows and len(vectors) and vectors.shape[1] != old_vectors.shape[1]:
+                # Vectors of another pipeline can't be compared, so every file is vectorized again.
+                kept_rows = []
+                chunk_paths, chunks, vectors = chunk_files(list(mtimes), vectorize)
+
+            paths = [old_paths[row] for row in kept_rows] + chunk_paths
+            chunks = [old_chunks[row] for row in kept_rows] + chunks
+            if kept_rows:
+                vectors = (
+                    np.concatenate([old_vectors[kept_rows], vectors])
+                    if len(vectors)
+                    else old_vectors[kept_rows]
+                )
+            # The chunks of a file stay in their order, and files are ordered by their path.
+            order = sorted(range(len(paths)), key=lambda row: paths[row])
+            paths = [paths[row] for row in order]
+            chunks = [chunks[row] for row in order]
+            vectors = vectors[order] if len(order) else vectors
+            bm25 = Bm25Index(chunks)
+
+            with self.lock:
+                self.file_mtimes = mtimes
+                self.paths, self.chunks, self.vectors, self.bm25 = paths, chunks, vectors, bm25
+            return True
+
+    def search(
+        self,
+        query_text: str,
+        query_vector: np.ndarray,
+        top_k: int = 1,
+        candidates: int = 20,
+        min_similarity: float = 0.0,
+    ) -> List[Tuple[str, str, float]]:
+        """
+        Finds the chunks that are most relevant to a query.
+
+        :param query_text: The text of the query, for the BM25 prefilter.
+        :param query_vector: The document vector of the query, for the re-ranking.
+        :param top_k: The most chunks to return.
+        :param candidates: The number of best BM25 matches that are re-ranked.
+        :param min_similarity: The lowest cosine similarity of a returned chunk.
+        :returns: The file path, text and cosine similarity of the most similar chunks, best
+                  first.
+        """
+        with self.lock:
+            paths, chunks, vectors, bm25 = self.paths, self.chunks, self.vectors, self.bm25
+        query_norm = float(np.linalg.norm(query_vector))
+        if not paths or query_norm == 0.0:
+            return []
+
+        candidate_rows = bm25.top(query_text, candidates)
+        if not len(candidate_rows):
+            candidate_rows = np.arange(len(paths))
+        similarities = vectors[candidate_rows] @ (query_vector.astype(np.float32) / query_norm)
+        best = np.argsort(-similarities, kind="stable")[:top_k]
+        return [
+            (paths[candidate_rows[i]], chunks[candidate_rows[i]], float(similarities[i]))
+            for i in best
+            if similarities[i] > 0.0 and similarities[i] >= min_similarity
+        ]
+
+    def load(self) -> bool:
+        """
+        Loads the index from its file.
+
+        :returns: False when the file doesn't exist, or is of an older version of the index.
+        """
+        if not os.path.exists(self.PATH):
+            return False
+
+        with np.load(self.PATH, allow_pickle=False) as index_file:
+            if "chunks" not in index_file:
+                return False
+            file_mtimes = dict(
+                zip(map(str, index_file["files"]), map(int, index_file["file_mtimes"]))
+            )
+            paths = [str(path) for path in index_file["paths"]]
+            chunks = [str(chunk) for chunk in index_file["chunks"]]
+            vectors = index_file["vectors"]
+        bm25 = Bm25Index(chunks)
+        with self.refresh_lock, self.lock:
+            self.file_mtimes = file_mtimes
+            self.paths, self.chunks, self.vectors, self.bm25 = paths, chunks, vectors, bm25
+        return True
+
+    def save(self) -> None:
+        """Writes the index to its file."""
+        with self.lock:
+            index_bytes = io.BytesIO()
+            np.savez(
+                index_bytes,
+                files=np.array(list(self.file_mtimes), dtype=str),
+                file_mtimes=np.array(list(self.file_mtimes.values()), dtype=np.int64),
+                paths=np.array(self.paths, dtype=str),
+                chunks=np.array(self.chunks, dtype=str),
+                vectors=self.vectors,
+            )
+        os.makedirs(os.path.dirname(os.path.abspath(self.PATH)), exist_ok=True)
+        atomic_write(self.PATH, index_bytes.getvalue())
+
+
+def chunk_files(paths: List[str], vectorize: Vectorizer) -> Tuple[List[str], List[str], np.ndarray]:
+    """
+    Splits text files into chunks and vectorizes the chunks.
+
+    :param paths: The paths of the files.
+    :param vectorize: Turns the chunks into document vectors.
+    :returns: The file path, the text and the normalized vector of every chunk.
+    """
+    chunk_paths: List[str] = []
+    chunks: List[str] = []
+    for path, text in zip(paths, read_texts(paths)):
+        for chunk in split_paragraphs(text):
+            chunk_paths.append(path)
+            chunks.append(chunk)
+    if not chunks:
+        return [], [], np.zeros((0, 0), dtype=np.float32)
+    return chunk_paths, chunks, normalize(vectorize(chunks))
+
+
+def read_texts(paths: List[str]) -> List[str]:
+    """
+    Reads the text files at the given paths. A file that was deleted in the meantime is read as an
+    empty text, and is dropped from the index by the next refresh.
+    """
+    texts = []
+    for path in paths:
+        try:
+            with open(path, "r") as text_file:
+                texts.append(text_file.read())
+        except FileNotFoundError:
+            texts.append("")
+    return texts
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scales every row of a matrix to unit length. Rows of zeros stay zero.
+
+    :param vectors: The document vectors, one per row.
+    :returns: The normalized vectors as float32.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
@@ -0,0 +1,91 @@
+import os
+import tempfile
+from typing import Dict, Iterable
+
+"""
+This module contains helpers for safely writing data files.
+"""
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """
+    Crash-safely replaces the content of a file.
+
+    The data is written to a temporary file in the same directory, flushed to disk with `fsync` and
+    then renamed over the original file. A crash at any point leaves either the old or the new
+    content, but never a partially written file.
+
+    :param path: The path of the file to write.
+    :param data: The new content of the file.
+    """
+    atomic_write_many({path: data})
+
+
+def atomic_write_many(files: Dict[str, bytes]) -> None:
+    """
+    Crash-safely replaces the content of many files, like `atomic_write`, with fewer waits for the
+    disk. All temporary files are written before the first one is flushed, and every directory is
+    synced once after all files have been renamed.
+
+    A crash leaves every file with either its old or its new content, but some files can have the
+    new content while others still have the old content.
+
+    :param files: The new content of every file, by path.
+    """
+    temp_paths: Dict[str, str] = {}
+    try:
+        for path, data in files.items():
+            file_descriptor, temp_paths[path] = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(path)),
+                prefix=f".{os.path.basename(path)}.",
+                suffix=".tmp",
+            )
+            with os.fdopen(file_descriptor, "wb") as temp_file:
+                temp_file.write(data)
+        sync_files(temp_paths.values(), directories=False)
+        for path in list(temp_paths):
+            os.replace(temp_paths[path], path)
+            del temp_paths[path]
+    except BaseException:
+        for temp_path in temp_paths.values():
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        raise
+
+    # Persist the renames themselves by syncing the directory entries.
+    sync_directories(files)
+
+
+def sync_files(paths: Iterable[str], directories: bool = True) -> None:
+    """
+    Flushes files that were written without `fsync` to disk.
+
+    :param paths: The paths of the files.
+    :param directories: Whether the directories of the files are synced as well, which persists
+                        files that were created.
+    """
+    paths = list(paths)
+    for path in paths:
+        file_descriptor = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(file_descriptor)
+        finally:
+            os.close(file_descriptor)
+    if directories:
+        sync_directories(paths)
+
+
+def sync_directories(paths: Iterable[str]) -> None:
+    """
+    Syncs the directory entries of files, once per directory.
+
+    :param paths: The paths of the files.
+    """
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    for directory in {os.path.dirname(os.path.abspath(path)) for path in paths}:
+        directory_descriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directory_descriptor)
+        finally:
+            os.close(directory_descriptor)
@@ -0,0 +1,222 @@
+import asyncio
+import os
+import tempfile
+import time
+from typing import Dict, Final, Optional
+
+"""
+This module contains the asyncio runner of the git commands of the CommitDataCog.
+"""
+
+
+class GitStepResult:
+    """
+    The outcome of a single git command.
+    """
+
+    def __init__(
+        self,
+        step: str,
+        returncode: Optional[int],
+        output: str,
+        duration: float,
+        timed_out: bool = False,
+    ) -> None:
+        """
+        Initializes a GitStepResult instance.
+
+        :param step: The git subcommand, for example "push".
+        :param returncode: The exit code of git, or None when git could not be started.
+        :param output: The captured stdout and stderr of git.
+        :param duration: The run time of the command in seconds.
+        :param timed_out: True when the command was killed because it took too long.
+        """
+        self.step: Final[str] = step
+        self.returncode: Final[Optional[int]] = returncode
+        self.output: Final[str] = output
+        self.duration: Final[float] = duration
+        self.timed_out: Final[bool] = timed_out
+
+    @property
+    def ok(self) -> bool:
+        """True when the command succeeded."""
+        return self.returncode == 0 and not self.timed_out
+
+
+class GitStepMetrics:
+    """
+    The run times and failures of one git subcommand.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty GitStepMetrics instance.
+        """
+        self.runs: int = 0
+        self.failures: int = 0
+        self.timeouts: int = 0
+        self.total_seconds: float = 0.0
+        self.max_seconds: float = 0.0
+        self.last_seconds: float = 0.0
+
+    def record(self, result: GitStepResult) -> None:
+        """Adds the outcome of a command to the metrics."""
+        self.runs += 1
+        self.failures += not result.ok
+        self.timeouts += result.timed_out
+        self.total_seconds += result.duration
+        self.max_seconds = max(self.max_seconds, result.duration)
+        self.last_seconds = result.duration
+
+
+class GitPipeline:
+    """
+    Runs git commands in a repository as asyncio subprocesses, so a slow remote never blocks the
+    event loop.
+
+    Every command runs with the repository as its working directory, instead of changing the
+    working directory of the whole bot. Its output is captured, and it is killed when it takes
+    longer than its timeout. Commands that talk to the remote get a longer timeout than local
+    commands. Git never asks for credentials on the terminal, which would hang until the timeout.
+    """
+
+    NETWORK_STEPS: Final[frozenset] = frozenset({"fetch", "pull", "push"})
+    """
+    The git subcommands that talk to the remote.
+    """
+
+    def __init__(
+        self, repository_path: str, local_timeout: float = 30.0, network_timeout: float = 120.0
+    ) -> None:
+        """
+        Initializes a GitPipeline instance.
+
+        :param repository_path: The working directory of the git repository.
+        :param local_timeout: The seconds a local command may take.
+        :param network_timeout: The seconds a command that talks to the remote may take.
+        """
+        self.REPOSITORY_PATH: Final[str] = repository_path
+        self.LOCAL_TIMEOUT: Final[float] = local_timeout
+        self.NETWORK_TIMEOUT: Final[float] = network_timeout
+        self.step_metrics: Final[Dict[str, GitStepMetrics]] = {}
+
+    async def run(
+        self, *args: str, stdin_data: Optional[bytes] = None, cwd: Optional[str] = None
+    ) -> GitStepResult:
+        """
+        Runs a git command in the repository.
+
+        :param args: The arguments of git, starting with the subcommand.
+        :param stdin_data: The input of the command, for example a list of paths.
+        :param cwd: The working tree to run the command in, or None for the repository.
+        :returns: The outcome of the command. Failures are returned, not raised.
+        """
+        step = args[0]
+        timeout = self.NETWORK_TIMEOUT if step in GitPipeline.NETWORK_STEPS else self.LOCAL_TIMEOUT
+        start = time.perf_counter()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "git",
+                *args,
+                cwd=cwd or self.REPOSITORY_PATH,
+                env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+                stdin=asyncio.subprocess.PIPE if stdin_data else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+        except OSError as error:
+            result = GitStepResult(step, None, str(error), time.perf_counter() - start)
+        else:
+            timed_out = False
+            try:
+                output, _ = await asyncio.wait_for(process.communicate(stdin_data), timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    # The command finished right as it timed out.
+                    pass
+                output, _ = await process.communicate()
+            result = GitStepResult(
+                step,
+                process.returncode,
+                output.decode(errors="replace").strip(),
+                time.perf_counter() - start,
+                timed_out,
+            )
+
+        self.step_metrics.setdefault(step, GitStepMetrics()).record(result)
+        return result
+
+    async def push_rebased(self, remote: str = "origin", branch: str = "master") -> GitStepResult:
+        """
+        Pushes the local commits to a branch of the remote. The local commits are first rebased
+        onto the latest state of the branch, so a push is not rejected because another clone
+        pushed in the meantime. A rebase that conflicts is aborted, which leaves the local commits
+        as they were.
+
+        The working tree of the repository holds the live data files, which the bot writes at any
+        time, so it is never touched. The rebase runs in a temporary worktree, and only the
+        current branch and the index are moved to the rebased commits. Files that other clones
+        changed stay as the bot last wrote them.
+
+        :param remote: The name of the remote.
+        :param branch: The branch of the remote to push to.
+        :returns: The outcome of the push, or of the first command that failed.
+        """
+        fetch = await self.run("fetch", remote)
+        if not fetch.ok:
+            return fetch
+        up_to_date = await self.run("merge-base", "--is-ancestor", f"{remote}/{branch}", "HEAD")
+        if not up_to_date.ok:
+            rebase = await self.rebase_in_worktree(f"{remote}/{branch}")
+            if not rebase.ok:
+                return rebase
+        return await self.run("push", remote, f"HEAD:{branch}")
+
+    async def rebase_in_worktree(self, upstream: str) -> GitStepResult:
+        """
+        Rebases the current branch onto an upstream commit in a temporary worktree, and moves the
+        branch and the index to the rebased commits without touching the working tree.
+
+        :param upstream: The commit to rebase onto, for example "origin/master".
+        :returns: The outcome of the last command, or of the first command that failed.
+        """
+        head = await self.run("rev-parse", "HEAD")
+        if not head.ok:
+            return head
+        with tempfile.TemporaryDirectory(prefix="bsf-bot-rebase-") as directory:
+            worktree_path = os.path.join(directory, "worktree")
+            worktree = await self.run("worktree", "add", "--detach", worktree_path, head.output)
+            if not worktree.ok:
+                return worktree
+            try:
+                rebase = await self.run("rebase", upstream, cwd=worktree_path)
+                if not rebase.ok:
+                    await self.run("rebase", "--abort", cwd=worktree_path)
+                    return rebase
+                rebased = await self.run("rev-parse", "HEAD", cwd=worktree_path)
+                if not rebased.ok:
+                    return rebased
+            finally:
+                await self.run("worktree", "remove", "--force", worktree_path)
+
+        # The old value makes the update fail when a commit was added in the meantime.
+        update = await self.run("update-ref", "HEAD", rebased.output, head.output)
+        if not update.ok:
+            return update
+        # A mixed reset only resets the index, so the next commit builds on the rebased files.
+        return await self.run("reset", "--quiet")
+
+    def metrics(self) -> str:
+        """Returns the run times and failures of every git subcommand as a message."""
+        if not self.step_metrics:
+            return "No git commands have run yet."
+        return "\n".join(
+            f"git {step}: {metrics.runs} runs, {metrics.failures} failed"
+            f" ({metrics.timeouts} timed out), last {metrics.last_seconds:.2f}s,"
+            f" average {metrics.total_seconds / metrics.runs:.2f}s,"
+            f" max {metrics.max_seconds:.2f}s"
+            for step, metrics in sorted(self.step_metrics.items())
+        )
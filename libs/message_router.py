@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import re
+from typing import (Awaitable, Callable, Dict, Final, Iterable, List, Optional,
+                    Set)
+
+from discord.message import Message
+
+"""
+This module contains the message router that replaces the separate `on_message` listeners of the
+cogs with a single pass over every message.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class RoutedMessage:
+    """
+    A Discord message which has been normalized once by the `MessageRouter`.
+
+    Handlers should read `lowercase_content` instead of lowercasing `message.content` themselves.
+    """
+
+    DIGIT_PATTERN: Final[re.Pattern] = re.compile(r"\d")
+    """
+    Regex used for the cheap "has a digit" prefilter.
+    """
+
+    def __init__(
+        self,
+        message: Message,
+        keyword_pattern: Optional[re.Pattern] = None,
+        contained_keywords: Optional[Dict[str, Set[str]]] = None,
+    ) -> None:
+        """
+        Initializes a RoutedMessage instance.
+
+        :param message: The received Discord message.
+        :param keyword_pattern: The combined keyword regex of the router. All keywords that are
+                                found in the message are stored in `keywords`.
+        :param contained_keywords: Maps every keyword to the keywords that are a part of it, so a
+                                   keyword hidden inside a longer match is found as well.
+        """
+        self.message: Final[Message] = message
+        self.content: Final[str] = message.content
+        self.lowercase_content: Final[str] = self.content.lower()
+        self.has_digit: Final[bool] = RoutedMessage.DIGIT_PATTERN.search(self.content) is not None
+        self.is_reply: Final[bool] = message.reference is not None
+        self.channel_id: Final[int] = message.channel.id
+        self.keywords: Final[Set[str]] = set()
+
+        if keyword_pattern:
+            for keyword in keyword_pattern.findall(self.lowercase_content):
+                self.keywords |= contained_keywords[keyword]
+
+
+MessageHandler = Callable[[RoutedMessage], Awaitable[None]]
+
+
+class Route:
+    """
+    The interest of a single cog in incoming messages.
+
+    A handler is only called when all of the specified conditions hold. A route without any
+    conditions receives every message.
+    """
+
+    def __init__(
+        self,
+        handler: MessageHandler,
+        digits: bool = False,
+        keywords: Iterable[str] = (),
+        reply: bool = False,
+        channels: Iterable[int] = (),
+    ) -> None:
+        """
+        Initializes a Route instance.
+
+        :param handler: The coroutine that handles a matching message.
+        :param digits: Only route messages that contain a digit.
+        :param keywords: Only route messages that contain at least one of these (lowercase)
+                         keywords.
+        :param reply: Only route messages that reply to another message.
+        :param channels: Only route messages that are send in one of these channel IDs.
+        """
+        self.handler: Final[MessageHandler] = handler
+        self.digits: Final[bool] = digits
+        self.keywords: Final[Set[str]] = {keyword.lower() for keyword in keywords}
+        self.reply: Final[bool] = reply
+        self.channels: Final[Set[int]] = set(channels)
+
+    def matches(self, routed_message: RoutedMessage) -> bool:
+        """
+        Checks if a message passes the prefilter of this route.
+
+        :param routed_message: The normalized message.
+        """
+        if self.digits and not routed_message.has_digit:
+            return False
+        if self.reply and not routed_message.is_reply:
+            return False
+        if self.channels and routed_message.channel_id not in self.channels:
+            return False
+        if self.keywords and self.keywords.isdisjoint(routed_message.keywords):
+            return False
+        return True
+
+
+class MessageRouter:
+    """
+    Routes every message to the cogs that registered interest in it.
+
+    Instead of every cog listening to `on_message`, lowercasing the content and running its own
+    regex scans in a separate task, the router normalizes the message once and runs a combined
+    prefilter. Only the handlers of the matching routes are called.
+    """
+
+    def __init__(self) -> None:
+        self.routes: Dict[str, Route] = {}
+        self.keyword_pattern: Optional[re.Pattern] = None
+        self.contained_keywords: Dict[str, Set[str]] = {}
+
+    def register(self, name: str, handler: MessageHandler, **interest) -> None:
+        """
+        Registers (or replaces) the route of a cog.
+
+        :param name: A unique name for the route, usually the qualified name of the cog.
+        :param handler: The coroutine that handles a matching message.
+        :param interest: The keyword arguments of `Route`.
+        """
+        self.routes[name] = Route(handler, **interest)
+        self.compile_keywords()
+
+    def unregister(self, name: str) -> None:
+        """
+        Removes the route of a cog, for example when the cog is unloaded.
+
+        :param name: The name the route has been registered with.
+        """
+        self.routes.pop(name, None)
+        self.compile_keywords()
+
+    def compile_keywords(self) -> None:
+        """
+        Combines the keywords of all routes into a single regex, so a message only has to be
+        scanned once for all keywords.
+        """
+        keywords: Set[str] = set()
+        for route in self.routes.values():
+            keywords |= route.keywords
+
+        self.contained_keywords = {
+            keyword: {other for other in keywords if other in keyword} for keyword in keywords
+        }
+        # The lookahead finds a match at every position, and longer keywords are tried first. The
+        # shorter keywords inside of a match are added through `contained_keywords`.
+        alternatives = "|".join(map(re.escape, sorted(keywords, key=len, reverse=True)))
+        self.keyword_pattern = re.compile(f"(?=({alternatives}))") if keywords else None
+
+    def match(self, routed_message: RoutedMessage) -> List[MessageHandler]:
+        """
+        Returns the handlers of the routes that are interested in a normalized message.
+
+        :param routed_message: The normalized message.
+        """
+        return [route.handler for route in self.routes.values() if route.matches(routed_message)]
+
+    async def dispatch(self, message: Message) -> None:
+        """
+        Normalizes a message and dispatches it to all interested handlers. The handlers run
+        concurrently, and an exception in one handler doesn't stop the others.
+
+        :param message: The received Discord message.
+        """
+        routed_message = RoutedMessage(message, self.keyword_pattern, self.contained_keywords)
+        handlers = self.match(routed_message)
+        if not handlers:
+            return
+
+        results = await asyncio.gather(
+            *(handler(routed_message) for handler in handlers), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error("Message handler failed", exc_info=result)
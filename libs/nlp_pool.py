@@ -0,0 +1,287 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent import futures
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Final, List, Optional, Tuple
+
+import numpy as np
+
+"""
+This module runs the spaCy inference of the SourceCog in a pool of worker processes.
+"""
+
+VECTORS_ONLY_EXCLUDE: Final[List[str]] = [
+    "tok2vec",
+    "tagger",
+    "morphologizer",
+    "parser",
+    "senter",
+    "attribute_ruler",
+    "lemmatizer",
+    "ner",
+]
+"""
+The pipeline components that are not loaded. The document vector is the average of the static
+word vectors of its tokens, so only the tokenizer and the vectors are needed.
+"""
+
+pipeline: Optional[Any] = None
+"""
+The spaCy pipeline of a worker process, which is loaded once when the worker starts.
+"""
+
+pipeline_load_seconds: float = 0.0
+
+
+def load_pipeline(model_name: str) -> None:
+    """
+    Loads the vectors-only spaCy pipeline of a worker process. spaCy is imported here, so only the
+    workers import it.
+
+    :param model_name: The name of the spaCy model, for example "en_core_web_md".
+    """
+    global pipeline, pipeline_load_seconds
+    start = time.perf_counter()
+    import spacy
+
+    pipeline = spacy.load(model_name, exclude=VECTORS_ONLY_EXCLUDE)
+    pipeline_load_seconds = time.perf_counter() - start
+
+
+def worker_ready() -> Tuple[int, float]:
+    """Returns the process ID of the worker and the seconds it took to load its pipeline."""
+    return os.getpid(), pipeline_load_seconds
+
+
+def document_vectors(texts: List[str]) -> np.ndarray:
+    """
+    Computes the document vectors of texts in a worker process.
+
+    :param texts: The texts.
+    :returns: A matrix with the document vector of every text as a row.
+    """
+    return np.array([doc.vector for doc in pipeline.pipe(texts)], dtype=np.float32)
+
+
+class NlpProcessPool:
+    """
+    Runs spaCy inference in a pool of worker processes, so a burst of "source that" replies doesn't
+    block the event loop and starve the gateway heartbeat.
+
+    Every worker loads the model once when it starts, which is when the first task is sent to the
+    pool. Only one pool per model is created in the bot process, see `shared`, so reloading the
+    cog doesn't load the model again. Concurrent requests for the same text share
+    a single inference. A request that takes longer than its timeout fails with
+    `asyncio.TimeoutError`. An inference that no request waits for anymore is cancelled, so it
+    doesn't hold up the queue when it hasn't started yet.
+    """
+
+    LATENCY_SAMPLES: Final[int] = 1000
+    """
+    The number of recent request latencies that the latency percentiles are computed from.
+    """
+
+    VECTORIZE_BATCH_SIZE: Final[int] = 64
+    """
+    The number of texts that `vectorize` sends to a worker at once. Every batch has to be computed
+    within the timeout.
+    """
+
+    shared_pools: Final[Dict[Tuple[str, int, float], "NlpProcessPool"]] = {}
+    """
+    The pools of `shared`, which outlive the cogs that use them.
+    """
+
+    @classmethod
+    def shared(
+        cls, model_name: str, max_workers: int = 2, timeout: float = 10.0
+    ) -> "NlpProcessPool":
+        """
+        Returns the pool of the bot process for a model, and creates it on first use. See
+        `__init__` for the parameters.
+        """
+        key = (model_name, max_workers, timeout)
+        if key not in cls.shared_pools:
+            cls.shared_pools[key] = cls(model_name, max_workers, timeout)
+        return cls.shared_pools[key]
+
+    def __init__(
+        self,
+        model_name: str,
+        max_workers: int = 2,
+        timeout: float = 10.0,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        """
+        Initializes a NlpProcessPool instance.
+
+        :param model_name: The name of the spaCy model, for example "en_core_web_md".
+        :param max_workers: The number of worker processes.
+        :param timeout: The seconds a request may take, including the time it waits for a worker.
+        :param executor: The executor that runs the inference, or None to start the worker
+                         processes.
+        """
+        self.MODEL_NAME: Final[str] = model_name
+        self.MAX_WORKERS: Final[int] = max_workers
+        self.TIMEOUT: Final[float] = timeout
+        # Forking a process that runs threads (like the event loop and the I/O pool) can deadlock,
+        # so the workers are started with spawn.
+        self.executor: Final[Executor] = executor or ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=load_pipeline,
+            initargs=(model_name,),
+        )
+        self.in_flight: Final[Dict[str, asyncio.Future]] = {}
+        """
+        The inferences that are waiting for or running in a worker, by text.
+        """
+        self.waiting_requests: Final[Dict[str, int]] = {}
+        """
+        The number of requests that wait for the inference of a text.
+        """
+        self.queue_depth: int = 0
+        self.max_queue_depth: int = 0
+        self.requests: int = 0
+        self.coalesced_requests: int = 0
+        self.timeouts: int = 0
+        self.inferences: int = 0
+        self.total_inference_seconds: float = 0.0
+        self.latencies: Final[Deque[float]] = deque(maxlen=NlpProcessPool.LATENCY_SAMPLES)
+        self.worker_load_seconds: Dict[int, float] = {}
+        """
+        The seconds every started worker took to load its pipeline, by process ID.
+        """
+
+    async def start(self) -> None:
+        """
+        Starts every worker process and waits until their pipelines are loaded, so the first
+        requests don't wait for the model to load.
+        """
+        loop = asyncio.get_running_loop()
+        # A worker only takes a new task once it finished its last one, so waiting tasks keep
+        # being handed out until every worker answered.
+        while len(self.worker_load_seconds) < self.MAX_WORKERS:
+            self.worker_load_seconds.update(
+                await asyncio.gather(
+                    *(
+                        loop.run_in_executor(self.executor, worker_ready)
+                        for _ in range(self.MAX_WORKERS)
+                    )
+                )
+            )
+        load_seconds = ", ".join(f"{seconds:.1f}s" for seconds in self.worker_load_seconds.values())
+        print(f"Loaded {self.MODEL_NAME} in {self.MAX_WORKERS} NLP workers ({load_seconds})")
+
+    async def vector(self, text: str) -> np.ndarray:
+        """
+        Computes the document vector of a text in a worker process. Concurrent requests for the
+        same text share one inference.
+
+        :param text: The text.
+        :returns: The document vector of the text.
+        :raises asyncio.TimeoutError: When the vector isn't computed within the timeout.
+        """
+        self.requests += 1
+        start = time.perf_counter()
+        inference = self.in_flight.get(text)
+        # A finished or cancelled inference stays in `in_flight` until its done callback runs, and
+        # must not be joined.
+        if inference is None or inference.done():
+            inference = asyncio.ensure_future(self.infer(text))
+            self.in_flight[text] = inference
+            inference.add_done_callback(lambda _: self.forget_inference(text, inference))
+        else:
+            self.coalesced_requests += 1
+        self.waiting_requests[text] = self.waiting_requests.get(text, 0) + 1
+
+        try:
+            # The shield keeps a timed out request from cancelling the inference of other requests.
+            vectors = await asyncio.wait_for(asyncio.shield(inference), self.TIMEOUT)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+            self.waiting_requests[text] -= 1
+            if not self.waiting_requests[text]:
+                del self.waiting_requests[text]
+                inference.cancel()
+                self.forget_inference(text, inference)
+        return vectors[0]
+
+    def forget_inference(self, text: str, inference: asyncio.Future) -> None:
+        """
+        Removes the inference of a text from `in_flight`, unless it has already been replaced by a
+        newer inference of the same text.
+        """
+        if self.in_flight.get(text) is inference:
+            del self.in_flight[text]
+
+    async def infer(self, text: str) -> np.ndarray:
+        """Runs the inference of a text in a worker process and records its metrics."""
+        loop = asyncio.get_running_loop()
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        start = time.perf_counter()
+        try:
+            vectors = await loop.run_in_executor(self.executor, document_vectors, [text])
+        finally:
+            self.queue_depth -= 1
+        self.inferences += 1
+        self.total_inference_seconds += time.perf_counter() - start
+        return vectors
+
+    def vectorize(self, texts: List[str]) -> np.ndarray:
+        """
+        Computes the document vectors of many texts in the worker processes, in batches that the
+        workers compute in parallel. It blocks until they are computed, so it is called from a
+        thread, like the refresh of the document index.
+
+        :param texts: The texts.
+        :returns: A matrix with the document vector of every text as a row.
+        :raises TimeoutError: When a batch isn't computed within the timeout. The batches that
+                              haven't started yet are cancelled.
+        """
+        batches = [
+            self.executor.submit(
+                document_vectors, texts[start : start + NlpProcessPool.VECTORIZE_BATCH_SIZE]
+            )
+            for start in range(0, len(texts), NlpProcessPool.VECTORIZE_BATCH_SIZE)
+        ]
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+        try:
+            return np.concatenate([batch.result(timeout=self.TIMEOUT) for batch in batches])
+        except futures.TimeoutError:
+            for batch in batches:
+                batch.cancel()
+            raise TimeoutError(
+                f"Vectorizing {len(texts)} texts took longer than {self.TIMEOUT}s per batch"
+            ) from None
+
+    def metrics(self) -> str:
+        """
+        Returns a human readable summary of the pool metrics.
+        """
+        average_ms = 1000 * self.total_inference_seconds / max(self.inferences, 1)
+        if self.latencies:
+            p50, p95 = 1000 * np.percentile(np.array(self.latencies), [50, 95])
+            latency = f"latency p50 {p50:.0f} ms, p95 {p95:.0f} ms"
+        else:
+            latency = "no requests yet"
+        return (
+            f"NLP pool: {self.MAX_WORKERS} workers, queue depth {self.queue_depth}"
+            f" (max {self.max_queue_depth}), {self.requests} requests"
+            f" ({self.coalesced_requests} coalesced, {self.timeouts} timed out),"
+            f" {self.inferences} inferences ({average_ms:.0f} ms average), {latency}"
+        )
+
+    def close(self) -> None:
+        """
+        Stops the worker processes.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,70 @@
+from collections import OrderedDict
+from typing import Final, Hashable, Optional
+
+"""
+This module contains the in-memory cache for rendered weight plots.
+"""
+
+
+class PlotCache:
+    """
+    A bounded LRU cache of rendered PNG images.
+
+    The key of a plot contains everything the image is rendered from (the user, the version of the
+    user's weight data, the period and the moving average mode). A key therefore always maps to
+    the same image, and changed data simply results in a new key. Old keys are evicted once the
+    cache is full.
+    """
+
+    def __init__(self, max_entries: int = 128) -> None:
+        """
+        Initializes a PlotCache instance.
+
+        :param max_entries: The maximum number of plots in the cache.
+        """
+        self.MAX_ENTRIES: Final[int] = max_entries
+        self.plots: Final[OrderedDict[Hashable, bytes]] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """
+        Returns the cached plot of a key, or None when it isn't cached.
+
+        :param key: The key of the plot.
+        """
+        png = self.plots.get(key)
+        if png is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.plots.move_to_end(key)
+        return png
+
+    def put(self, key: Hashable, png: bytes) -> None:
+        """
+        Adds a plot to the cache, evicting the least recently used plot when the cache is full.
+
+        :param key: The key of the plot.
+        :param png: The rendered plot.
+        """
+        if self.MAX_ENTRIES <= 0:
+            return
+
+        self.plots[key] = png
+        self.plots.move_to_end(key)
+        while len(self.plots) > self.MAX_ENTRIES:
+            self.plots.popitem(last=False)
+
+    def metrics(self) -> str:
+        """
+        Returns a human readable summary of the cache metrics.
+        """
+        lookups = self.hits + self.misses
+        hit_rate = 100 * self.hits / lookups if lookups else 0.0
+        size_kb = sum(len(png) for png in self.plots.values()) / 1024
+        return (
+            f"Plot cache: {len(self.plots)}/{self.MAX_ENTRIES} plots ({size_kb:.0f} KiB),"
+            f" {self.hits} hits, {self.misses} misses ({hit_rate:.0f}% hit rate)"
+        )
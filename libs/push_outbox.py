@@ -0,0 +1,152 @@
+import json
+import os
+import random
+from datetime import datetime, timezone
+from typing import Dict, Final, List, Optional
+
+from libs.file_utils import atomic_write
+
+"""
+This module contains the outbox of the data commits that still have to be pushed to the remote.
+"""
+
+
+class PushOutbox:
+    """
+    Records the data commits that were made locally but not pushed yet, and when the push is
+    retried next.
+
+    A failed push is retried with exponential backoff: the delay doubles with every failed attempt,
+    up to a maximum. The delay is jittered between half of it and all of it, so a remote that was
+    down isn't hit by every retry at the same moment. The outbox is persisted, so pending commits
+    are retried after a restart.
+    """
+
+    def __init__(self, path: str, base_delay: float = 30.0, max_delay: float = 3600.0) -> None:
+        """
+        Initializes an empty PushOutbox instance.
+
+        :param path: The path of the json file of the outbox.
+        :param base_delay: The seconds before the first retry.
+        :param max_delay: The most seconds between two retries.
+        """
+        self.PATH: Final[str] = path
+        self.BASE_DELAY: Final[float] = base_delay
+        self.MAX_DELAY: Final[float] = max_delay
+        self.commits: List[Dict[str, str]] = []
+        """
+        The message and commit time of every pending commit, oldest first.
+        """
+        self.attempts: int = 0
+        """
+        The failed push attempts since the last successful push.
+        """
+        self.next_attempt: Optional[float] = None
+        """
+        The unix time of the next retry, or None when no retry is scheduled.
+        """
+        self.last_error: Optional[str] = None
+        self.last_push: Optional[float] = None
+
+    @property
+    def pending(self) -> bool:
+        """True when there are commits that still have to be pushed."""
+        return bool(self.commits)
+
+    def add(self, message: str, now: float) -> None:
+        """
+        Records a commit that was made locally.
+
+        :param message: The commit message.
+        :param now: The current unix time.
+        """
+        self.commits.append(
+            {"message": message, "committed": datetime.fromtimestamp(now, timezone.utc).isoformat()}
+        )
+
+    def is_due(self, now: float) -> bool:
+        """Returns True when pending commits may be pushed, because no retry is waiting."""
+        return self.pending and (self.next_attempt is None or self.next_attempt <= now)
+
+    def record_failure(self, error: str, now: float) -> float:
+        """
+        Records a failed push and schedules the next retry.
+
+        :param error: Why the push failed.
+        :param now: The current unix time.
+        :returns: The seconds until the next retry.
+        """
+        self.attempts += 1
+        self.last_error = error
+        delay = min(self.MAX_DELAY, self.BASE_DELAY * 2 ** (self.attempts - 1))
+        delay = random.uniform(delay / 2, delay)
+        self.next_attempt = now + delay
+        return delay
+
+    def record_success(self, now: float) -> None:
+        """
+        Records that every pending commit was pushed.
+
+        :param now: The current unix time.
+        """
+        self.commits.clear()
+        self.attempts = 0
+        self.next_attempt = None
+        self.last_error = None
+        self.last_push = now
+
+    def status(self, now: float) -> str:
+        """Describes the pending commits and the retries as a message."""
+        last_push = (
+            datetime.fromtimestamp(self.last_push, timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+            if self.last_push is not None
+            else "never (since the outbox was created)"
+        )
+        if not self.pending:
+            return f"No commits waiting to be pushed. Last push: {last_push}"
+
+        lines = [
+            f"Commits waiting to be pushed: {len(self.commits)},"
+            f" the oldest from {self.commits[0]['committed']}",
+            f"Failed attempts: {self.attempts}",
+        ]
+        if self.next_attempt is not None:
+            lines.append(f"Next attempt in {max(self.next_attempt - now, 0):.0f}s")
+        if self.last_error:
+            lines.append(f"Last error: {self.last_error}")
+        lines.append(f"Last push: {last_push}")
+        return "\n".join(lines)
+
+    def load(self) -> None:
+        """Loads the outbox from its json file, when it exists."""
+        if not os.path.exists(self.PATH):
+            return
+
+        with open(self.PATH, "r") as outbox_file:
+            outbox = json.load(outbox_file)
+        self.commits = outbox["commits"]
+        self.attempts = outbox["attempts"]
+        self.next_attempt = outbox["next_attempt"]
+        self.last_error = outbox["last_error"]
+        self.last_push = outbox["last_push"]
+
+    def dumps(self) -> bytes:
+        """Returns the json of the outbox, to be written with `save`."""
+        return json.dumps(
+            {
+                "commits": self.commits,
+                "attempts": self.attempts,
+                "next_attempt": self.next_attempt,
+                "last_error": self.last_error,
+                "last_push": self.last_push,
+            }
+        ).encode()
+
+    def save(self, outbox_json: bytes) -> None:
+        """
+        Writes the json of the outbox to its file.
+
+        :param outbox_json: The json that was returned by `dumps`.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.PATH)), exist_ok=True)
+        atomic_write(self.PATH, outbox_json)
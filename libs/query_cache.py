@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from typing import Final, List, Optional, Tuple
+
+from libs.bm25_index import tokenize
+
+"""
+This module contains the in-memory cache of the "source that" searches of the SourceCog.
+"""
+
+SearchResult = List[Tuple[str, str, float]]
+"""
+The file path, text and similarity of the best matching chunks, best first.
+"""
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalizes the text of a query, so messages that only differ in case, punctuation or spacing
+    share a cache entry.
+    """
+    return " ".join(tokenize(text))
+
+
+class SourceQueryCache:
+    """
+    A bounded LRU cache of search results, keyed by the normalized text of the query.
+
+    The results depend on the info command files, so the whole cache is invalidated when they
+    change. A search that started before an invalidation can't add its (possibly outdated) result
+    afterwards: `put` is passed the `generation` of the cache when the search started, and is
+    ignored when the cache was invalidated since.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        """
+        Initializes a SourceQueryCache instance.
+
+        :param max_entries: The maximum number of search results in the cache.
+        """
+        self.MAX_ENTRIES: Final[int] = max_entries
+        self.results: Final[OrderedDict[str, SearchResult]] = OrderedDict()
+        self.generation: int = 0
+        """
+        The number of invalidations of the cache.
+        """
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, query: str) -> Optional[SearchResult]:
+        """
+        Returns the cached result of a query, or None when it isn't cached. A search that found
+        nothing is cached as an empty result.
+
+        :param query: The normalized text of the query.
+        """
+        result = self.results.get(query)
+        if result is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.results.move_to_end(query)
+        return result
+
+    def put(self, query: str, result: SearchResult, generation: int) -> None:
+        """
+        Adds a search result to the cache, evicting the least recently used result when the cache
+        is full.
+
+        :param query: The normalized text of the query.
+        :param result: The result of the search.
+        :param generation: The generation of the cache when the search started.
+        """
+        if self.MAX_ENTRIES <= 0 or generation != self.generation:
+            return
+
+        self.results[query] = result
+        self.results.move_to_end(query)
+        while len(self.results) > self.MAX_ENTRIES:
+            self.results.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Removes every result, because the info command files changed."""
+        self.results.clear()
+        self.generation += 1
+
+    def metrics(self) -> str:
+        """
+        Returns a human readable summary of the cache metrics.
+        """
+        lookups = self.hits + self.misses
+        hit_rate = 100 * self.hits / lookups if lookups else 0.0
+        return (
+            f"Source query cache: {len(self.results)}/{self.MAX_ENTRIES} queries,"
+            f" {self.hits} hits, {self.misses} misses ({hit_rate:.0f}% hit rate),"
+            f" {self.generation} invalidations"
+        )
@@ -0,0 +1,98 @@
+import os
+import threading
+import zlib
+from typing import Final, Iterator, Set, Tuple
+
+"""
+This module contains the resolver of the paths of per-user data files, which fans the files out
+into subdirectories.
+"""
+
+
+class ShardedPathResolver:
+    """
+    Resolves the path of a per-user data file inside of a shard directory, so no directory grows
+    with the number of users. A file of the user 123456789 goes into `<root>/89/`, the last two
+    digits of the Discord ID, which are spread evenly. Names that don't end in two digits are
+    spread by a hash.
+
+    Data directories of older versions keep every file in the root directory. Those files are
+    moved into their shard the first time they are accessed, so the migration needs no downtime.
+    The root directory is scanned once for them when the resolver is created, so a resolved path
+    costs no extra file system call once a file has been moved.
+    """
+
+    SHARDS: Final[int] = 100
+    """
+    The number of shard directories.
+    """
+
+    def __init__(self, root: str) -> None:
+        """
+        Initializes a ShardedPathResolver instance.
+
+        :param root: The data directory.
+        """
+        self.ROOT: Final[str] = root
+        os.makedirs(self.ROOT, exist_ok=True)
+        self.legacy_files: Final[Set[str]] = {
+            entry.name for entry in os.scandir(self.ROOT) if entry.is_file()
+        }
+        """
+        The files in the root directory that have not been moved into their shard yet.
+        """
+        self.migration_lock: Final[threading.Lock] = threading.Lock()
+        self.shard_directories: Final[Set[str]] = set()
+        """
+        The shard directories that are known to exist.
+        """
+
+    @staticmethod
+    def shard(user_id: str) -> str:
+        """Returns the shard directory name of a user."""
+        if len(user_id) >= 2 and user_id[-2:].isdigit():
+            return user_id[-2:]
+        return f"{zlib.crc32(user_id.encode()) % ShardedPathResolver.SHARDS:02d}"
+
+    def resolve(self, user_id: str, file_name: str) -> str:
+        """
+        Returns the path of a data file of a user, and moves the file out of the root directory
+        when it is still there.
+
+        :param user_id: The Discord user ID.
+        :param file_name: The name of the file, for example `<user_id>.csv`.
+        """
+        shard_directory = os.path.join(self.ROOT, self.shard(user_id))
+        if shard_directory not in self.shard_directories:
+            os.makedirs(shard_directory, exist_ok=True)
+            self.shard_directories.add(shard_directory)
+
+        path = os.path.join(shard_directory, file_name)
+        if file_name in self.legacy_files:
+            with self.migration_lock:
+                if file_name in self.legacy_files:
+                    legacy_path = os.path.join(self.ROOT, file_name)
+                    # A file that was already moved by an earlier run is newer than a copy of it
+                    # in the root directory, which is then left alone.
+                    if os.path.exists(legacy_path) and not os.path.exists(path):
+                        os.replace(legacy_path, path)
+                    self.legacy_files.discard(file_name)
+        return path
+
+    def legacy_path(self, path: str) -> str:
+        """Returns the path a file had in the root directory, before it was moved into its shard."""
+        return os.path.join(self.ROOT, os.path.basename(path))
+
+    def files(self) -> Iterator[Tuple[str, str]]:
+        """
+        Lists the data files of all users, in the shards and in the root directory.
+
+        :returns: The name and path of every file.
+        """
+        for entry in os.scandir(self.ROOT):
+            if entry.is_file():
+                yield entry.name, entry.path
+            elif entry.is_dir() and len(entry.name) == 2 and entry.name.isdigit():
+                for shard_entry in os.scandir(entry.path):
+                    if shard_entry.is_file():
+                        yield shard_entry.name, shard_entry.path
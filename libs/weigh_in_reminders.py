@@ -0,0 +1,185 @@
+import heapq
+import json
+import os
+from datetime import datetime, time, timedelta
+from typing import Any, Dict, Final, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from libs.file_utils import atomic_write
+
+"""
+This module contains the schedule of the weigh-in reminders of the WeightCog.
+"""
+
+REMINDER_FREQUENCIES: Final[List[str]] = ["daily", "weekly"]
+
+
+class ReminderSubscription:
+    """
+    The weigh-in reminder a user subscribed to.
+    """
+
+    def __init__(
+        self, channel_id: int, frequency: str, local_time: time, timezone: str, weekday: int
+    ) -> None:
+        """
+        Initializes a ReminderSubscription instance.
+
+        :param channel_id: The ID of the channel the reminder is sent to.
+        :param frequency: "daily" or "weekly".
+        :param local_time: The time of the reminder in the timezone of the user.
+        :param timezone: The IANA timezone of the user, for example "Europe/Amsterdam".
+        :param weekday: The weekday of a weekly reminder, with Monday as 0.
+        """
+        self.channel_id: Final[int] = channel_id
+        self.frequency: Final[str] = frequency
+        self.local_time: Final[time] = local_time
+        self.timezone: Final[ZoneInfo] = ZoneInfo(timezone)
+        self.weekday: Final[int] = weekday
+
+    def next_due(self, after: datetime) -> datetime:
+        """
+        Returns the first time the reminder is due after a point in time.
+
+        The days are counted in the timezone of the user, so the reminder stays at the same local
+        time when daylight saving time starts or ends.
+
+        :param after: A timezone aware point in time.
+        """
+        local_after = after.astimezone(self.timezone)
+        day = local_after.date()
+        while True:
+            due = datetime.combine(day, self.local_time, tzinfo=self.timezone)
+            if due > local_after and (self.frequency == "daily" or day.weekday() == self.weekday):
+                return due
+            day += timedelta(days=1)
+
+    def to_json(self) -> List[Any]:
+        """Returns the subscription as a json list."""
+        return [
+            self.channel_id,
+            self.frequency,
+            self.local_time.strftime("%H:%M"),
+            self.timezone.key,
+            self.weekday,
+        ]
+
+    @classmethod
+    def from_json(cls, value: List[Any]) -> "ReminderSubscription":
+        """Creates a subscription from a json list that was created by `to_json`."""
+        channel_id, frequency, local_time, timezone, weekday = value
+        return cls(
+            channel_id, frequency, datetime.strptime(local_time, "%H:%M").time(), timezone, weekday
+        )
+
+
+class ReminderSchedule:
+    """
+    Keeps the subscriptions of all users and the time each reminder is due next.
+
+    The due times are kept in a min-heap, so the scheduler only has to look at the top of the heap
+    to know how long it can sleep, and taking out the reminders that are due costs O(log n) each,
+    no matter how many users subscribed.
+
+    Changing or cancelling a subscription doesn't search the heap. The current due time of every
+    user is kept next to the heap, and heap entries that don't match it anymore are dropped when
+    they reach the top.
+
+    Only the subscriptions are persisted. The due times are computed again when the schedule is
+    loaded, so reminders that were due while the bot was offline are not sent late.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Initializes a ReminderSchedule instance.
+
+        :param path: The path of the json file of the subscriptions.
+        """
+        self.PATH: Final[str] = path
+        self.subscriptions: Final[Dict[str, ReminderSubscription]] = {}
+        self.due_times: Final[Dict[str, datetime]] = {}
+        self.heap: List[Tuple[datetime, str]] = []
+
+    def subscribe(self, user_id: str, subscription: ReminderSubscription, now: datetime) -> None:
+        """
+        Adds or replaces the subscription of a user.
+
+        :param user_id: The Discord user ID.
+        :param subscription: The new subscription.
+        :param now: The current, timezone aware time.
+        """
+        self.subscriptions[user_id] = subscription
+        self.schedule(user_id, subscription.next_due(now))
+
+    def unsubscribe(self, user_id: str) -> bool:
+        """
+        Cancels the subscription of a user.
+
+        :param user_id: The Discord user ID.
+        :returns: False when the user wasn't subscribed.
+        """
+        self.due_times.pop(user_id, None)
+        return self.subscriptions.pop(user_id, None) is not None
+
+    def schedule(self, user_id: str, due: datetime) -> None:
+        """Sets the time the reminder of a user is due next."""
+        self.due_times[user_id] = due
+        heapq.heappush(self.heap, (due, user_id))
+        # Cancelled entries are dropped lazily, so they can only pile up with many changes.
+        if len(self.heap) > 2 * len(self.due_times) + 64:
+            self.heap = [(due, user_id) for user_id, due in self.due_times.items()]
+            heapq.heapify(self.heap)
+
+    def next_due(self) -> Optional[datetime]:
+        """Returns the time the next reminder is due, or None when nobody is subscribed."""
+        while self.heap and self.due_times.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now: datetime) -> List[Tuple[str, datetime]]:
+        """
+        Takes out the reminders that are due and schedules their next reminder.
+
+        :param now: The current, timezone aware time.
+        :returns: The user IDs with the time their reminder was due, in the order they were due.
+        """
+        due_reminders = []
+        while True:
+            due = self.next_due()
+            if due is None or due > now:
+                return due_reminders
+            _, user_id = heapq.heappop(self.heap)
+            due_reminders.append((user_id, due))
+            self.schedule(user_id, self.subscriptions[user_id].next_due(now))
+
+    def load(self, now: datetime) -> None:
+        """
+        Loads the subscriptions from their json file, when it exists.
+
+        :param now: The current, timezone aware time.
+        """
+        if not os.path.exists(self.PATH):
+            return
+
+        with open(self.PATH, "r") as subscriptions_file:
+            subscriptions = json.load(subscriptions_file)
+        for user_id, subscription in subscriptions.items():
+            self.subscribe(user_id, ReminderSubscription.from_json(subscription), now)
+
+    def dumps(self) -> bytes:
+        """Returns the json of the subscriptions, to be written with `save`."""
+        return json.dumps(
+            {
+                user_id: subscription.to_json()
+                for user_id, subscription in self.subscriptions.items()
+            }
+        ).encode()
+
+    def save(self, subscriptions_json: bytes) -> None:
+        """
+        Writes the json of the subscriptions to their file.
+
+        :param subscriptions_json: The json that was returned by `dumps`.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.PATH)), exist_ok=True)
+        atomic_write(self.PATH, subscriptions_json)
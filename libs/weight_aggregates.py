@@ -0,0 +1,261 @@
+import bisect
+import json
+import os
+from collections import Counter
+from datetime import date
+from typing import Any, Dict, Final, List, Optional
+
+import numpy as np
+
+from libs.file_utils import atomic_write
+
+"""
+This module contains the index of the server-wide weight statistics of the WeightCog.
+"""
+
+
+class UserSummary:
+    """
+    The numbers of a single user that the server statistics are aggregated from.
+    """
+
+    def __init__(
+        self,
+        last_logged: date,
+        first_weight: float,
+        last_weight: float,
+        weekly_change: Optional[float],
+    ) -> None:
+        """
+        Initializes a UserSummary instance.
+
+        :param last_logged: The date of the last weight entry.
+        :param first_weight: The weight of the first entry.
+        :param last_weight: The weight of the last entry.
+        :param weekly_change: The change from a week before the last entry to the last entry, or
+                              None when there is no entry 7 to 14 days before the last entry.
+        """
+        self.last_logged: Final[date] = last_logged
+        self.first_weight: Final[float] = first_weight
+        self.last_weight: Final[float] = last_weight
+        self.weekly_change: Final[Optional[float]] = weekly_change
+
+    @property
+    def total_change(self) -> float:
+        """The change from the first to the last weight entry."""
+        return self.last_weight - self.first_weight
+
+    @classmethod
+    def from_arrays(cls, ordinals: np.ndarray, weights: np.ndarray) -> Optional["UserSummary"]:
+        """
+        Summarizes the weight series of a user.
+
+        :param ordinals: The sorted, unique day ordinals of the entries.
+        :param weights: The weights of the entries.
+        :returns: The summary, or None when the series is empty.
+        """
+        if len(ordinals) == 0:
+            return None
+
+        last_ordinal = int(ordinals[-1])
+        week_before = np.searchsorted(ordinals, last_ordinal - 7, side="right") - 1
+        weekly_change = None
+        if week_before >= 0 and ordinals[week_before] >= last_ordinal - 14:
+            weekly_change = float(weights[-1] - weights[week_before])
+        return cls(
+            date.fromordinal(last_ordinal), float(weights[0]), float(weights[-1]), weekly_change
+        )
+
+    def to_json(self) -> List[Any]:
+        """Returns the summary as a json list."""
+        return [
+            self.last_logged.isoformat(),
+            self.first_weight,
+            self.last_weight,
+            self.weekly_change,
+        ]
+
+    @classmethod
+    def from_json(cls, value: List[Any]) -> "UserSummary":
+        """Creates a summary from a json list that was created by `to_json`."""
+        last_logged, first_weight, last_weight, weekly_change = value
+        return cls(date.fromisoformat(last_logged), first_weight, last_weight, weekly_change)
+
+
+class WeightAggregateIndex:
+    """
+    Keeps the server-wide weight statistics up to date while users add and remove weights.
+
+    Every user contributes a `UserSummary`. When a summary changes, the old contribution is taken
+    out of the aggregates and the new contribution is added, so a statistic never has to scan the
+    weight data of all users:
+
+    - The number of users whose last entry is on a date, so the active loggers of the last week are
+      the sum of 7 counters.
+    - The weekly changes of all users as a sorted list, so the median is its middle element.
+    - The running sums of the weight lost and gained.
+
+    Only the summaries are persisted. The aggregates are derived from them when the index is
+    loaded, which also resets any rounding drift of the running sums.
+
+    The index is saved as a periodic checkpoint, and when the bot stops. A checkpoint records that
+    the bot was still running, so after a crash the index is known to miss the changes since the
+    last checkpoint, and is rebuilt.
+
+    A rebuild from the weight data processes the users one by one. The users that are still left
+    are persisted with every checkpoint, so a rebuild that is interrupted by a restart resumes
+    where it stopped.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Initializes a WeightAggregateIndex instance.
+
+        :param path: The path of the json file of the index.
+        """
+        self.PATH: Final[str] = path
+        self.summaries: Final[Dict[str, UserSummary]] = {}
+        self.last_logged_counts: Final[Counter] = Counter()
+        self.weekly_changes: Final[List[float]] = []
+        self.total_lost: float = 0.0
+        self.total_gained: float = 0.0
+        self.rebuild_pending: Optional[List[str]] = None
+        """
+        The users that a rebuild still has to summarize, or None when no rebuild is running.
+        """
+        self.saved_at_shutdown: bool = True
+        """
+        False when the loaded index is a checkpoint of a bot that didn't stop cleanly, so it may
+        miss the changes after the checkpoint.
+        """
+
+    def update(self, user_id: str, summary: Optional[UserSummary]) -> None:
+        """
+        Replaces the summary of a user.
+
+        :param user_id: The Discord user ID.
+        :param summary: The new summary, or None when the user doesn't have weight data anymore.
+        """
+        old_summary = self.summaries.pop(user_id, None)
+        if old_summary is not None:
+            self.add_contribution(old_summary, -1)
+        if summary is not None:
+            self.summaries[user_id] = summary
+            self.add_contribution(summary, 1)
+
+    def add_contribution(self, summary: UserSummary, sign: int) -> None:
+        """Adds (sign 1) or removes (sign -1) the contribution of a summary to the aggregates."""
+        last_logged = summary.last_logged.toordinal()
+        self.last_logged_counts[last_logged] += sign
+        if self.last_logged_counts[last_logged] == 0:
+            del self.last_logged_counts[last_logged]
+
+        weekly_change = summary.weekly_change
+        if weekly_change is not None:
+            if sign > 0:
+                bisect.insort(self.weekly_changes, weekly_change)
+            else:
+                del self.weekly_changes[bisect.bisect_left(self.weekly_changes, weekly_change)]
+
+        if summary.total_change < 0:
+            self.total_lost -= sign * summary.total_change
+        else:
+            self.total_gained += sign * summary.total_change
+
+    def active_users(self, today: date, days: int = 7) -> int:
+        """
+        Returns the number of users that logged their weight during the last days.
+
+        :param today: The last day to count.
+        :param days: The number of days to count, including today.
+        """
+        first_ordinal = today.toordinal() - days + 1
+        return sum(self.last_logged_counts[first_ordinal + day] for day in range(days))
+
+    def median_weekly_change(self) -> Optional[float]:
+        """Returns the median weekly change of the users, or None when nobody has one."""
+        count = len(self.weekly_changes)
+        if count == 0:
+            return None
+        middle = count // 2
+        if count % 2:
+            return self.weekly_changes[middle]
+        return (self.weekly_changes[middle - 1] + self.weekly_changes[middle]) / 2
+
+    def start_rebuild(self, user_ids: List[str]) -> None:
+        """
+        Starts a rebuild of the index. Users without weight data are removed right away, the other
+        users are summarized by the rebuild.
+
+        :param user_ids: The IDs of all users that have weight data.
+        """
+        for user_id in set(self.summaries) - set(user_ids):
+            self.update(user_id, None)
+        self.rebuild_pending = sorted(user_ids, reverse=True)
+
+    def load(self) -> bool:
+        """
+        Loads the index from its json file.
+
+        :returns: False when there is no index file yet.
+        """
+        if not os.path.exists(self.PATH):
+            return False
+
+        with open(self.PATH, "r") as index_file:
+            index = json.load(index_file)
+        for user_id, summary in index["summaries"].items():
+            self.update(user_id, UserSummary.from_json(summary))
+        self.rebuild_pending = index.get("rebuild_pending")
+        # Files of older versions were saved with every change.
+        self.saved_at_shutdown = index.get("saved_at_shutdown", True)
+        return True
+
+    def dumps(self, saved_at_shutdown: bool = False) -> bytes:
+        """
+        Returns the json of the index, to be written with `save`.
+
+        :param saved_at_shutdown: True for the last save before the bot stops, False for a
+                                  checkpoint.
+        """
+        return json.dumps(
+            {
+                "summaries": {
+                    user_id: summary.to_json() for user_id, summary in self.summaries.items()
+                },
+                "rebuild_pending": self.rebuild_pending,
+                "saved_at_shutdown": saved_at_shutdown,
+            }
+        ).encode()
+
+    def save(self, index_json: bytes) -> None:
+        """
+        Writes the json of the index to its file.
+
+        The json is created separately with `dumps`, so the index can be serialized on the event
+        loop and written in a thread.
+
+        :param index_json: The json that was returned by `dumps`.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.PATH)), exist_ok=True)
+        atomic_write(self.PATH, index_json)
+
+    def report(self, today: date) -> str:
+        """
+        Returns the server statistics as a message.
+
+        :param today: The current date.
+        """
+        median = self.median_weekly_change()
+        lines = [
+            f"Users tracking their weight: {len(self.summaries)}",
+            f"Active loggers this week: {self.active_users(today)}",
+            "Median weekly change: "
+            + ("n/a" if median is None else f"{median:+.1f} kg")
+            + f" ({len(self.weekly_changes)} users)",
+            f"Total kg lost: {self.total_lost:.1f} kg (net change:"
+            f" {self.total_gained - self.total_lost:+.1f} kg)",
+        ]
+        if self.rebuild_pending:
+            lines.append(f"Rebuilding the statistics: {len(self.rebuild_pending)} users left.")
+        return "\n".join(lines)
@@ -0,0 +1,112 @@
+import tempfile
+import zipfile
+from typing import IO, Final, Optional
+
+"""
+This module contains the zip archive writer of the `.export_all` command.
+"""
+
+
+class ZipExportWriter:
+    """
+    Writes files into a series of zip archives that each stay under a size limit, for example the
+    upload limit of a Discord server.
+
+    Only one archive is open at a time. It is written to a spooled temporary file, which stays in
+    memory while it is small and moves to disk once it grows beyond `spool_bytes`. An archive is
+    handed out as soon as the next file doesn't fit anymore, so it can be sent and closed before
+    the next archive is written.
+    """
+
+    CHUNK_SIZE: Final[int] = 64 * 1024
+    """
+    The number of bytes that are compressed at once.
+    """
+
+    END_OF_ARCHIVE_BYTES: Final[int] = 22
+    """
+    The size of the end of central directory record of an archive.
+    """
+
+    def __init__(self, max_archive_bytes: int, spool_bytes: int = 8 * 1024 * 1024) -> None:
+        """
+        Initializes a ZipExportWriter instance.
+
+        :param max_archive_bytes: The maximum size of an archive.
+        :param spool_bytes: The size up to which an archive is kept in memory.
+        """
+        self.MAX_ARCHIVE_BYTES: Final[int] = max_archive_bytes
+        self.SPOOL_BYTES: Final[int] = spool_bytes
+        self.archive_file: Optional[IO[bytes]] = None
+        self.archive: Optional[zipfile.ZipFile] = None
+        self.central_directory_bytes: int = 0
+        """
+        The size of the central directory that is written when the archive is closed.
+        """
+
+    @staticmethod
+    def max_entry_bytes(file_name: str, size: int) -> int:
+        """
+        Returns the most bytes a file can take up in an archive, including its headers. Deflate
+        never grows incompressible data by more than a few bytes per block.
+        """
+        local_header = 30 + len(file_name.encode())
+        data_descriptor = 16
+        return local_header + size + size // 1000 + 64 + data_descriptor
+
+    @staticmethod
+    def central_directory_entry_bytes(file_name: str) -> int:
+        """Returns the size of the central directory entry of a file."""
+        return 46 + len(file_name.encode())
+
+    def add(self, file_name: str, data: bytes) -> Optional[IO[bytes]]:
+        """
+        Adds a file to the current archive. When the file doesn't fit into the current archive,
+        the current archive is finished and the file is added to a new archive.
+
+        A single file that is larger than the limit gets an archive of its own, which is larger
+        than the limit.
+
+        :param file_name: The name of the file inside of the archive.
+        :param data: The content of the file.
+        :returns: The finished archive, positioned at its start, or None when the file fit into
+                  the current archive.
+        """
+        finished_archive = None
+        if self.archive is not None:
+            archive_bytes = (
+                self.archive_file.tell()
+                + self.central_directory_bytes
+                + self.central_directory_entry_bytes(file_name)
+                + ZipExportWriter.END_OF_ARCHIVE_BYTES
+                + self.max_entry_bytes(file_name, len(data))
+            )
+            if archive_bytes > self.MAX_ARCHIVE_BYTES:
+                finished_archive = self.finish()
+
+        if self.archive is None:
+            self.archive_file = tempfile.SpooledTemporaryFile(max_size=self.SPOOL_BYTES)
+            self.archive = zipfile.ZipFile(self.archive_file, "w", zipfile.ZIP_DEFLATED)
+            self.central_directory_bytes = 0
+
+        with self.archive.open(file_name, "w") as entry:
+            for offset in range(0, len(data), ZipExportWriter.CHUNK_SIZE):
+                entry.write(data[offset : offset + ZipExportWriter.CHUNK_SIZE])
+        self.central_directory_bytes += self.central_directory_entry_bytes(file_name)
+        return finished_archive
+
+    def finish(self) -> Optional[IO[bytes]]:
+        """
+        Finishes the current archive.
+
+        :returns: The archive, positioned at its start, or None when no file has been added since
+                  the last archive was finished.
+        """
+        if self.archive is None:
+            return None
+
+        self.archive.close()
+        archive_file = self.archive_file
+        archive_file.seek(0)
+        self.archive, self.archive_file = None, None
+        return archive_file
@@ -0,0 +1,170 @@
+import csv
+import json
+import math
+from datetime import date
+from typing import Any, Dict, Final, List, Optional
+
+from libs.weight_repository import WeightEntry, parse_csv_date
+
+"""
+This module contains the parser of the weight files that users import with `.import_weights`.
+"""
+
+MAX_WEIGHT_KG: Final[float] = 1000.0
+"""
+The highest weight that is accepted as a valid weight.
+"""
+
+
+class WeightImportParser:
+    """
+    Validates the rows of an imported weight file while it is being downloaded.
+
+    Two formats are supported:
+
+    - csv: A `date,weight` row per line, with an optional header row.
+    - json: A list of `{"date": ..., "weight": ...}` objects or `[date, weight]` pairs, or an
+      object that maps dates to weights.
+
+    Csv rows are validated as soon as their line is complete, so the file is never held in memory
+    as a whole. Json can't be validated before the document is complete, so it is buffered.
+    Invalid rows are skipped and counted. When a date occurs more than once, the last row wins.
+    """
+
+    MAX_REPORTED_ERRORS: Final[int] = 5
+    """
+    The number of invalid rows that are described in `errors`.
+    """
+
+    def __init__(self, file_format: str) -> None:
+        """
+        Initializes a WeightImportParser instance.
+
+        :param file_format: The format of the file, "csv" or "json".
+        """
+        if file_format not in ("csv", "json"):
+            raise ValueError(f"Unsupported import format: {file_format}.")
+        self.FILE_FORMAT: Final[str] = file_format
+        self.entries: Final[Dict[date, float]] = {}
+        self.rows: int = 0
+        self.invalid_rows: int = 0
+        self.errors: Final[List[str]] = []
+        self.buffer: bytes = b""
+        """
+        The incomplete last line of a csv file.
+        """
+        self.json_chunks: Final[List[bytes]] = []
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        Parses the next chunk of the file.
+
+        :param chunk: The bytes of the chunk. A chunk may end in the middle of a line.
+        """
+        if self.FILE_FORMAT == "json":
+            self.json_chunks.append(chunk)
+            return
+
+        *lines, self.buffer = (self.buffer + chunk).split(b"\n")
+        for line in lines:
+            self.parse_csv_line(line)
+
+    def finish(self) -> List[WeightEntry]:
+        """
+        Parses the rest of the file.
+
+        :returns: The valid entries, sorted by date.
+        """
+        if self.FILE_FORMAT == "csv":
+            self.parse_csv_line(self.buffer)
+        else:
+            self.parse_json(b"".join(self.json_chunks))
+            self.json_chunks.clear()
+        self.buffer = b""
+        return sorted(self.entries.items())
+
+    def parse_csv_line(self, line: bytes) -> None:
+        """Validates a line of a csv file."""
+        try:
+            text = line.decode("utf-8-sig").strip()
+        except UnicodeDecodeError:
+            self.rows += 1
+            self.add_error("not valid UTF-8")
+            return
+        if not text:
+            return
+
+        self.rows += 1
+        fields = next(csv.reader([text]))
+        is_first_row = self.rows == 1
+        if len(fields) < 2:
+            self.add_error(f"expected a date and a weight, got `{text[:40]}`")
+            return
+        if is_first_row and not any(character.isdigit() for character in fields[0]):
+            # A header row.
+            self.rows -= 1
+            return
+        self.add_row(fields[0], fields[1])
+
+    def parse_json(self, document: bytes) -> None:
+        """Validates the rows of a json document."""
+        try:
+            rows: Any = json.loads(document)
+        except (UnicodeDecodeError, json.JSONDecodeError) as error:
+            self.add_error(f"not valid json ({error})")
+            return
+
+        if isinstance(rows, dict):
+            rows = list(rows.items())
+        if not isinstance(rows, list):
+            self.add_error("expected a list of weights")
+            return
+
+        for row in rows:
+            self.rows += 1
+            if isinstance(row, dict) and "date" in row and "weight" in row:
+                self.add_row(row["date"], row["weight"])
+            elif isinstance(row, (list, tuple)) and len(row) == 2:
+                self.add_row(*row)
+            else:
+                self.add_error(f"expected a date and a weight, got `{str(row)[:40]}`")
+
+    def add_row(self, date_value: Any, weight_value: Any) -> None:
+        """Validates a date and a weight, and adds them when they are valid."""
+        entry_date = self.validate_date(date_value)
+        weight = self.validate_weight(weight_value)
+        if entry_date is None:
+            self.add_error(f"invalid date `{str(date_value)[:20]}`")
+        elif weight is None:
+            self.add_error(f"invalid weight `{str(weight_value)[:20]}`")
+        else:
+            self.entries[entry_date] = weight
+
+    @staticmethod
+    def validate_date(date_value: Any) -> Optional[date]:
+        """Returns the date of a YYYY-MM-DD string, or None when it isn't a valid date."""
+        if not isinstance(date_value, str):
+            return None
+        try:
+            return parse_csv_date(date_value.strip())
+        except ValueError:
+            return None
+
+    @staticmethod
+    def validate_weight(weight_value: Any) -> Optional[float]:
+        """Returns the weight of a number or a numeric string, or None when it isn't valid."""
+        if isinstance(weight_value, bool):
+            return None
+        try:
+            weight = float(weight_value)
+        except (TypeError, ValueError):
+            return None
+        if not math.isfinite(weight) or not 0 < weight < MAX_WEIGHT_KG:
+            return None
+        return weight
+
+    def add_error(self, description: str) -> None:
+        """Counts an invalid row, and describes the first few of them."""
+        self.invalid_rows += 1
+        if len(self.errors) < WeightImportParser.MAX_REPORTED_ERRORS:
+            self.errors.append(f"row {self.rows}: {description}" if self.rows else description)
@@ -0,0 +1,159 @@
+import asyncio
+import io
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Final, Optional, Sequence
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+"""
+This module renders the weight plots of the WeightCog in a pool of worker processes.
+"""
+
+
+def render_weight_plot(
+    title: str,
+    dates: Sequence[date],
+    weights: Sequence[float],
+    moving_avg_dates: Optional[Sequence[date]] = None,
+    moving_averages: Optional[Sequence[float]] = None,
+    goal_weight: Optional[float] = None,
+    goal_label: Optional[str] = None,
+) -> bytes:
+    """
+    Renders a time series line plot of how weight changes over time, with the option to add a
+    moving average line and a goal line.
+
+    The plot is drawn on its own `Figure` with an Agg canvas instead of the global pyplot state, so
+    it is safe to call from any thread or process.
+
+    :param title: The title of the plot.
+    :param dates: The dates of the weight entries.
+    :param weights: The weights of the weight entries.
+    :param moving_avg_dates: The dates of the moving averages.
+    :param moving_averages: The moving average for each date in `moving_avg_dates`.
+    :param goal_weight: The goal weight, which is drawn as a horizontal line.
+    :param goal_label: The legend label of the goal line.
+    :returns: The plot as a transparent PNG image.
+    """
+    has_moving_averages: bool = moving_averages is not None and moving_avg_dates is not None
+    has_goal: bool = goal_weight is not None
+
+    figure = Figure(figsize=(10, 6))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+
+    # Weight data
+    axes.plot(dates, weights, marker="o", color="red", linewidth=3, label="Weight")
+    if has_moving_averages:
+        axes.plot(
+            moving_avg_dates,
+            moving_averages,
+            color="white",
+            linewidth=3,
+            label="Moving Average",
+        )
+    if has_goal:
+        axes.axhline(
+            goal_weight, color="limegreen", linestyle="--", linewidth=2, label=goal_label or "Goal"
+        )
+
+    axes.set_xlabel("Date", fontsize=16, color="white")
+    axes.set_ylabel("Weight (kg)", fontsize=16, color="white")
+    axes.set_title(title, fontsize=18, color="white")
+    axes.tick_params(axis="x", labelrotation=45, labelsize=12, colors="white")
+    axes.tick_params(axis="y", labelsize=12, colors="white")
+    axes.spines["top"].set_visible(False)
+    axes.spines["right"].set_visible(False)
+    axes.spines["bottom"].set_color("white")
+    axes.spines["left"].set_color("white")
+    if has_moving_averages or has_goal:
+        axes.legend()
+    figure.tight_layout()
+
+    png_buffer = io.BytesIO()
+    figure.savefig(png_buffer, format="png", transparent=True)
+    return png_buffer.getvalue()
+
+
+class WeightPlotRenderer:
+    """
+    Renders weight plots in a pool of worker processes, so drawing a plot with years of data
+    doesn't block the event loop.
+    """
+
+    def __init__(self, max_workers: int = 2) -> None:
+        """
+        Initializes a WeightPlotRenderer instance.
+
+        :param max_workers: The number of worker processes.
+        """
+        self.MAX_WORKERS: Final[int] = max_workers
+        # Forking a process that runs threads (like the event loop and the I/O pool) can deadlock,
+        # so the workers are started with spawn.
+        self.executor: Final[ProcessPoolExecutor] = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        self.queue_depth: int = 0
+        """
+        The number of plots that are waiting for or being rendered.
+        """
+        self.max_queue_depth: int = 0
+        self.rendered_plots: int = 0
+        self.total_render_seconds: float = 0.0
+
+    async def render(
+        self,
+        title: str,
+        dates: Sequence[date],
+        weights: Sequence[float],
+        moving_avg_dates: Optional[Sequence[date]] = None,
+        moving_averages: Optional[Sequence[float]] = None,
+        goal_weight: Optional[float] = None,
+        goal_label: Optional[str] = None,
+    ) -> bytes:
+        """
+        Renders a weight plot in a worker process. See `render_weight_plot` for the parameters.
+
+        :returns: The plot as a transparent PNG image.
+        """
+        loop = asyncio.get_running_loop()
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(
+                self.executor,
+                render_weight_plot,
+                title,
+                list(dates),
+                list(weights),
+                None if moving_avg_dates is None else list(moving_avg_dates),
+                None if moving_averages is None else list(moving_averages),
+                goal_weight,
+                goal_label,
+            )
+        finally:
+            self.queue_depth -= 1
+            self.rendered_plots += 1
+            self.total_render_seconds += time.perf_counter() - start
+
+    def metrics(self) -> str:
+        """
+        Returns a human readable summary of the renderer metrics.
+        """
+        average_ms = 1000 * self.total_render_seconds / max(self.rendered_plots, 1)
+        return (
+            f"Plot renderer: {self.MAX_WORKERS} workers, queue depth {self.queue_depth}"
+            f" (max {self.max_queue_depth}), {self.rendered_plots} plots rendered"
+            f" ({average_ms:.0f} ms average)"
+        )
+
+    def close(self) -> None:
+        """
+        Stops the worker processes.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
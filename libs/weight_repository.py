@@ -0,0 +1,962 @@
+import argparse
+import csv
+import io
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import (IO, Any, Dict, Final, Hashable, Iterable, List, Optional,
+                    Tuple)
+
+import numpy as np
+
+from libs.file_utils import atomic_write, atomic_write_many, sync_files
+from libs.sharded_paths import ShardedPathResolver
+from libs.weight_stats import to_arrays
+
+"""
+This module contains the repositories that store the weight data of the WeightCog.
+
+There are three storage backends:
+
+- `CsvWeightRepository` stores one `<user_id>.csv` file per user. This is the original format of the
+  BSF-bot-data repository.
+- `SqliteWeightRepository` stores all weights in a single SQLite database that is indexed on
+  (user, date), so adding, removing and reading a range of weights doesn't depend on the length of
+  a user's history.
+- `BinaryWeightRepository` stores one `<user_id>.bin` file of fixed width binary records per user,
+  which is read through a memory map without parsing any text.
+
+Existing CSV data can be imported into a SQLite database or a binary data directory, and
+converted back into CSV files, with:
+
+    python -m libs.weight_repository <csv directory> <database path>
+    python -m libs.weight_repository --storage binary <csv directory> <binary directory>
+    python -m libs.weight_repository --storage binary --to-csv <csv directory> <binary directory>
+"""
+
+WeightEntry = Tuple[date, float]
+"""
+A single weight record of a user.
+"""
+
+DATE_FORMAT: Final[str] = "%Y-%m-%d"
+"""
+The date format of the csv files.
+"""
+
+
+class WeightRepository:
+    """
+    Base class for the storage of user weight data.
+
+    All dates are `datetime.date` objects and all weights are in kilograms. The entries of a user
+    are unique per date, so adding a weight for a date that already has a weight replaces it.
+    """
+
+    HEADER_ROW: Final[List[str]] = ["Date", "Weight"]
+    """
+    Header row of an exported weight csv file.
+    """
+
+    def upsert(self, user_id: str, entry_date: date, weight: float) -> None:
+        """
+        Adds the weight of a user for a date, or replaces it when the date already has a weight.
+
+        :param user_id: The Discord user ID.
+        :param entry_date: The date of the weight entry.
+        :param weight: The weight in kilograms.
+        """
+        self.upsert_many(user_id, [(entry_date, weight)])
+
+    def upsert_many(self, user_id: str, entries: Iterable[WeightEntry]) -> None:
+        """
+        Adds or replaces multiple weight entries of a user at once.
+
+        :param user_id: The Discord user ID.
+        :param entries: The (date, weight) entries.
+        """
+        raise NotImplementedError
+
+    def upsert_groups(self, batch: Dict[str, List[WeightEntry]]) -> Dict[str, Exception]:
+        """
+        Adds or replaces the weight entries of many users at once, like `upsert_many` for every
+        user. Repositories write the whole group with as few waits for the disk as they can.
+
+        :param batch: The (date, weight) entries of every user.
+        :returns: The error of every user whose entries couldn't be written.
+        """
+        errors = {}
+        for user_id, entries in batch.items():
+            try:
+                self.upsert_many(user_id, entries)
+            except Exception as error:
+                errors[user_id] = error
+        return errors
+
+    def remove(self, user_id: str, entry_date: date) -> Optional[float]:
+        """
+        Removes the weight of a user for a date.
+
+        :param user_id: The Discord user ID.
+        :param entry_date: The date of the weight entry to remove.
+        :returns: The removed weight, or None when the date doesn't have a weight.
+        """
+        raise NotImplementedError
+
+    def read_range(
+        self, user_id: str, start: Optional[date] = None, end: Optional[date] = None
+    ) -> List[WeightEntry]:
+        """
+        Reads the weight entries of a user inside of a date range, sorted by date.
+
+        :param user_id: The Discord user ID.
+        :param start: The first date of the range (inclusive), or None for no lower bound.
+        :param end: The last date of the range (inclusive), or None for no upper bound.
+        """
+        raise NotImplementedError
+
+    def read_arrays(
+        self, user_id: str, start: Optional[date] = None, end: Optional[date] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reads the weight entries of a user inside of a date range as int32 day ordinals and float64
+        weights, sorted by date.
+
+        :param user_id: The Discord user ID.
+        :param start: The first date of the range (inclusive), or None for no lower bound.
+        :param end: The last date of the range (inclusive), or None for no upper bound.
+        """
+        return to_arrays(self.read_range(user_id, start, end))
+
+    def has_data(self, user_id: str) -> bool:
+        """
+        Checks if a user has any weight data.
+
+        :param user_id: The Discord user ID.
+        """
+        raise NotImplementedError
+
+    def delete_user(self, user_id: str) -> bool:
+        """
+        Deletes all weight data of a user.
+
+        :param user_id: The Discord user ID.
+        :returns: True if the user had weight data.
+        """
+        raise NotImplementedError
+
+    def upsert_goal(self, user_id: str, entry_date: date, weight: float) -> None:
+        """
+        Adds a weight goal of a user for a date, or replaces the goal of that date.
+
+        :param user_id: The Discord user ID.
+        :param entry_date: The date of the goal.
+        :param weight: The goal weight in kilograms.
+        """
+        raise NotImplementedError
+
+    def read_goals(self, user_id: str) -> List[WeightEntry]:
+        """
+        Reads the weight goals of a user, sorted by date.
+
+        :param user_id: The Discord user ID.
+        """
+        raise NotImplementedError
+
+    def user_ids(self) -> List[str]:
+        """
+        Returns the IDs of all users that have weight data.
+        """
+        raise NotImplementedError
+
+    def data_paths(self, user_id: str) -> List[str]:
+        """
+        Returns the paths of the files that hold the data of a user, including the files it may
+        have been moved out of. They are marked for the next data commit when the data changes.
+        """
+        raise NotImplementedError
+
+    def checkpoint(self) -> bool:
+        """
+        Writes the data that is only in a log into the files of `data_paths`, so they can be
+        committed on their own.
+
+        :returns: False when the data couldn't be written yet, because the log is in use.
+        """
+        return True
+
+    def data_version(self, user_id: str) -> Hashable:
+        """
+        Returns a version of the weight data of a user, which changes whenever the data changes.
+        Data derived from the weights (like plots) can be cached under this version.
+
+        :param user_id: The Discord user ID.
+        """
+        raise NotImplementedError
+
+    def export_csv(self, user_id: str) -> bytes:
+        """
+        Exports the weight data of a user in the csv format.
+
+        :param user_id: The Discord user ID.
+        """
+        return entries_to_csv(self.read_range(user_id)).encode()
+
+    def close(self) -> None:
+        """
+        Releases the resources of the repository.
+        """
+
+
+def entries_to_csv(entries: Iterable[WeightEntry]) -> str:
+    """
+    Formats weight entries as csv text with a header row.
+
+    :param entries: The (date, weight) entries.
+    """
+    csv_buffer = io.StringIO()
+    csv_writer = csv.writer(csv_buffer)
+    csv_writer.writerow(WeightRepository.HEADER_ROW)
+    csv_writer.writerows((entry_date.isoformat(), weight) for entry_date, weight in entries)
+    return csv_buffer.getvalue()
+
+
+def parse_csv_date(date_text: str) -> date:
+    """
+    Parses a date of a csv file. Dates written by the bot are ISO 8601, which has a fast parser,
+    but older files can contain dates without leading zeros.
+
+    :param date_text: The date in the YYYY-MM-DD format.
+    """
+    try:
+        return date.fromisoformat(date_text)
+    except ValueError:
+        return datetime.strptime(date_text, DATE_FORMAT).date()
+
+
+def parse_csv_line(line: bytes) -> Optional[WeightEntry]:
+    """
+    Parses a line of a weight csv file.
+
+    :param line: The raw line, including the line ending.
+    :returns: The entry of the line, or None for header and empty lines.
+    """
+    fields = line.decode().strip().split(",")
+    if len(fields) < 2 or fields == WeightRepository.HEADER_ROW:
+        return None
+    return parse_csv_date(fields[0]), float(fields[1])
+
+
+def merge_entries(
+    entries: List[WeightEntry], updates: List[WeightEntry]
+) -> List[WeightEntry]:
+    """
+    Merges two lists of entries that are sorted by date and unique per date in a single pass. An
+    update replaces the entry of the same date.
+
+    :param entries: The existing entries.
+    :param updates: The added or replacing entries.
+    """
+    merged: List[WeightEntry] = []
+    index = 0
+    for update in updates:
+        while index < len(entries) and entries[index][0] < update[0]:
+            merged.append(entries[index])
+            index += 1
+        if index < len(entries) and entries[index][0] == update[0]:
+            index += 1
+        merged.append(update)
+    merged.extend(entries[index:])
+    return merged
+
+
+def read_csv_entries(csv_path: str) -> List[WeightEntry]:
+    """
+    Reads all entries of a weight csv file, skipping header rows.
+
+    :param csv_path: The path of the csv file.
+    """
+    entries: List[WeightEntry] = []
+    with open(csv_path, "r", newline="") as csv_file:
+        for row in csv.reader(csv_file):
+            if not row or row == WeightRepository.HEADER_ROW:
+                continue
+            entries.append((parse_csv_date(row[0]), float(row[1])))
+    return entries
+
+
+class CsvWeightRepository(WeightRepository):
+    """
+    Stores the weight data of every user in a separate csv file, sorted by date. The files are
+    spread over shard directories by `ShardedPathResolver`.
+
+    Every change reads and rewrites the whole file of the user. The file is replaced atomically, so
+    readers never see a partially written file.
+
+    Because the files are sorted by date, a range is read by binary searching the byte offset of
+    its first line, and only the lines inside of the range are decoded. Reading the last week
+    costs the same for a month of history as for ten years.
+
+    Older files may have been sorted as text, or edited by hand. A file is therefore read
+    completely the first time, and only binary searched once its dates turned out to be sorted.
+    Files that this class writes are sorted, so they are binary searched right away.
+    """
+
+    def __init__(self, data_path: str) -> None:
+        """
+        Initializes a CsvWeightRepository instance.
+
+        :param data_path: The directory with the user weight csv files.
+        """
+        self.DATA_PATH: Final[str] = data_path
+        self.paths: Final[ShardedPathResolver] = ShardedPathResolver(self.DATA_PATH)
+        self.sorted_files: Final[Dict[str, Hashable]] = {}
+        """
+        The version of every csv file that is known to be sorted by date, by path.
+        """
+
+    def weight_path(self, user_id: str) -> str:
+        """Returns the path of the weight csv file of a user."""
+        return self.paths.resolve(user_id, f"{user_id}.csv")
+
+    def goal_path(self, user_id: str) -> str:
+        """Returns the path of the goal weight csv file of a user."""
+        return self.paths.resolve(user_id, f"{user_id}_goal_weight.csv")
+
+    def read_file(self, csv_path: str) -> Dict[date, float]:
+        """Reads a csv file into a dictionary of weights by date."""
+        if not os.path.exists(csv_path):
+            return {}
+        return dict(read_csv_entries(csv_path))
+
+    def write_file(self, csv_path: str, weights: Dict[date, float]) -> None:
+        """Writes a dictionary of weights by date into a csv file, sorted by date."""
+        atomic_write(csv_path, entries_to_csv(sorted(weights.items())).encode())
+        self.sorted_files[csv_path] = self.file_version(os.stat(csv_path))
+
+    def merged_file(self, csv_path: str, entries: Iterable[WeightEntry]) -> bytes:
+        """
+        Returns the content of a weight csv file after new entries have been merged into it.
+
+        :param csv_path: The path of the weight csv file.
+        :param entries: The (date, weight) entries to add or replace.
+        """
+        existing = read_csv_entries(csv_path) if os.path.exists(csv_path) else []
+        if any(previous[0] >= entry[0] for previous, entry in zip(existing, existing[1:])):
+            # Files edited by hand can be unsorted or contain a date twice. They are sorted once,
+            # and stay sorted after this write.
+            existing = sorted(dict(existing).items())
+        # The file is sorted, so only the new entries have to be sorted before the merge.
+        merged = merge_entries(existing, sorted(dict(entries).items()))
+        return entries_to_csv(merged).encode()
+
+    def upsert_many(self, user_id: str, entries: Iterable[WeightEntry]) -> None:
+        csv_path = self.weight_path(user_id)
+        atomic_write(csv_path, self.merged_file(csv_path, entries))
+        self.sorted_files[csv_path] = self.file_version(os.stat(csv_path))
+
+    def upsert_groups(self, batch: Dict[str, List[WeightEntry]]) -> Dict[str, Exception]:
+        # The files of all users are replaced together, so the group waits for the disk once
+        # instead of once per user.
+        errors: Dict[str, Exception] = {}
+        files: Dict[str, bytes] = {}
+        for user_id, entries in batch.items():
+            try:
+                csv_path = self.weight_path(user_id)
+                files[csv_path] = self.merged_file(csv_path, entries)
+            except Exception as error:
+                errors[user_id] = error
+        try:
+            atomic_write_many(files)
+        except Exception as error:
+            return {user_id: errors.get(user_id, error) for user_id in batch}
+        for csv_path in files:
+            self.sorted_files[csv_path] = self.file_version(os.stat(csv_path))
+        return errors
+
+    def remove(self, user_id: str, entry_date: date) -> Optional[float]:
+        weights = self.read_file(self.weight_path(user_id))
+        removed_weight = weights.pop(entry_date, None)
+        if removed_weight is not None:
+            self.write_file(self.weight_path(user_id), weights)
+        return removed_weight
+
+    def read_range(
+        self, user_id: str, start: Optional[date] = None, end: Optional[date] = None
+    ) -> List[WeightEntry]:
+        csv_path = self.weight_path(user_id)
+        try:
+            csv_file = open(csv_path, "rb")
+        except FileNotFoundError:
+            return []
+
+        entries: List[WeightEntry] = []
+        with csv_file:
+            version = self.file_version(os.fstat(csv_file.fileno()))
+            if self.sorted_files.get(csv_path) != version:
+                return self.read_unvalidated(csv_path, csv_file, version, start, end)
+            csv_file.seek(self.seek_date(csv_file, start) if start else 0)
+            for line in csv_file:
+                entry = parse_csv_line(line)
+                if entry is None or (start and entry[0] < start):
+                    continue
+                if end and entry[0] > end:
+                    break
+                entries.append(entry)
+        return entries
+
+    def read_unvalidated(
+        self,
+        csv_path: str,
+        csv_file: IO[bytes],
+        version: Hashable,
+        start: Optional[date],
+        end: Optional[date],
+    ) -> List[WeightEntry]:
+        """
+        Reads a range of a csv file that isn't known to be sorted, by reading the whole file. A
+        file with sorted, unique dates is remembered as sorted. The entries of other files are
+        sorted in memory, and the last entry of a date wins, like in `upsert_many`.
+
+        :param csv_path: The path of the csv file.
+        :param csv_file: The csv file, opened in binary mode.
+        :param version: The version of the file, see `file_version`.
+        :param start: The first date of the range (inclusive), or None for no lower bound.
+        :param end: The last date of the range (inclusive), or None for no upper bound.
+        """
+        entries = [entry for entry in map(parse_csv_line, csv_file) if entry is not None]
+        if all(previous[0] < entry[0] for previous, entry in zip(entries, entries[1:])):
+            self.sorted_files[csv_path] = version
+        else:
+            entries = sorted(dict(entries).items())
+        return [
+            entry
+            for entry in entries
+            if (not start or entry[0] >= start) and (not end or entry[0] <= end)
+        ]
+
+    @staticmethod
+    def file_version(file_stat: os.stat_result) -> Hashable:
+        """Returns the version of a file, which changes whenever the file is replaced."""
+        return file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size
+
+    @staticmethod
+    def seek_date(csv_file: IO[bytes], target: date) -> int:
+        """
+        Binary searches the byte offset of the first line of a sorted csv file with a date on or
+        after a target date. Only O(log n) lines are decoded.
+
+        :param csv_file: The csv file, opened in binary mode.
+        :param target: The date to search for.
+        :returns: The offset of the line, or the file size when all dates are before the target.
+        """
+
+        def line_start(offset: int) -> int:
+            """Returns the offset of the first line that starts at or after an offset."""
+            if offset == 0:
+                return 0
+            csv_file.seek(offset - 1)
+            csv_file.readline()
+            return csv_file.tell()
+
+        low, high = 0, csv_file.seek(0, os.SEEK_END)
+        while low < high:
+            middle = (low + high) // 2
+            csv_file.seek(line_start(middle))
+            line = csv_file.readline()
+            # The header has no entry and sorts before every date.
+            entry = parse_csv_line(line) if line else None
+            if not line or (entry is not None and entry[0] >= target):
+                high = middle
+            else:
+                low = middle + 1
+
+        return line_start(low)
+
+    def has_data(self, user_id: str) -> bool:
+        return os.path.exists(self.weight_path(user_id))
+
+    def delete_user(self, user_id: str) -> bool:
+        if not self.has_data(user_id):
+            return False
+        os.remove(self.weight_path(user_id))
+        return True
+
+    def upsert_goal(self, user_id: str, entry_date: date, weight: float) -> None:
+        goals = self.read_file(self.goal_path(user_id))
+        goals[entry_date] = weight
+        self.write_file(self.goal_path(user_id), goals)
+
+    def read_goals(self, user_id: str) -> List[WeightEntry]:
+        return sorted(self.read_file(self.goal_path(user_id)).items())
+
+    def user_ids(self) -> List[str]:
+        return sorted(
+            {
+                file_name[:-4]
+                for file_name, _ in self.paths.files()
+                if file_name.endswith(".csv") and file_name[:-4].isdigit()
+            }
+        )
+
+    def data_paths(self, user_id: str) -> List[str]:
+        paths = [self.weight_path(user_id), self.goal_path(user_id)]
+        return paths + [self.paths.legacy_path(path) for path in paths]
+
+    def data_version(self, user_id: str) -> Hashable:
+        # Files are replaced on every change, so this also notices changes made outside of the bot.
+        try:
+            return self.file_version(os.stat(self.weight_path(user_id)))
+        except FileNotFoundError:
+            return None
+
+    def export_csv(self, user_id: str) -> bytes:
+        with open(self.weight_path(user_id), "rb") as csv_file:
+            return csv_file.read()
+
+
+class SqliteWeightRepository(WeightRepository):
+    """
+    Stores the weight data of all users in a SQLite database.
+
+    The weights are stored in a table with the primary key (user_id, date), so upserts, deletes and
+    range queries are O(log n) lookups in the index. The database runs in WAL mode, so reads don't
+    block on writes. The data commit only stages the database file, so it runs `checkpoint` to copy
+    the write-ahead log into it first.
+    """
+
+    SCHEMA: Final[str] = """
+        CREATE TABLE IF NOT EXISTS weights (
+            user_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            weight REAL NOT NULL,
+            PRIMARY KEY (user_id, date)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS goal_weights (
+            user_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            weight REAL NOT NULL,
+            PRIMARY KEY (user_id, date)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS data_versions (
+            user_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        ) WITHOUT ROWID;
+    """
+    """
+    The tables of the database. Dates are stored as ISO 8601 text, which sorts chronologically.
+    """
+
+    def __init__(self, database_path: str) -> None:
+        """
+        Initializes a SqliteWeightRepository instance.
+
+        :param database_path: The path of the SQLite database. It is created if it doesn't exist.
+        """
+        self.DATABASE_PATH: Final[str] = database_path
+        Path(database_path).parent.mkdir(parents=True, exist_ok=True)
+        # The connection is shared between threads, and `lock` makes sure only one thread uses it
+        # at a time.
+        self.connection: Final[sqlite3.Connection] = sqlite3.connect(
+            database_path, check_same_thread=False
+        )
+        self.lock: Final[threading.Lock] = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SqliteWeightRepository.SCHEMA)
+
+    def upsert_many(self, user_id: str, entries: Iterable[WeightEntry]) -> None:
+        self.upsert_rows("weights", user_id, entries)
+
+    def upsert_groups(self, batch: Dict[str, List[WeightEntry]]) -> Dict[str, Exception]:
+        # The whole group is a single transaction, which commits (and syncs) once.
+        with self.lock, self.connection:
+            for user_id, entries in batch.items():
+                self.execute_upsert("weights", user_id, entries)
+                self.bump_data_version(user_id)
+        return {}
+
+    def upsert_goal(self, user_id: str, entry_date: date, weight: float) -> None:
+        self.upsert_rows("goal_weights", user_id, [(entry_date, weight)])
+
+    def read_goals(self, user_id: str) -> List[WeightEntry]:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT date, weight FROM goal_weights WHERE user_id = ? ORDER BY date", (user_id,)
+            ).fetchall()
+        return [(date.fromisoformat(entry_date), weight) for entry_date, weight in rows]
+
+    def upsert_rows(self, table: str, user_id: str, entries: Iterable[WeightEntry]) -> None:
+        """
+        Upserts (date, weight) rows of a user into a table in a single transaction.
+        """
+        with self.lock, self.connection:
+            self.execute_upsert(table, user_id, entries)
+            if table == "weights":
+                self.bump_data_version(user_id)
+
+    def execute_upsert(self, table: str, user_id: str, entries: Iterable[WeightEntry]) -> None:
+        """
+        Upserts (date, weight) rows of a user into a table. Must be called inside of a transaction.
+        """
+        self.connection.executemany(
+            f"INSERT INTO {table} (user_id, date, weight) VALUES (?, ?, ?)"
+            " ON CONFLICT (user_id, date) DO UPDATE SET weight = excluded.weight",
+            ((user_id, entry_date.isoformat(), weight) for entry_date, weight in entries),
+        )
+
+    def bump_data_version(self, user_id: str) -> None:
+        """
+        Increments the data version of a user. Must be called inside of the transaction that
+        changes the weights of the user.
+        """
+        self.connection.execute(
+            "INSERT INTO data_versions (user_id, version) VALUES (?, 1)"
+            " ON CONFLICT (user_id) DO UPDATE SET version = version + 1",
+            (user_id,),
+        )
+
+    def remove(self, user_id: str, entry_date: date) -> Optional[float]:
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT weight FROM weights WHERE user_id = ? AND date = ?",
+                (user_id, entry_date.isoformat()),
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                "DELETE FROM weights WHERE user_id = ? AND date = ?",
+                (user_id, entry_date.isoformat()),
+            )
+            self.bump_data_version(user_id)
+        return row[0]
+
+    def read_range(
+        self, user_id: str, start: Optional[date] = None, end: Optional[date] = None
+    ) -> List[WeightEntry]:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT date, weight FROM weights WHERE user_id = ? AND date BETWEEN ? AND ?"
+                " ORDER BY date",
+                (
+                    user_id,
+                    start.isoformat() if start else date.min.isoformat(),
+                    end.isoformat() if end else date.max.isoformat(),
+                ),
+            ).fetchall()
+        return [(date.fromisoformat(entry_date), weight) for entry_date, weight in rows]
+
+    def has_data(self, user_id: str) -> bool:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM weights WHERE user_id = ? LIMIT 1", (user_id,)
+            ).fetchone()
+        return row is not None
+
+    def delete_user(self, user_id: str) -> bool:
+        with self.lock, self.connection:
+            cursor = self.connection.execute("DELETE FROM weights WHERE user_id = ?", (user_id,))
+            self.bump_data_version(user_id)
+        return cursor.rowcount > 0
+
+    def user_ids(self) -> List[str]:
+        with self.lock:
+            rows = self.connection.execute("SELECT DISTINCT user_id FROM weights").fetchall()
+        return sorted(user_id for (user_id,) in rows)
+
+    def data_paths(self, user_id: str) -> List[str]:
+        return [self.DATABASE_PATH]
+
+    def checkpoint(self) -> bool:
+        # Copies the transactions of the write-ahead log into the database file, and truncates the
+        # log.
+        with self.lock:
+            busy, _, _ = self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        return not busy
+
+    def data_version(self, user_id: str) -> Hashable:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT version FROM data_versions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+class BinaryWeightRepository(CsvWeightRepository):
+    """
+    Stores the weights of every user in a binary file of fixed width records, sorted by date. A
+    record is a little-endian int32 day ordinal followed by a float32 weight.
+
+    Reads map the file with `numpy.memmap` and binary search the range with `searchsorted`, so only
+    the pages of the range are touched and no text is parsed. Weights are stored as float32, which
+    is exact to well below a gram, and are rounded to 3 decimals when they are read.
+
+    Adding entries after the last entry (or replacing the last entry), which is what a daily
+    weigh-in does, writes the records in place at the end of the file, which only ever grows the
+    file. Other changes rewrite the file atomically. An append that was interrupted by a crash can
+    leave a partial record at the end of the file, which is ignored by reads and overwritten by the
+    next append.
+
+    Goals are rare and stay in csv files, like in `CsvWeightRepository`.
+    """
+
+    RECORD_DTYPE: Final[np.dtype] = np.dtype([("ordinal", "<i4"), ("weight", "<f4")])
+    """
+    The layout of a record.
+    """
+
+    def weight_path(self, user_id: str) -> str:
+        """Returns the path of the binary weight file of a user."""
+        return self.paths.resolve(user_id, f"{user_id}.bin")
+
+    def read_records(self, user_id: str) -> np.ndarray:
+        """
+        Maps the records of a user into memory. Returns an empty array when the user has no file.
+        """
+        try:
+            size = os.path.getsize(self.weight_path(user_id))
+        except FileNotFoundError:
+            size = 0
+
+        count = size // BinaryWeightRepository.RECORD_DTYPE.itemsize
+        if count == 0:
+            return np.empty(0, dtype=BinaryWeightRepository.RECORD_DTYPE)
+        return np.memmap(
+            self.weight_path(user_id),
+            dtype=BinaryWeightRepository.RECORD_DTYPE,
+            mode="r",
+            shape=(count,),
+        )
+
+    def write_records(
+        self, user_id: str, records: np.ndarray, index: Optional[int] = None, sync: bool = True
+    ) -> None:
+        """
+        Writes records of a user.
+
+        :param user_id: The Discord user ID.
+        :param records: The records to write.
+        :param index: The index of the first record to overwrite in place. The file ends after the
+                      written records. None atomically replaces the whole file with the records.
+        :param sync: Whether records that are written in place are flushed to disk right away.
+                     Otherwise the caller syncs the file with `sync_files`.
+        """
+        if index is None:
+            atomic_write(self.weight_path(user_id), records.tobytes())
+            return
+
+        mode = "r+b" if os.path.exists(self.weight_path(user_id)) else "wb"
+        with open(self.weight_path(user_id), mode) as binary_file:
+            binary_file.seek(index * BinaryWeightRepository.RECORD_DTYPE.itemsize)
+            binary_file.write(records.tobytes())
+            binary_file.truncate()
+            if sync:
+                binary_file.flush()
+                os.fsync(binary_file.fileno())
+
+    def merged_records(
+        self, user_id: str, entries: Iterable[WeightEntry]
+    ) -> Optional[Tuple[np.ndarray, Optional[int]]]:
+        """
+        Merges new entries into the records of a user.
+
+        :param user_id: The Discord user ID.
+        :param entries: The (date, weight) entries to add or replace.
+        :returns: The records and the index to pass to `write_records`, or None when there is
+                  nothing to write.
+        """
+        entries = sorted(dict(entries).items())
+        new_records = np.array(
+            [(entry_date.toordinal(), weight) for entry_date, weight in entries],
+            dtype=BinaryWeightRepository.RECORD_DTYPE,
+        )
+        if len(new_records) == 0:
+            return None
+
+        records = self.read_records(user_id)
+        index = int(np.searchsorted(records["ordinal"], new_records["ordinal"][0]))
+        if index == len(records) or (
+            index == len(records) - 1 and records["ordinal"][index] == new_records["ordinal"][0]
+        ):
+            return new_records, index
+
+        # A stable sort keeps the new record before the old record of the same date, and
+        # `np.unique` keeps the first of the duplicates.
+        merged = np.concatenate((new_records, records))
+        merged = merged[np.argsort(merged["ordinal"], kind="stable")]
+        _, first_indices = np.unique(merged["ordinal"], return_index=True)
+        return merged[first_indices], None
+
+    def upsert_many(self, user_id: str, entries: Iterable[WeightEntry]) -> None:
+        merged = self.merged_records(user_id, entries)
+        if merged is not None:
+            self.write_records(user_id, *merged)
+
+    def upsert_groups(self, batch: Dict[str, List[WeightEntry]]) -> Dict[str, Exception]:
+        # Appends are written in place without a sync and replaced files are written together, so
+        # the group waits for the disk once instead of once per user.
+        errors: Dict[str, Exception] = {}
+        appended: List[str] = []
+        replaced: Dict[str, bytes] = {}
+        for user_id, entries in batch.items():
+            try:
+                merged = self.merged_records(user_id, entries)
+                if merged is None:
+                    continue
+                records, index = merged
+                if index is None:
+                    replaced[self.weight_path(user_id)] = records.tobytes()
+                else:
+                    self.write_records(user_id, records, index, sync=False)
+                    appended.append(self.weight_path(user_id))
+            except Exception as error:
+                errors[user_id] = error
+        try:
+            sync_files(appended)
+            atomic_write_many(replaced)
+        except Exception as error:
+            return {user_id: errors.get(user_id, error) for user_id in batch}
+        return errors
+
+    def remove(self, user_id: str, entry_date: date) -> Optional[float]:
+        records = self.read_records(user_id)
+        index = int(np.searchsorted(records["ordinal"], entry_date.toordinal()))
+        if index == len(records) or records["ordinal"][index] != entry_date.toordinal():
+            return None
+
+        removed_weight = round(float(records["weight"][index]), 3)
+        # Removals are never written in place. Shrinking a file that another thread has mapped
+        # into memory can crash that thread with SIGBUS.
+        self.write_records(user_id, np.delete(records, index))
+        return removed_weight
+
+    def read_arrays(
+        self, user_id: str, start: Optional[date] = None, end: Optional[date] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        records = self.read_records(user_id)
+        ordinals = records["ordinal"]
+        first = np.searchsorted(ordinals, start.toordinal(), "left") if start else 0
+        last = np.searchsorted(ordinals, end.toordinal(), "right") if end else len(records)
+        # Only the range is copied out of the memory map, so the map can be closed right away.
+        return (
+            ordinals[first:last].astype(np.int32),
+            records["weight"][first:last].astype(np.float64).round(3),
+        )
+
+    def read_range(
+        self, user_id: str, start: Optional[date] = None, end: Optional[date] = None
+    ) -> List[WeightEntry]:
+        ordinals, weights = self.read_arrays(user_id, start, end)
+        return [
+            (date.fromordinal(ordinal), weight)
+            for ordinal, weight in zip(ordinals.tolist(), weights.tolist())
+        ]
+
+    def export_csv(self, user_id: str) -> bytes:
+        return entries_to_csv(self.read_range(user_id)).encode()
+
+    def user_ids(self) -> List[str]:
+        return sorted(
+            {
+                file_name[:-4]
+                for file_name, _ in self.paths.files()
+                if file_name.endswith(".bin") and file_name[:-4].isdigit()
+            }
+        )
+
+
+def create_weight_repository(config: Dict[str, Any]) -> WeightRepository:
+    """
+    Creates the weight repository that is configured in the bot config.
+
+    :param config: The bot config. `weight-storage` selects the backend ("csv", "sqlite" or
+                   "binary").
+    """
+    storage = config.get("weight-storage", "csv")
+    if storage == "csv":
+        return CsvWeightRepository(config["weight-cog-data-path"])
+    if storage == "sqlite":
+        return SqliteWeightRepository(config["weight-database-path"])
+    if storage == "binary":
+        return BinaryWeightRepository(config["weight-binary-data-path"])
+    raise ValueError(f"Unknown weight storage: {storage}.")
+
+
+def import_csv_directory(csv_directory: str, repository: WeightRepository) -> int:
+    """
+    Imports the weight and goal weight csv files of a WeightCog data directory into a repository.
+    Entries that already exist in the repository are overwritten.
+
+    :param csv_directory: The directory with the `<user_id>.csv` and `<user_id>_goal_weight.csv`
+                          files, in shard directories or not.
+    :param repository: The repository to import the data into.
+    :returns: The number of imported users.
+    """
+    imported_users = 0
+    for file_name, csv_path in sorted(ShardedPathResolver(csv_directory).files()):
+        user_id = file_name.removesuffix(".csv").removesuffix("_goal_weight")
+        if not file_name.endswith(".csv") or not user_id.isdigit():
+            continue
+
+        entries = read_csv_entries(csv_path)
+        if file_name.endswith("_goal_weight.csv"):
+            for entry_date, weight in entries:
+                repository.upsert_goal(user_id, entry_date, weight)
+        else:
+            repository.upsert_many(user_id, entries)
+            imported_users += 1
+
+    return imported_users
+
+
+def export_csv_directory(repository: WeightRepository, csv_directory: str) -> int:
+    """
+    Exports the weights and goal weights of all users in a repository into the csv files of a
+    WeightCog data directory. Entries that already exist in the directory are overwritten.
+
+    :param repository: The repository to export the data from.
+    :param csv_directory: The directory to write the `<user_id>.csv` and
+                          `<user_id>_goal_weight.csv` files into.
+    :returns: The number of exported users.
+    """
+    csv_repository = CsvWeightRepository(csv_directory)
+    user_ids = repository.user_ids()
+    for user_id in user_ids:
+        csv_repository.upsert_many(user_id, repository.read_range(user_id))
+        for entry_date, weight in repository.read_goals(user_id):
+            csv_repository.upsert_goal(user_id, entry_date, weight)
+    return len(user_ids)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m libs.weight_repository",
+        description="Converts the csv files of the WeightCog from and into another storage.",
+    )
+    parser.add_argument("csv_directory")
+    parser.add_argument("storage_path", help="The database path or the binary data directory.")
+    parser.add_argument("--storage", choices=["sqlite", "binary"], default="sqlite")
+    parser.add_argument("--to-csv", action="store_true", help="Convert the storage into csv files.")
+    arguments = parser.parse_args()
+
+    if arguments.storage == "sqlite":
+        storage = SqliteWeightRepository(arguments.storage_path)
+    else:
+        storage = BinaryWeightRepository(arguments.storage_path)
+
+    if arguments.to_csv:
+        exported_users = export_csv_directory(storage, arguments.csv_directory)
+        print(f"Exported the weight data of {exported_users} users.")
+    else:
+        imported_users = import_csv_directory(arguments.csv_directory, storage)
+        print(f"Imported the weight data of {imported_users} users.")
+    storage.close()
@@ -0,0 +1,210 @@
+import sys
+from collections import OrderedDict
+from datetime import date
+from typing import Callable, Final, Hashable, Iterable, List, Optional
+
+import numpy as np
+
+from libs.weight_repository import WeightEntry
+from libs.weight_stats import to_arrays
+
+"""
+This module contains the in-memory cache of user weight series.
+"""
+
+
+class WeightSeries:
+    """
+    The weight history of a user, stored as compact parallel arrays: int32 day ordinals and float64
+    weights, sorted by date. This takes 12 bytes per entry, where a list of (date, float) tuples
+    takes about ten times as much.
+
+    A series is never changed in place. The update methods return a new series, so a series that
+    is being read can't change underneath the reader.
+    """
+
+    def __init__(self, ordinals: np.ndarray, weights: np.ndarray, version: Hashable) -> None:
+        """
+        Initializes a WeightSeries instance.
+
+        :param ordinals: The sorted, unique day ordinals of the entries.
+        :param weights: The weights of the entries.
+        :param version: The data version of the repository the series has been read from.
+        """
+        self.ordinals: Final[np.ndarray] = ordinals
+        self.weights: Final[np.ndarray] = weights
+        self.version: Final[Hashable] = version
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[WeightEntry], version: Hashable) -> "WeightSeries":
+        """
+        Creates a series from (date, weight) entries that are sorted by date.
+        """
+        return cls(*to_arrays(entries), version)
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    @property
+    def nbytes(self) -> int:
+        """The memory that is used by the arrays of the series."""
+        return self.ordinals.nbytes + self.weights.nbytes
+
+    def slice(self, start: Optional[date] = None, end: Optional[date] = None) -> "WeightSeries":
+        """
+        Returns the entries inside of a date range. The arrays of the slice are views on the arrays
+        of this series.
+
+        :param start: The first date of the range (inclusive), or None for no lower bound.
+        :param end: The last date of the range (inclusive), or None for no upper bound.
+        """
+        first = np.searchsorted(self.ordinals, start.toordinal(), "left") if start else 0
+        last = np.searchsorted(self.ordinals, end.toordinal(), "right") if end else len(self)
+        return WeightSeries(self.ordinals[first:last], self.weights[first:last], self.version)
+
+    def entries(self) -> List[WeightEntry]:
+        """Returns the series as a list of (date, weight) entries."""
+        return [
+            (date.fromordinal(ordinal), weight)
+            for ordinal, weight in zip(self.ordinals.tolist(), self.weights.tolist())
+        ]
+
+    def upsert(self, entries: Iterable[WeightEntry], version: Hashable) -> "WeightSeries":
+        """
+        Returns a new series with entries added or replaced.
+
+        :param entries: The (date, weight) entries.
+        :param version: The data version after the change.
+        """
+        new_ordinals, new_weights = to_arrays(sorted(dict(entries).items()))
+        ordinals = np.concatenate((new_ordinals, self.ordinals))
+        weights = np.concatenate((new_weights, self.weights))
+        # A stable sort keeps the new entry before the old entry of the same date, and
+        # `np.unique` keeps the first of the duplicates.
+        order = np.argsort(ordinals, kind="stable")
+        ordinals, first_indices = np.unique(ordinals[order], return_index=True)
+        return WeightSeries(ordinals, weights[order][first_indices], version)
+
+    def remove(self, entry_date: date, version: Hashable) -> "WeightSeries":
+        """
+        Returns a new series without the entry of a date.
+
+        :param entry_date: The date of the entry to remove.
+        :param version: The data version after the change.
+        """
+        keep = self.ordinals != entry_date.toordinal()
+        return WeightSeries(self.ordinals[keep], self.weights[keep], version)
+
+
+def tuple_list_size(entries: int) -> int:
+    """
+    Returns the memory used by a list of (date, float) tuples with a number of entries.
+    """
+    entry_size = (
+        sys.getsizeof((None, None)) + sys.getsizeof(date.min) + sys.getsizeof(0.0) + 8
+    )  # The tuple, its date and float, and the pointer in the list.
+    return sys.getsizeof([]) + entries * entry_size
+
+
+class WeightSeriesCache:
+    """
+    A per-user LRU cache of weight series, bounded by a memory budget.
+
+    Every series carries the data version it has been read at. A series is only returned when its
+    version is still the current data version, so changes that are made outside of the bot (which
+    change the file modification time) invalidate the cached series.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        """
+        Initializes a WeightSeriesCache instance.
+
+        :param max_bytes: The memory budget for the arrays of all cached series.
+        """
+        self.MAX_BYTES: Final[int] = max_bytes
+        self.series: Final[OrderedDict[str, WeightSeries]] = OrderedDict()
+        self.nbytes: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, user_id: str, version: Hashable) -> Optional[WeightSeries]:
+        """
+        Returns the cached series of a user, or None when it isn't cached or outdated.
+
+        :param user_id: The Discord user ID.
+        :param version: The current data version of the user.
+        """
+        series = self.series.get(user_id)
+        if series is None or series.version != version:
+            self.misses += 1
+            self.invalidate(user_id)
+            return None
+
+        self.hits += 1
+        self.series.move_to_end(user_id)
+        return series
+
+    def put(self, user_id: str, series: WeightSeries) -> None:
+        """
+        Caches the series of a user, and evicts the least recently used series until the cache
+        fits into the memory budget again.
+
+        :param user_id: The Discord user ID.
+        :param series: The series of the user.
+        """
+        self.invalidate(user_id)
+        if series.nbytes > self.MAX_BYTES:
+            return
+
+        self.series[user_id] = series
+        self.nbytes += series.nbytes
+        while self.nbytes > self.MAX_BYTES:
+            _, evicted_series = self.series.popitem(last=False)
+            self.nbytes -= evicted_series.nbytes
+
+    def write_through(
+        self,
+        user_id: str,
+        version_before: Hashable,
+        version_after: Hashable,
+        update: Callable[[WeightSeries], WeightSeries],
+    ) -> None:
+        """
+        Applies a change that has been written to the repository to the cached series of a user.
+
+        :param user_id: The Discord user ID.
+        :param version_before: The data version right before the change was written.
+        :param version_after: The data version right after the change was written.
+        :param update: Returns the updated series.
+        """
+        series = self.series.get(user_id)
+        if series is None:
+            return
+        if series.version != version_before:
+            # The data has also been changed somewhere else, so the series can't be updated.
+            self.invalidate(user_id)
+            return
+        self.put(user_id, update(series))
+
+    def invalidate(self, user_id: str) -> None:
+        """
+        Removes the series of a user from the cache.
+
+        :param user_id: The Discord user ID.
+        """
+        series = self.series.pop(user_id, None)
+        if series is not None:
+            self.nbytes -= series.nbytes
+
+    def metrics(self) -> str:
+        """
+        Returns a human readable summary of the cache metrics, including the memory footprint of
+        the cached arrays next to the size of the same data as lists of tuples.
+        """
+        entries = sum(len(series) for series in self.series.values())
+        return (
+            f"Series cache: {len(self.series)} users, {entries} entries in"
+            f" {self.nbytes / 1024:.1f}/{self.MAX_BYTES / 1024:.0f} KiB"
+            f" ({tuple_list_size(entries) / 1024:.1f} KiB as lists of tuples),"
+            f" {self.hits} hits, {self.misses} misses"
+        )
@@ -0,0 +1,122 @@
+from datetime import date
+from typing import Final, Iterable, Tuple
+
+import numpy as np
+
+"""
+This module contains the vectorized statistics of weight series.
+
+A weight series is stored as two parallel arrays: the day ordinals of the entries
+(`date.toordinal()`), sorted ascending and unique, and the weights of the entries.
+"""
+
+UNIX_EPOCH_ORDINAL: Final[int] = date(1970, 1, 1).toordinal()
+"""
+The day ordinal of 1970-01-01, which is day 0 of numpy's datetime64.
+"""
+
+
+def to_arrays(entries: Iterable[Tuple[date, float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Converts (date, weight) entries into day ordinal and weight arrays.
+
+    :param entries: The weight entries, sorted by date.
+    :returns: The int32 day ordinals and the float64 weights.
+    """
+    entries = list(entries)
+    ordinals = np.fromiter(
+        (entry_date.toordinal() for entry_date, _ in entries), dtype=np.int32, count=len(entries)
+    )
+    weights = np.fromiter((weight for _, weight in entries), dtype=np.float64, count=len(entries))
+    return ordinals, weights
+
+
+def ordinals_to_dates(ordinals: np.ndarray) -> np.ndarray:
+    """
+    Converts day ordinals into a numpy datetime64 array, which matplotlib can plot directly.
+
+    :param ordinals: The day ordinals.
+    """
+    return (ordinals.astype(np.int64) - UNIX_EPOCH_ORDINAL).astype("datetime64[D]")
+
+
+def moving_average(
+    ordinals: np.ndarray, weights: np.ndarray, window_days: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates the trailing moving average over a window of calendar days.
+
+    The average of an entry is the mean of all entries in the `window_days` days up to and
+    including the entry. The window is measured in days instead of entries, so skipped days don't
+    stretch the window. Averages are only returned for entries that have a full window of history
+    behind them.
+
+    The sums of the windows are differences of a cumulative sum, and the window starts are found
+    with a binary search. This is O(n log n) regardless of the window size.
+
+    :param ordinals: The sorted, unique day ordinals of the entries.
+    :param weights: The weights of the entries.
+    :param window_days: The length of the window in days.
+    :returns: The day ordinals and the moving averages of the entries with a full window.
+    """
+    if len(ordinals) == 0:
+        return ordinals, weights.astype(np.float64)
+
+    cumulative_sums = np.concatenate(([0.0], np.cumsum(weights, dtype=np.float64)))
+    window_ends = np.arange(1, len(ordinals) + 1)
+    window_starts = np.searchsorted(ordinals, ordinals - (window_days - 1), side="left")
+    averages = (cumulative_sums[window_ends] - cumulative_sums[window_starts]) / (
+        window_ends - window_starts
+    )
+
+    has_full_window = ordinals - (window_days - 1) >= ordinals[0]
+    return ordinals[has_full_window], averages[has_full_window]
+
+
+def largest_triangle_three_buckets(
+    ordinals: np.ndarray, weights: np.ndarray, threshold: int
+) -> np.ndarray:
+    """
+    Selects the entries to plot for a downsampled line with Largest-Triangle-Three-Buckets (LTTB).
+
+    The first and last entry are always kept. The entries in between are split into
+    `threshold - 2` buckets of equal size, and one entry is kept per bucket: the entry that forms
+    the largest triangle with the entry kept from the previous bucket and the average of the next
+    bucket. Peaks and dips have the largest triangles, so the shape of the line, including its
+    minima and maxima, survives the downsampling.
+
+    :param ordinals: The sorted, unique day ordinals of the entries.
+    :param weights: The weights of the entries.
+    :param threshold: The maximum number of entries to keep.
+    :returns: The sorted indices of the kept entries, or the indices of all entries when there
+              are no more than `threshold` entries.
+    """
+    count = len(ordinals)
+    if threshold >= count or threshold < 3:
+        return np.arange(count)
+
+    x = ordinals.astype(np.float64)
+    y = weights.astype(np.float64)
+    bucket_size = (count - 2) / (threshold - 2)
+    # Bucket i contains the entries bucket_starts[i] up to bucket_starts[i + 1]. The last bucket
+    # start is the last entry, which acts as the "next bucket" of the last real bucket.
+    bucket_starts = np.append(
+        (np.arange(threshold - 2) * bucket_size).astype(np.int64) + 1, count - 1
+    )
+    bucket_ends = np.append(bucket_starts[1:], count)
+    next_x = np.add.reduceat(x, bucket_starts) / (bucket_ends - bucket_starts)
+    next_y = np.add.reduceat(y, bucket_starts) / (bucket_ends - bucket_starts)
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = previous = 0
+    indices[-1] = count - 1
+    for bucket in range(threshold - 2):
+        start, end = bucket_starts[bucket], bucket_ends[bucket]
+        # Twice the triangle areas, which doesn't change the largest one.
+        areas = np.abs(
+            (x[previous] - next_x[bucket + 1]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y[bucket + 1] - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        indices[bucket + 1] = previous
+    return indices
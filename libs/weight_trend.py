@@ -0,0 +1,231 @@
+import json
+import math
+import os
+from datetime import date
+from typing import Final, Optional
+
+import numpy as np
+
+from libs.file_utils import atomic_write
+from libs.sharded_paths import ShardedPathResolver
+
+"""
+This module contains the weight trend of a user and the projection of when a goal is reached.
+"""
+
+
+class WeightTrend:
+    """
+    The weight trend of a user, which is updated in O(1) for every new entry.
+
+    The trend is made of two parts:
+
+    - The smoothed weight, an exponentially weighted moving average like in The Hacker's Diet: every
+      day the trend moves 10% of the way to the weight of that day. Days without an entry count as
+      days on which the weight didn't change.
+    - The rate of change, the slope of a linear regression over the entries, in which an entry
+      weighs half as much for every 30 days it is older than the last entry. The regression is kept
+      as weighted sums, so an entry is added without refitting the history.
+
+    Adding an entry that is newer than the last entry updates both parts in place. Any other change
+    (a backfilled, replaced or removed entry) marks the trend as stale, and a stale trend is
+    recomputed from the series with `from_arrays` the next time it is needed.
+    """
+
+    SMOOTHING: Final[float] = 0.1
+    """
+    The fraction of the way the smoothed weight moves to the weight of a day.
+    """
+
+    REGRESSION_HALF_LIFE_DAYS: Final[float] = 30.0
+    """
+    The number of days after which an entry weighs half as much in the regression.
+    """
+
+    MAX_PROJECTION_DAYS: Final[int] = 5 * 365
+    """
+    Projections further in the future are not reported.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty WeightTrend instance.
+        """
+        self.entries: int = 0
+        self.stale: bool = False
+        self.first_ordinal: int = 0
+        self.last_ordinal: int = 0
+        self.smoothed_weight: float = 0.0
+        # Weighted sums of the regression, with x as days since the first entry. They are all
+        # scaled relative to the weight of the last entry, which is 1.
+        self.sum_weights: float = 0.0
+        self.sum_x: float = 0.0
+        self.sum_y: float = 0.0
+        self.sum_xx: float = 0.0
+        self.sum_xy: float = 0.0
+
+    @staticmethod
+    def decay(days: float) -> float:
+        """Returns the factor the regression weight of an entry decays by over a number of days."""
+        return 0.5 ** (days / WeightTrend.REGRESSION_HALF_LIFE_DAYS)
+
+    def add(self, ordinal: int, weight: float) -> None:
+        """
+        Adds an entry in O(1). An entry that isn't newer than the last entry marks the trend stale.
+
+        :param ordinal: The day ordinal of the entry.
+        :param weight: The weight of the entry.
+        """
+        if self.stale:
+            return
+        if self.entries and ordinal <= self.last_ordinal:
+            self.stale = True
+            return
+
+        if self.entries == 0:
+            self.first_ordinal = ordinal
+            self.smoothed_weight = weight
+        else:
+            days = ordinal - self.last_ordinal
+            self.smoothed_weight += (1 - (1 - WeightTrend.SMOOTHING) ** days) * (
+                weight - self.smoothed_weight
+            )
+            scale = self.decay(days)
+            self.sum_weights *= scale
+            self.sum_x *= scale
+            self.sum_y *= scale
+            self.sum_xx *= scale
+            self.sum_xy *= scale
+
+        x = ordinal - self.first_ordinal
+        self.sum_weights += 1
+        self.sum_x += x
+        self.sum_y += weight
+        self.sum_xx += x * x
+        self.sum_xy += x * weight
+        self.last_ordinal = ordinal
+        self.entries += 1
+
+    @classmethod
+    def from_arrays(cls, ordinals: np.ndarray, weights: np.ndarray) -> "WeightTrend":
+        """
+        Computes the trend of a whole series.
+
+        :param ordinals: The sorted, unique day ordinals of the entries.
+        :param weights: The weights of the entries.
+        """
+        trend = cls()
+        if len(ordinals) == 0:
+            return trend
+
+        trend.entries = len(ordinals)
+        trend.first_ordinal = int(ordinals[0])
+        trend.last_ordinal = int(ordinals[-1])
+
+        smoothed_weight = float(weights[0])
+        retained = (1 - WeightTrend.SMOOTHING) ** np.diff(ordinals).astype(np.float64)
+        for retained_fraction, weight in zip(retained.tolist(), weights[1:].tolist()):
+            smoothed_weight += (1 - retained_fraction) * (weight - smoothed_weight)
+        trend.smoothed_weight = smoothed_weight
+
+        x = (ordinals - trend.first_ordinal).astype(np.float64)
+        y = weights.astype(np.float64)
+        ages = (trend.last_ordinal - ordinals).astype(np.float64)
+        entry_weights = 0.5 ** (ages / WeightTrend.REGRESSION_HALF_LIFE_DAYS)
+        trend.sum_weights = float(entry_weights.sum())
+        trend.sum_x = float((entry_weights * x).sum())
+        trend.sum_y = float((entry_weights * y).sum())
+        trend.sum_xx = float((entry_weights * x * x).sum())
+        trend.sum_xy = float((entry_weights * x * y).sum())
+        return trend
+
+    def matches(self, ordinals: np.ndarray) -> bool:
+        """
+        Checks if the trend is up to date with a series. Changes that are made outside of the bot
+        show up as a different number of entries or a different last entry.
+
+        :param ordinals: The sorted, unique day ordinals of the series.
+        """
+        if self.stale or self.entries != len(ordinals):
+            return False
+        return self.entries == 0 or self.last_ordinal == int(ordinals[-1])
+
+    def slope(self) -> Optional[float]:
+        """
+        Returns the rate of change in kg per day, or None when there are too few entries to tell.
+        """
+        denominator = self.sum_weights * self.sum_xx - self.sum_x * self.sum_x
+        if self.entries < 2 or denominator <= 1e-9 * self.sum_weights * self.sum_xx:
+            return None
+        return (self.sum_weights * self.sum_xy - self.sum_x * self.sum_y) / denominator
+
+    def projected_date(self, goal_weight: float) -> Optional[date]:
+        """
+        Projects when the smoothed weight reaches a goal at the current rate of change.
+
+        :param goal_weight: The goal weight in kilograms.
+        :returns: The projected date, or None when the weight isn't moving towards the goal.
+        """
+        if self.entries == 0:
+            return None
+        remaining = goal_weight - self.smoothed_weight
+        if abs(remaining) < 0.05:
+            return date.fromordinal(self.last_ordinal)
+
+        slope = self.slope()
+        if not slope:
+            return None
+        days = remaining / slope
+        if days < 0 or days > WeightTrend.MAX_PROJECTION_DAYS:
+            return None
+        return date.fromordinal(self.last_ordinal + math.ceil(days))
+
+    def to_json(self) -> str:
+        """Returns the state of the trend as json."""
+        return json.dumps(self.__dict__)
+
+    @classmethod
+    def from_json(cls, state: str) -> "WeightTrend":
+        """Creates a trend from the json that was created by `to_json`."""
+        trend = cls()
+        trend.__dict__.update(json.loads(state))
+        return trend
+
+
+class WeightTrendStore:
+    """
+    Stores the trend of every user in a small json file, in the shard directories of
+    `ShardedPathResolver`.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """
+        Initializes a WeightTrendStore instance.
+
+        :param directory: The directory of the trend files.
+        """
+        self.DIRECTORY: Final[str] = directory
+        self.paths: Final[ShardedPathResolver] = ShardedPathResolver(self.DIRECTORY)
+
+    def path(self, user_id: str) -> str:
+        """Returns the path of the trend file of a user."""
+        return self.paths.resolve(user_id, f"{user_id}_trend.json")
+
+    def load(self, user_id: str) -> Optional[WeightTrend]:
+        """Loads the trend of a user, or returns None when it hasn't been stored yet."""
+        try:
+            with open(self.path(user_id), "r") as trend_file:
+                return WeightTrend.from_json(trend_file.read())
+        except FileNotFoundError:
+            return None
+
+    def save(self, user_id: str, trend: WeightTrend) -> None:
+        """Stores the trend of a user."""
+        atomic_write(self.path(user_id), trend.to_json().encode())
+
+    def delete(self, user_id: str) -> None:
+        """Deletes the trend of a user, so it is recomputed when it is needed again."""
+        try:
+            os.remove(self.path(user_id))
+        except FileNotFoundError:
+            pass
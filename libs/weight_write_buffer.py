@@ -0,0 +1,126 @@
+from datetime import date
+from typing import Dict, Final, Iterable, List, Optional
+
+from libs.weight_repository import WeightEntry
+
+"""
+This module contains the write-behind buffer of the weight logs.
+"""
+
+DURABILITY_MODES: Final[List[str]] = ["sync", "group", "async"]
+"""
+The durability modes of the weight logs:
+
+- "sync": Every log is written before the command answers.
+- "group": Logs are collected and written together. A command answers once its group is written.
+- "async": A command answers right away. The group is written in the background, so a crash loses
+  the logs that were not written yet.
+"""
+
+
+class WeightWriteBuffer:
+    """
+    Collects the weight logs that still have to be written, coalesced per user and date.
+
+    A log waits in `pending` until a flush takes it. It then stays `in_flight` until the flush has
+    written it, so the buffered logs of a user are visible to reads during the whole time they are
+    not in the repository yet.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty WeightWriteBuffer instance.
+        """
+        self.pending: Final[Dict[str, Dict[date, float]]] = {}
+        self.in_flight: Final[Dict[str, Dict[date, float]]] = {}
+        self.pending_entries: int = 0
+        self.versions: Final[Dict[str, int]] = {}
+        """
+        The number of logs every user buffered so far. It tells apart the buffered states of a user
+        that have the same data version in the repository.
+        """
+        self.buffered_logs: int = 0
+        self.written_entries: int = 0
+        self.flushes: int = 0
+
+    def add(self, user_id: str, entry_date: date, weight: float) -> None:
+        """
+        Buffers a weight log. A later log of the same user and date replaces the earlier one.
+
+        :param user_id: The Discord user ID.
+        :param entry_date: The date of the entry.
+        :param weight: The weight of the entry.
+        """
+        user_pending = self.pending.setdefault(user_id, {})
+        if entry_date not in user_pending:
+            self.pending_entries += 1
+        user_pending[entry_date] = weight
+        self.versions[user_id] = self.versions.get(user_id, 0) + 1
+        self.buffered_logs += 1
+
+    def take(self, user_ids: Iterable[str]) -> Dict[str, List[WeightEntry]]:
+        """
+        Takes the pending logs of users to write them. They stay visible as in flight until
+        `finish` is called.
+
+        :param user_ids: The users whose logs are taken.
+        :returns: The sorted entries of every user that had pending logs.
+        """
+        batch = {}
+        for user_id in user_ids:
+            user_pending = self.pending.pop(user_id, None)
+            if user_pending is None:
+                continue
+            self.pending_entries -= len(user_pending)
+            self.in_flight.setdefault(user_id, {}).update(user_pending)
+            batch[user_id] = sorted(user_pending.items())
+        return batch
+
+    def finish(self, user_id: str, written: bool) -> None:
+        """
+        Ends the flush of the logs of a user that were taken with `take`.
+
+        :param user_id: The Discord user ID.
+        :param written: False when the write failed. The logs are then pending again, unless they
+                        have been replaced by newer logs in the meantime.
+        """
+        user_in_flight = self.in_flight.pop(user_id, {})
+        if written:
+            self.written_entries += len(user_in_flight)
+            return
+        for entry_date, weight in user_in_flight.items():
+            if entry_date not in self.pending.get(user_id, {}):
+                self.add(user_id, entry_date, weight)
+
+    def entries(
+        self, user_id: str, start: Optional[date] = None, end: Optional[date] = None
+    ) -> List[WeightEntry]:
+        """
+        Returns the buffered entries of a user inside of a date range, with the newest log of every
+        date.
+
+        :param user_id: The Discord user ID.
+        :param start: The first date of the range (inclusive), or None for no lower bound.
+        :param end: The last date of the range (inclusive), or None for no upper bound.
+        """
+        buffered = {**self.in_flight.get(user_id, {}), **self.pending.get(user_id, {})}
+        return sorted(
+            (entry_date, weight)
+            for entry_date, weight in buffered.items()
+            if (start is None or entry_date >= start) and (end is None or entry_date <= end)
+        )
+
+    def has_entries(self, user_id: str) -> bool:
+        """Checks if a user has logs that are not in the repository yet."""
+        return user_id in self.pending or user_id in self.in_flight
+
+    def user_ids(self) -> List[str]:
+        """Returns the users that have logs which are not in the repository yet."""
+        return list(self.pending.keys() | self.in_flight.keys())
+
+    def metrics(self) -> str:
+        """Returns the number of buffered logs, written entries and flushes as a message."""
+        return (
+            f"Write buffer: {self.pending_entries} pending, {self.buffered_logs} logs written as"
+            f" {self.written_entries} entries in {self.flushes} flushes"
+        )
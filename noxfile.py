@@ -1,5 +1,6 @@
 import subprocess
 import time
+from pathlib import Path
 
 import nox
 
@@ -145,3 +146,16 @@ def tests(session):
     assert result.returncode == 0 or is_screen_session_running(bot_screen_name),(
         f"Expected screen for `{bot_screen_name}` to be closed. But the screen comnmand returned a"
         " non zero value.")
+
+
+@nox.session
+def benchmarks(session):
+    """
+    Run all benchmarks.
+
+    The benchmarks don't need a running bot, they call the cogs and libraries directly.
+    """
+    session.install("discord", "pyyaml", "numpy", "matplotlib")
+
+    for benchmark in sorted(Path("benchmarks").glob("bench_*.py")):
+        session.run("python", str(benchmark))
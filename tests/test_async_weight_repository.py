@@ -0,0 +1,153 @@
+import asyncio
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+from libs.async_weight_repository import AsyncWeightRepository
+from libs.weight_repository import (BinaryWeightRepository,
+                                    CsvWeightRepository,
+                                    SqliteWeightRepository)
+from libs.weight_series_cache import WeightSeriesCache
+
+"""
+This module contains the concurrency stress tests for the AsyncWeightRepository.
+"""
+
+USERS = 10
+ENTRIES_PER_USER = 100
+
+
+@pytest.fixture(params=["csv", "sqlite", "binary"])
+def repository(request, tmp_path: Path) -> AsyncWeightRepository:
+    """
+    An async weight repository of every storage backend.
+    """
+    if request.param == "csv":
+        repository = CsvWeightRepository(str(tmp_path / "weightcog"))
+    elif request.param == "binary":
+        repository = BinaryWeightRepository(str(tmp_path / "weightcog_binary"))
+    else:
+        repository = SqliteWeightRepository(str(tmp_path / "weightcog.sqlite3"))
+    async_repository = AsyncWeightRepository(repository, max_workers=8)
+    yield async_repository
+    async_repository.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_upserts_are_not_lost(repository: AsyncWeightRepository):
+    """
+    Test that concurrent upserts of the same users don't lose each other's writes, and report the
+    throughput.
+    """
+    first_date = date(2020, 1, 1)
+    upserts = [
+        repository.upsert(str(user), first_date + timedelta(days=day), 80.0 + day / 10)
+        for day in range(ENTRIES_PER_USER)
+        for user in range(USERS)
+    ]
+
+    start = time.perf_counter()
+    await asyncio.gather(*upserts)
+    duration = time.perf_counter() - start
+    print(
+        f"\n{type(repository.repository).__name__}: {len(upserts)} concurrent upserts in"
+        f" {duration:.2f}s ({len(upserts) / duration:.0f} upserts/s)"
+    )
+
+    for user in range(USERS):
+        entries = await repository.read_range(str(user))
+        assert len(entries) == ENTRIES_PER_USER
+        assert entries[-1] == (first_date + timedelta(days=ENTRIES_PER_USER - 1), 89.9)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_removes(repository: AsyncWeightRepository):
+    """
+    Test that concurrent removes and upserts of a user are all applied.
+    """
+    first_date = date(2020, 1, 1)
+    entries = [(first_date + timedelta(days=day), 80.0) for day in range(50)]
+    await repository.upsert_many("1", entries)
+
+    await asyncio.gather(
+        *(repository.remove("1", first_date + timedelta(days=day)) for day in range(0, 50, 2)),
+        *(repository.upsert("1", first_date + timedelta(days=day), 70.0) for day in range(50, 60)),
+    )
+
+    entries = await repository.read_range("1")
+    assert [entry_date.day for entry_date, _ in entries[:3]] == [2, 4, 6]
+    assert len(entries) == 35
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("durability", ["group", "async"])
+async def test_buffered_upserts(tmp_path: Path, durability: str):
+    """
+    Test that buffered upserts are coalesced per user, are visible to reads before they are
+    written, and are all written by a flush. A remove has to come after the buffered upserts.
+    """
+    repository = AsyncWeightRepository(
+        CsvWeightRepository(str(tmp_path)),
+        series_cache=WeightSeriesCache(1024 * 1024),
+        durability=durability,
+        flush_interval=0.05,
+        flush_entries=1000,
+    )
+    first_date = date(2020, 1, 1)
+    await asyncio.gather(
+        *(
+            repository.upsert(str(user), first_date + timedelta(days=day % 5), 80.0 + day)
+            for day in range(10)
+            for user in range(USERS)
+        )
+    )
+    if durability == "async":
+        assert repository.repository.read_range("1") == []
+        assert repository.write_buffer.pending_entries == 5 * USERS
+        version = await repository.data_version("1")
+        await repository.upsert("1", first_date, 70.0)
+        assert await repository.data_version("1") != version
+    else:
+        assert len(repository.repository.read_range("1")) == 5
+
+    assert (await repository.read_range("1"))[-1] == (first_date + timedelta(days=4), 89.0)
+    await repository.remove("2", first_date)
+    await repository.flush()
+    assert repository.write_buffer.pending_entries == 0
+    assert repository.repository.read_range("2")[0] == (first_date + timedelta(days=1), 86.0)
+    assert len(repository.repository.read_range("3")) == 5
+    repository.close()
+
+
+@pytest.mark.asyncio
+async def test_group_is_written_at_once(tmp_path: Path):
+    """
+    Test that a group of buffered logs is written with a single `upsert_groups`, and that the logs
+    of a user whose write failed are buffered again while the other users are written.
+    """
+    groups = []
+
+    class FailingRepository(CsvWeightRepository):
+        """Fails the writes of the user "1"."""
+
+        def upsert_groups(self, batch):
+            groups.append(sorted(batch))
+            errors = super().upsert_groups(
+                {user_id: entries for user_id, entries in batch.items() if user_id != "1"}
+            )
+            return {**errors, "1": OSError("No space left on device")}
+
+    repository = AsyncWeightRepository(
+        FailingRepository(str(tmp_path)), durability="async", flush_entries=1000
+    )
+    for user in range(USERS):
+        await repository.upsert(str(user), date(2020, 1, 1), 80.0)
+    await repository.flush()
+
+    assert groups[0] == sorted(str(user) for user in range(USERS))
+    assert repository.write_buffer.has_entries("1")
+    assert repository.repository.read_range("1") == []
+    assert repository.repository.read_range("2") == [(date(2020, 1, 1), 80.0)]
+    repository.close()
@@ -0,0 +1,37 @@
+import numpy as np
+
+from libs.bm25_index import Bm25Index, tokenize
+
+"""
+This module contains the test cases for the BM25 keyword index of the SourceCog.
+"""
+
+
+def test_rare_words_score_higher():
+    """
+    Test that documents with the rare words of a query rank first, and that documents without any
+    word of the query are not returned.
+    """
+    index = Bm25Index(
+        [
+            "Carbs are not unhealthy, they are the main fuel of the body",
+            "Protein after a workout is fine, but the anabolic window is a myth",
+            "Creatine is not a steroid",
+            "Fats are not unhealthy either",
+        ]
+    )
+    assert list(index.top("Is creatine a steroid?", 2)) == [2, 1]
+    assert list(index.top("Carbs are unhealthy", 1)) == [0]
+    assert len(index.top("olive oil", 3)) == 0
+    assert tokenize("Isn't it 5KG?") == ["isn", "t", "it", "5kg"]
+
+
+def test_long_documents_are_normalized():
+    """
+    Test that a term in a short document weighs more than the same term in a long document.
+    """
+    index = Bm25Index(["sugar " + "filler " * 50, "sugar rush", "nothing"])
+    scores = index.scores("sugar")
+    assert scores[1] > scores[0] > 0
+    assert scores[2] == 0
+    assert np.array_equal(Bm25Index([]).scores("sugar"), np.zeros(0))
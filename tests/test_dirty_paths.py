@@ -0,0 +1,58 @@
+import os
+from pathlib import Path
+
+from libs.dirty_paths import DirtyPathJournal
+
+"""
+This module contains the test cases for the journal of the data files that changed since the last
+data commit.
+"""
+
+
+def test_dirty_paths_survive_a_restart(tmp_path: Path):
+    """
+    Test that marked paths are journaled once, and are loaded again by a new journal.
+    """
+    journal_path = str(tmp_path / "dirty_paths.journal")
+    journal = DirtyPathJournal(journal_path)
+    journal.mark(str(tmp_path / "1.csv"), str(tmp_path / "2.csv"))
+    journal.mark(str(tmp_path / "1.csv"))
+
+    assert Path(journal_path).read_text().count("1.csv") == 1
+    assert set(DirtyPathJournal(journal_path).snapshot()) == {
+        os.path.abspath(tmp_path / "1.csv"),
+        os.path.abspath(tmp_path / "2.csv"),
+    }
+
+
+def test_clear_keeps_paths_that_changed_again(tmp_path: Path):
+    """
+    Test that clearing a snapshot keeps the paths that were marked again after the snapshot, also
+    after a restart.
+    """
+    journal_path = str(tmp_path / "dirty_paths.journal")
+    journal = DirtyPathJournal(journal_path)
+    journal.mark(str(tmp_path / "1.csv"), str(tmp_path / "2.csv"))
+    snapshot = journal.snapshot()
+    journal.mark(str(tmp_path / "2.csv"))
+    journal.clear(snapshot)
+
+    assert set(journal.snapshot()) == {os.path.abspath(tmp_path / "2.csv")}
+    assert set(DirtyPathJournal(journal_path).snapshot()) == set(journal.snapshot())
+    journal.clear(journal.snapshot())
+    assert not DirtyPathJournal(journal_path).snapshot()
+
+
+def test_checkpoint_runs_every_checkpoint(tmp_path: Path):
+    """
+    Test that the checkpoint runs the checkpoints of every cog, and fails when one of them can't
+    complete its files.
+    """
+    journal = DirtyPathJournal(str(tmp_path / "dirty_paths.journal"))
+    assert journal.checkpoint()
+
+    calls = []
+    journal.checkpoints["BusyCog"] = lambda: calls.append("BusyCog") and False
+    journal.checkpoints["IdleCog"] = lambda: calls.append("IdleCog") or True
+    assert not journal.checkpoint()
+    assert calls == ["BusyCog", "IdleCog"]
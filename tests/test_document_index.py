@@ -0,0 +1,118 @@
+import os
+import threading
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from libs.document_index import DocumentVectorIndex
+
+"""
+This module contains the test cases for the document-vector index of the SourceCog.
+"""
+
+
+class LetterVectorizer:
+    """
+    Vectorizes texts by counting their letters, and remembers which texts it vectorized.
+    """
+
+    def __init__(self) -> None:
+        self.texts: List[str] = []
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        self.texts.extend(texts)
+        return np.array([[text.count(letter) for letter in "abcdefgh"] for text in texts])
+
+
+def write_info_file(directory: Path, name: str, content: str, mtime_ns: int) -> None:
+    """
+    Writes an info file with a fixed modification time.
+    """
+    (directory / f"{name}.txt").write_text(content)
+    os.utime(directory / f"{name}.txt", ns=(mtime_ns, mtime_ns))
+
+
+def test_search_ranks_paragraphs_by_cosine_similarity(tmp_path: Path):
+    """
+    Test that every paragraph is a chunk of its own, that a search returns the chunks in the order
+    of their cosine similarity with the query, and that weak matches are left out.
+    """
+    write_info_file(tmp_path, "carbs", "aaab\n\n  \ncccd", 1)
+    write_info_file(tmp_path, "fats", "bbbc", 1)
+    write_info_file(tmp_path, "empty", "", 1)
+    index = DocumentVectorIndex(str(tmp_path / "index.npz"))
+    assert index.refresh(str(tmp_path), LetterVectorizer())
+    assert index.chunks == ["aaab", "cccd", "bbbc"]
+
+    query = np.array([2, 1, 0, 0, 0, 0, 0, 0], dtype=np.float32)
+    best_matches = index.search("", query, top_k=3)
+    assert [chunk for _, chunk, _ in best_matches] == ["aaab", "bbbc"]
+    carbs_vector = np.array([3, 1, 0, 0, 0, 0, 0, 0])
+    expected = query @ carbs_vector / (np.linalg.norm(query) * np.linalg.norm(carbs_vector))
+    assert Path(best_matches[0][0]).stem == "carbs"
+    assert np.isclose(best_matches[0][2], expected)
+    assert [chunk for _, chunk, _ in index.search("", query, 3, min_similarity=0.8)] == ["aaab"]
+    assert index.search("", np.zeros(8)) == []
+
+
+def test_keyword_matches_are_reranked_by_similarity(tmp_path: Path):
+    """
+    Test that only the best keyword matches are re-ranked when a query shares words with the
+    chunks.
+    """
+    write_info_file(tmp_path, "carbs", "aaab bread", 1)
+    write_info_file(tmp_path, "fats", "bbbc butter", 1)
+    index = DocumentVectorIndex(str(tmp_path / "index.npz"))
+    index.refresh(str(tmp_path), LetterVectorizer())
+
+    query = np.array([1, 1, 0, 0, 0, 0, 0, 0], dtype=np.float32)
+    assert [chunk for _, chunk, _ in index.search("butter", query, 2)] == ["bbbc butter"]
+    assert [chunk for _, chunk, _ in index.search("olive oil", query, 2)][0] == "aaab bread"
+
+
+def test_refresh_only_vectorizes_changed_files(tmp_path: Path):
+    """
+    Test that a refresh vectorizes new and changed files, drops deleted files, and that a loaded
+    index doesn't vectorize unchanged files again.
+    """
+    write_info_file(tmp_path, "carbs", "aaab", 1)
+    write_info_file(tmp_path, "fats", "bbbc", 1)
+    index = DocumentVectorIndex(str(tmp_path / "index.npz"))
+    index.refresh(str(tmp_path), LetterVectorizer())
+    index.save()
+
+    write_info_file(tmp_path, "fats", "hhhh\n\nbbbc", 2)
+    write_info_file(tmp_path, "protein", "cccd", 1)
+    os.remove(tmp_path / "carbs.txt")
+    loaded_index = DocumentVectorIndex(str(tmp_path / "index.npz"))
+    assert loaded_index.load()
+    vectorizer = LetterVectorizer()
+    assert loaded_index.refresh(str(tmp_path), vectorizer)
+    assert sorted(vectorizer.texts) == ["bbbc", "cccd", "hhhh"]
+    assert [Path(path).stem for path in loaded_index.paths] == ["fats", "fats", "protein"]
+    assert not loaded_index.refresh(str(tmp_path), vectorizer)
+    assert loaded_index.search("", np.eye(8)[7])[0][1] == "hhhh"
+
+
+def test_search_during_refresh(tmp_path: Path):
+    """
+    Test that a search isn't blocked while a refresh vectorizes changed files, and finds the
+    chunks from before the refresh.
+    """
+    write_info_file(tmp_path, "carbs", "aaab", 1)
+    index = DocumentVectorIndex(str(tmp_path / "index.npz"))
+    index.refresh(str(tmp_path), LetterVectorizer())
+    write_info_file(tmp_path, "fats", "bbbc", 1)
+    query = np.array([1, 1, 0, 0, 0, 0, 0, 0], dtype=np.float32)
+    results = []
+
+    def vectorize_while_searching(texts: List[str]) -> np.ndarray:
+        search = threading.Thread(target=lambda: results.append(index.search("", query, 2)))
+        search.start()
+        search.join(timeout=5)
+        return LetterVectorizer()(texts)
+
+    assert index.refresh(str(tmp_path), vectorize_while_searching)
+    assert [chunk for _, chunk, _ in results[0]] == ["aaab"]
+    assert [chunk for _, chunk, _ in index.search("", query, 2)] == ["aaab", "bbbc"]
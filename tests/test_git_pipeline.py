@@ -0,0 +1,120 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from libs.git_pipeline import GitPipeline
+
+"""
+This module contains the test cases for the asyncio git pipeline of the CommitDataCog.
+"""
+
+
+@pytest.fixture
+def repository_path(tmp_path: Path) -> Path:
+    """
+    An empty git repository.
+    """
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    subprocess.run(["git", "-C", str(tmp_path), "config", "user.name", "BSF-bot"], check=True)
+    subprocess.run(["git", "-C", str(tmp_path), "config", "user.email", "bot@bsf"], check=True)
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_commands_run_in_the_repository(repository_path: Path):
+    """
+    Test that the commands run inside of the repository and capture their output, and that every
+    step is counted in the metrics.
+    """
+    (repository_path / "1.csv").write_text("Date,Weight\n")
+    git = GitPipeline(str(repository_path))
+
+    assert (await git.run("add", ".")).ok
+    commit = await git.run("commit", "-m", "Committing user data")
+    assert commit.ok and "Committing user data" in commit.output
+    nothing_to_commit = await git.run("commit", "-m", "Committing user data")
+    assert not nothing_to_commit.ok
+
+    assert git.step_metrics["commit"].runs == 2
+    assert git.step_metrics["commit"].failures == 1
+    assert "git add: 1 runs, 0 failed" in git.metrics()
+
+
+@pytest.mark.asyncio
+async def test_slow_commands_time_out(repository_path: Path):
+    """
+    Test that a command that takes longer than its timeout is stopped and reported as timed out,
+    and that a missing repository is reported as a failure.
+    """
+    git = GitPipeline(str(repository_path), local_timeout=0.000001)
+    result = await git.run("status")
+    assert result.timed_out and not result.ok
+    assert git.step_metrics["status"].timeouts == 1
+
+    missing = await GitPipeline(str(repository_path / "missing")).run("status")
+    assert missing.returncode is None and not missing.ok
+
+
+def clone(remote_path: Path, clone_path: Path) -> Path:
+    """
+    Clones the remote and configures the committer of the clone.
+    """
+    subprocess.run(["git", "clone", "-q", str(remote_path), str(clone_path)], check=True)
+    subprocess.run(["git", "-C", str(clone_path), "config", "user.name", "BSF-bot"], check=True)
+    subprocess.run(["git", "-C", str(clone_path), "config", "user.email", "bot@bsf"], check=True)
+    return clone_path
+
+
+def commit_file(clone_path: Path, name: str, content: str) -> None:
+    """
+    Commits a file in a clone.
+    """
+    (clone_path / name).write_text(content)
+    subprocess.run(["git", "-C", str(clone_path), "add", name], check=True)
+    subprocess.run(["git", "-C", str(clone_path), "commit", "-qm", name], check=True)
+
+
+@pytest.mark.asyncio
+async def test_push_rebased_onto_the_remote(tmp_path: Path):
+    """
+    Test that local commits are rebased onto commits that another clone pushed in the meantime,
+    without touching the working tree, and that a conflicting rebase is aborted and leaves the
+    local commits in place. A local bare repository stands in for the remote.
+    """
+    remote_path = tmp_path / "remote.git"
+    subprocess.run(["git", "init", "-q", "--bare", "-b", "master", str(remote_path)], check=True)
+    bot_clone = clone(remote_path, tmp_path / "bot")
+    commit_file(bot_clone, "1.csv", "Date,Weight\n")
+    subprocess.run(["git", "-C", str(bot_clone), "push", "-q", "origin", "HEAD:master"], check=True)
+    other_clone = clone(remote_path, tmp_path / "other")
+
+    commit_file(other_clone, "2.csv", "Date,Weight\n")
+    subprocess.run(["git", "-C", str(other_clone), "push", "-q"], check=True)
+    commit_file(bot_clone, "3.csv", "Date,Weight\n")
+    (bot_clone / "3.csv").write_text("Date,Weight\n2024-01-01,80.0\n")
+    git = GitPipeline(str(bot_clone))
+    assert (await git.push_rebased()).ok
+    # The working tree keeps the uncommitted change and doesn't get the file of the other clone,
+    # while the index matches the rebased commits.
+    assert (bot_clone / "3.csv").read_text() == "Date,Weight\n2024-01-01,80.0\n"
+    assert not (bot_clone / "2.csv").exists()
+    assert (await git.run("diff", "--cached", "--quiet")).ok
+    remote_log = subprocess.run(
+        ["git", "--git-dir", str(remote_path), "log", "--format=%s"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    assert remote_log == ["3.csv", "2.csv", "1.csv"]
+
+    subprocess.run(["git", "-C", str(other_clone), "pull", "-q"], check=True)
+    commit_file(other_clone, "1.csv", "Date,Weight\n2024-01-01,80.0\n")
+    subprocess.run(["git", "-C", str(other_clone), "push", "-q"], check=True)
+    commit_file(bot_clone, "1.csv", "Date,Weight\n2024-01-01,90.0\n")
+    local_head = (await git.run("rev-parse", "HEAD")).output
+    conflict = await git.push_rebased()
+    assert conflict.step == "rebase" and not conflict.ok
+    assert (await git.run("rev-parse", "HEAD")).output == local_head
+    assert len((await git.run("worktree", "list")).output.splitlines()) == 1
+    assert (bot_clone / "1.csv").read_text() == "Date,Weight\n2024-01-01,90.0\n"
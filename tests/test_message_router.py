@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+from libs.message_router import MessageRouter, RoutedMessage
+
+"""
+This module contains the test cases for the message router.
+"""
+
+
+def make_message(content: str, channel_id: int = 1, reply: bool = False) -> SimpleNamespace:
+    """
+    Creates a stand-in for a Discord message with the attributes the router reads.
+    """
+    reference = SimpleNamespace(resolved=None) if reply else None
+    return SimpleNamespace(
+        content=content, reference=reference, channel=SimpleNamespace(id=channel_id)
+    )
+
+
+@pytest.fixture
+def router_calls() -> tuple[MessageRouter, List[str]]:
+    """
+    A router with a route for every kind of prefilter, and a list of the routes that were called.
+    """
+    router = MessageRouter()
+    calls: List[str] = []
+
+    def handler(name: str):
+        async def handle(routed_message: RoutedMessage) -> None:
+            calls.append(name)
+
+        return handle
+
+    router.register("digits", handler("digits"), digits=True)
+    router.register("buzzwords", handler("buzzwords"), keywords=["eddie", "eddie hall"])
+    router.register("source", handler("source"), keywords=["source that"], reply=True)
+    router.register("polls", handler("polls"), channels=[42])
+    return router, calls
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        (make_message("good morning"), []),
+        (make_message("I weigh 90kg"), ["digits"]),
+        (make_message("EDDIE HALL is strong"), ["buzzwords"]),
+        (make_message("source that"), []),
+        (make_message("Source that please", reply=True), ["source"]),
+        (make_message("a poll", channel_id=42), ["polls"]),
+    ],
+)
+async def test_dispatch_prefilter(router_calls, message, expected):
+    """
+    Test that a message is only dispatched to the routes whose prefilter matches.
+    """
+    router, calls = router_calls
+    await router.dispatch(message)
+    assert sorted(calls) == sorted(expected)
+
+
+def test_overlapping_keywords(router_calls):
+    """
+    Test that a keyword inside of a longer keyword is found as well.
+    """
+    router, _ = router_calls
+    routed_message = RoutedMessage(
+        make_message("eddie hall"), router.keyword_pattern, router.contained_keywords
+    )
+    assert routed_message.keywords == {"eddie", "eddie hall"}
+
+
+@pytest.mark.asyncio
+async def test_unregister(router_calls):
+    """
+    Test that an unregistered route doesn't receive messages anymore.
+    """
+    router, calls = router_calls
+    router.unregister("digits")
+    await router.dispatch(make_message("I weigh 90kg"))
+    assert calls == []
@@ -0,0 +1,109 @@
+import asyncio
+from concurrent.futures import Executor, Future
+from typing import Callable, List, Optional
+
+import numpy as np
+import pytest
+
+from libs.nlp_pool import NlpProcessPool
+
+"""
+This module contains the test cases for the pool of NLP worker processes of the SourceCog.
+"""
+
+
+class FakeExecutor(Executor):
+    """
+    Runs nothing, and keeps the futures of the submitted calls, so a test decides when they
+    finish.
+    """
+
+    def __init__(self, answer: Optional[Callable[[List[str]], np.ndarray]] = None) -> None:
+        """
+        :param answer: Computes the result of a call right away, or None to leave it pending.
+        """
+        self.futures: List[Future] = []
+        self.texts: List[List[str]] = []
+        self.answer = answer
+
+    def submit(self, function, texts, *args, **kwargs) -> Future:
+        future = Future()
+        self.futures.append(future)
+        self.texts.append(texts)
+        if self.answer is not None:
+            future.set_result(self.answer(texts))
+        return future
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_an_inference():
+    """
+    Test that concurrent requests for the same text share a single inference.
+    """
+    executor = FakeExecutor()
+    pool = NlpProcessPool("en_core_web_md", timeout=5, executor=executor)
+    requests = [asyncio.create_task(pool.vector("Carbs make you fat")) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    assert executor.texts == [["Carbs make you fat"]]
+
+    executor.futures[0].set_result(np.array([[1.0, 2.0]], dtype=np.float32))
+    for vector in await asyncio.gather(*requests):
+        assert vector.tolist() == [1.0, 2.0]
+    assert pool.requests == 3 and pool.coalesced_requests == 2 and pool.inferences == 1
+    assert not pool.in_flight and not pool.waiting_requests
+
+
+@pytest.mark.asyncio
+async def test_timed_out_request_cancels_its_inference():
+    """
+    Test that a request fails after the timeout, and that its inference is cancelled because no
+    request waits for it anymore.
+    """
+    executor = FakeExecutor()
+    pool = NlpProcessPool("en_core_web_md", timeout=0.05, executor=executor)
+    with pytest.raises(asyncio.TimeoutError):
+        await pool.vector("Carbs make you fat")
+    await asyncio.sleep(0.01)
+
+    assert executor.futures[0].cancelled()
+    assert pool.timeouts == 1 and pool.inferences == 0
+    assert not pool.in_flight and not pool.waiting_requests
+
+
+def test_vectorize_in_batches_with_a_timeout():
+    """
+    Test that many texts are vectorized in batches, and that a batch that isn't computed within
+    the timeout fails the call and cancels the other batches.
+    """
+    texts = [f"paragraph {number}" for number in range(150)]
+    executor = FakeExecutor(lambda batch: np.ones((len(batch), 2), dtype=np.float32))
+    pool = NlpProcessPool("en_core_web_md", timeout=0.05, executor=executor)
+    assert pool.vectorize(texts).shape == (150, 2)
+    assert [len(batch) for batch in executor.texts] == [64, 64, 22]
+
+    hung_executor = FakeExecutor()
+    hung_pool = NlpProcessPool("en_core_web_md", timeout=0.05, executor=hung_executor)
+    with pytest.raises(TimeoutError):
+        hung_pool.vectorize(texts)
+    assert all(future.cancelled() for future in hung_executor.futures)
+
+
+@pytest.mark.asyncio
+async def test_request_after_a_cancelled_inference_starts_a_new_one():
+    """
+    Test that a request for a text whose inference was just cancelled doesn't join the cancelled
+    inference, but gets the vector from a new inference.
+    """
+    executor = FakeExecutor()
+    pool = NlpProcessPool("en_core_web_md", timeout=0.05, executor=executor)
+    with pytest.raises(asyncio.TimeoutError):
+        await pool.vector("Carbs make you fat")
+    cancelled_inference = pool.in_flight.get("Carbs make you fat")
+    assert cancelled_inference is None or cancelled_inference.cancelled()
+
+    request = asyncio.create_task(pool.vector("Carbs make you fat"))
+    await asyncio.sleep(0.01)
+    assert len(executor.texts) == 2 and pool.coalesced_requests == 0
+    executor.futures[1].set_result(np.array([[1.0, 2.0]], dtype=np.float32))
+    assert (await request).tolist() == [1.0, 2.0]
+    assert not pool.in_flight and not pool.waiting_requests
@@ -0,0 +1,34 @@
+from libs.plot_cache import PlotCache
+
+"""
+This module contains the test cases for the plot cache.
+"""
+
+
+def test_hits_and_misses():
+    """
+    Test that the cache counts hits and misses.
+    """
+    cache = PlotCache(max_entries=2)
+    assert cache.get(("1", 1, "all")) is None
+
+    cache.put(("1", 1, "all"), b"png")
+    assert cache.get(("1", 1, "all")) == b"png"
+    # A new data version is a different key.
+    assert cache.get(("1", 2, "all")) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_is_evicted():
+    """
+    Test that the least recently used plot is evicted when the cache is full.
+    """
+    cache = PlotCache(max_entries=2)
+    cache.put("a", b"a")
+    cache.put("b", b"b")
+    cache.get("a")
+    cache.put("c", b"c")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"a"
+    assert cache.get("c") == b"c"
@@ -0,0 +1,44 @@
+from pathlib import Path
+
+from libs.push_outbox import PushOutbox
+
+"""
+This module contains the test cases for the outbox of the data commits that still have to be
+pushed.
+"""
+
+
+def test_failed_pushes_back_off_exponentially(tmp_path: Path):
+    """
+    Test that the delay between retries doubles with every failure within the jitter, is capped,
+    and is reset by a successful push.
+    """
+    outbox = PushOutbox(str(tmp_path / "push_outbox.json"), base_delay=10, max_delay=100)
+    outbox.add("Committing user data", 0)
+    assert outbox.is_due(0)
+
+    for attempt, delay in enumerate([10, 20, 40, 80, 100, 100], start=1):
+        retry_delay = outbox.record_failure("git push failed (1)", 1000)
+        assert delay / 2 <= retry_delay <= delay
+        assert outbox.attempts == attempt
+    assert not outbox.is_due(1000) and outbox.is_due(1100)
+
+    outbox.record_success(1200)
+    assert not outbox.pending and outbox.next_attempt is None and outbox.attempts == 0
+
+
+def test_outbox_survives_a_restart(tmp_path: Path):
+    """
+    Test that the pending commits and the retry state are loaded again by a new outbox.
+    """
+    outbox = PushOutbox(str(tmp_path / "push_outbox.json"))
+    outbox.add("Committing user data", 0)
+    outbox.record_failure("git fetch timed out", 1000)
+    outbox.save(outbox.dumps())
+
+    loaded = PushOutbox(str(tmp_path / "push_outbox.json"))
+    loaded.load()
+    assert loaded.commits == outbox.commits
+    assert loaded.next_attempt == outbox.next_attempt
+    assert "Commits waiting to be pushed: 1" in loaded.status(1000)
+    assert "git fetch timed out" in loaded.status(1000)
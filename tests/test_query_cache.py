@@ -0,0 +1,38 @@
+from libs.query_cache import SourceQueryCache, normalize_query
+
+"""
+This module contains the test cases for the query cache of the SourceCog.
+"""
+
+
+def test_normalized_queries_share_results():
+    """
+    Test that queries that only differ in case, punctuation and spacing hit the same entry, that
+    empty results are cached, and that the least recently used result is evicted.
+    """
+    cache = SourceQueryCache(max_entries=2)
+    carbs = [("info_commands/carbs.txt", "Carbohydrates are not bad", 0.8)]
+    cache.put(normalize_query("Carbs make you fat!"), carbs, cache.generation)
+    cache.put(normalize_query("olive oil"), [], cache.generation)
+
+    assert cache.get(normalize_query("  carbs MAKE you fat")) == carbs
+    assert cache.get(normalize_query("Olive oil?")) == []
+    cache.put(normalize_query("creatine"), [], cache.generation)
+    assert cache.get(normalize_query("carbs make you fat")) is None
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert "67% hit rate" in cache.metrics()
+
+
+def test_invalidation_drops_results_of_running_searches():
+    """
+    Test that an invalidation removes every result, and that a search that started before the
+    invalidation doesn't add its result afterwards.
+    """
+    cache = SourceQueryCache()
+    cache.put("carbs", [], cache.generation)
+    generation = cache.generation
+    cache.invalidate()
+    cache.put("creatine", [], generation)
+
+    assert cache.get("carbs") is None
+    assert cache.get("creatine") is None
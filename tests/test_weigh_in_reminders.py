@@ -0,0 +1,63 @@
+from datetime import datetime, time, timezone
+from pathlib import Path
+
+from libs.weigh_in_reminders import ReminderSchedule, ReminderSubscription
+
+"""
+This module contains the test cases for the schedule of the weigh-in reminders.
+"""
+
+NOW = datetime(2024, 3, 29, 12, 0, tzinfo=timezone.utc)
+"""
+A Friday, two days before daylight saving time starts in Europe.
+"""
+
+
+def test_next_due_keeps_the_local_time():
+    """
+    Test that a daily reminder stays at the same local time when daylight saving time starts, and
+    that a weekly reminder is only due on its weekday.
+    """
+    daily = ReminderSubscription(1, "daily", time(7, 30), "Europe/Amsterdam", 0)
+    first = daily.next_due(NOW)
+    assert first.astimezone(timezone.utc) == datetime(2024, 3, 30, 6, 30, tzinfo=timezone.utc)
+    after_switch = daily.next_due(daily.next_due(first))
+    assert after_switch.astimezone(timezone.utc) == datetime(
+        2024, 4, 1, 5, 30, tzinfo=timezone.utc
+    )
+
+    weekly = ReminderSubscription(1, "weekly", time(13, 0), "UTC", 4)
+    assert weekly.next_due(NOW) == datetime(2024, 3, 29, 13, 0, tzinfo=timezone.utc)
+    assert weekly.next_due(weekly.next_due(NOW)).day == 5
+
+
+def test_pop_due_returns_the_due_reminders_in_order():
+    """
+    Test that only the due reminders are taken out, that they are scheduled again, and that
+    cancelled or changed subscriptions don't leave old reminders behind.
+    """
+    schedule = ReminderSchedule("unused.json")
+    for user_id, minute in (("1", 5), ("2", 1), ("3", 1), ("4", 30)):
+        subscription = ReminderSubscription(1, "daily", time(12, minute), "UTC", 0)
+        schedule.subscribe(user_id, subscription, NOW)
+    schedule.unsubscribe("3")
+    schedule.subscribe("4", ReminderSubscription(1, "daily", time(12, 2), "UTC", 0), NOW)
+
+    now = datetime(2024, 3, 29, 12, 10, tzinfo=timezone.utc)
+    assert [user_id for user_id, _ in schedule.pop_due(now)] == ["2", "4", "1"]
+    assert schedule.pop_due(now) == []
+    assert schedule.next_due() == datetime(2024, 3, 30, 12, 1, tzinfo=timezone.utc)
+
+
+def test_subscriptions_survive_a_reload(tmp_path: Path):
+    """
+    Test that the subscriptions are loaded with the same due times after they are saved.
+    """
+    schedule = ReminderSchedule(str(tmp_path / "reminders.json"))
+    schedule.subscribe("1", ReminderSubscription(7, "weekly", time(8, 0), "Asia/Tokyo", 2), NOW)
+    schedule.save(schedule.dumps())
+
+    loaded = ReminderSchedule(str(tmp_path / "reminders.json"))
+    loaded.load(NOW)
+    assert loaded.due_times == schedule.due_times
+    assert loaded.subscriptions["1"].channel_id == 7
@@ -0,0 +1,99 @@
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from libs.weight_aggregates import UserSummary, WeightAggregateIndex
+from libs.weight_stats import to_arrays
+
+"""
+This module contains the test cases for the server weight statistics index.
+"""
+
+TODAY = date(2024, 3, 1)
+
+
+def summarize(entries) -> UserSummary:
+    """
+    Summarizes a list of (date, weight) entries.
+    """
+    return UserSummary.from_arrays(*to_arrays(entries))
+
+
+def test_user_summary():
+    """
+    Test that the weekly change is taken from the entry 7 to 14 days before the last entry.
+    """
+    summary = summarize(
+        [(TODAY - timedelta(days=10), 82.0), (TODAY - timedelta(days=5), 81.0), (TODAY, 80.5)]
+    )
+    assert (summary.last_logged, summary.total_change, summary.weekly_change) == (TODAY, -1.5, -1.5)
+
+    assert summarize([(TODAY - timedelta(days=30), 82.0), (TODAY, 80.0)]).weekly_change is None
+    assert UserSummary.from_arrays(np.array([], np.int32), np.array([])) is None
+
+
+def test_incremental_updates_match_a_rebuild(tmp_path: Path):
+    """
+    Test that random incremental updates end up with the same statistics as summarizing the final
+    data from scratch, and that the statistics survive a reload.
+    """
+    random.seed(10)
+    index = WeightAggregateIndex(str(tmp_path / "index.json"))
+    final_summaries = {}
+    for _ in range(500):
+        user_id = str(random.randrange(20))
+        days = sorted(random.sample(range(30), random.randrange(0, 6)))
+        entries = [(TODAY - timedelta(days=day), 70.0 + day) for day in days]
+        summary = summarize(entries) if entries else None
+        index.update(user_id, summary)
+        final_summaries[user_id] = summary
+
+    rebuilt = WeightAggregateIndex(str(tmp_path / "rebuilt.json"))
+    for user_id, summary in final_summaries.items():
+        rebuilt.update(user_id, summary)
+    index.save(index.dumps())
+    loaded = WeightAggregateIndex(str(tmp_path / "index.json"))
+    assert loaded.load()
+
+    for other in (rebuilt, loaded):
+        assert other.report(TODAY) == index.report(TODAY)
+        assert other.weekly_changes == index.weekly_changes
+
+
+def test_rebuild_progress_is_persisted(tmp_path: Path):
+    """
+    Test that the users a rebuild still has to process are restored after a restart, and that
+    users without data are removed when a rebuild starts.
+    """
+    index = WeightAggregateIndex(str(tmp_path / "index.json"))
+    index.update("1", summarize([(TODAY, 80.0)]))
+    index.start_rebuild(["2", "3"])
+    assert "1" not in index.summaries
+
+    index.rebuild_pending.pop()
+    index.save(index.dumps())
+    loaded = WeightAggregateIndex(str(tmp_path / "index.json"))
+    loaded.load()
+    assert loaded.rebuild_pending == ["3"]
+    assert loaded.active_users(TODAY) == 0
+
+
+def test_checkpoint_is_recognized_after_a_crash(tmp_path: Path):
+    """
+    Test that a loaded checkpoint is marked as possibly missing changes, and that the save at
+    shutdown isn't.
+    """
+    index = WeightAggregateIndex(str(tmp_path / "index.json"))
+    index.update("1", summarize([(TODAY, 80.0)]))
+    index.save(index.dumps())
+    checkpoint = WeightAggregateIndex(str(tmp_path / "index.json"))
+    assert checkpoint.load()
+    assert not checkpoint.saved_at_shutdown
+
+    index.save(index.dumps(saved_at_shutdown=True))
+    shutdown = WeightAggregateIndex(str(tmp_path / "index.json"))
+    assert shutdown.load()
+    assert shutdown.saved_at_shutdown
+    assert shutdown.active_users(TODAY) == 1
@@ -0,0 +1,43 @@
+import random
+import zipfile
+
+from libs.weight_export import ZipExportWriter
+
+"""
+This module contains the test cases for the zip archive writer of the weight export.
+"""
+
+
+def test_archives_stay_under_the_limit():
+    """
+    Test that files are split over archives that stay under the size limit, and that every file
+    ends up in exactly one archive.
+    """
+    random.seed(0)
+    files = {
+        f"{user_id}.csv": bytes(random.getrandbits(8) for _ in range(random.randrange(20_000)))
+        for user_id in range(40)
+    }
+    writer = ZipExportWriter(max_archive_bytes=100_000, spool_bytes=10_000)
+    archives = [writer.add(file_name, data) for file_name, data in files.items()]
+    archives = [archive for archive in archives + [writer.finish()] if archive]
+
+    assert len(archives) > 1
+    exported = {}
+    for archive in archives:
+        assert len(archive.read()) <= 100_000
+        with zipfile.ZipFile(archive) as zip_file:
+            for file_name in zip_file.namelist():
+                exported[file_name] = zip_file.read(file_name)
+    assert exported == files
+
+
+def test_finish_without_files():
+    """
+    Test that finishing without new files doesn't create an empty archive.
+    """
+    writer = ZipExportWriter(max_archive_bytes=1000)
+    assert writer.finish() is None
+    writer.add("1.csv", b"Date,Weight\r\n")
+    assert writer.finish() is not None
+    assert writer.finish() is None
@@ -0,0 +1,82 @@
+import json
+from datetime import date, timedelta
+
+from libs.weight_import import WeightImportParser
+from libs.weight_repository import entries_to_csv, merge_entries
+
+"""
+This module contains the test cases for the parser of imported weight files.
+"""
+
+FIRST_DATE = date(2020, 1, 1)
+
+
+def feed_in_chunks(parser: WeightImportParser, data: bytes, chunk_size: int) -> None:
+    """
+    Feeds data to a parser in chunks of a fixed size.
+    """
+    for offset in range(0, len(data), chunk_size):
+        parser.feed(data[offset : offset + chunk_size])
+
+
+def test_csv_rows_split_across_chunks():
+    """
+    Test that a 10k row csv file is parsed the same, regardless of where the chunks end.
+    """
+    entries = [(FIRST_DATE + timedelta(days=day), 80.0 + day % 10) for day in range(10_000)]
+    data = entries_to_csv(reversed(entries)).encode()
+
+    for chunk_size in (7, 64 * 1024):
+        parser = WeightImportParser("csv")
+        feed_in_chunks(parser, data, chunk_size)
+        assert parser.finish() == entries
+        assert (parser.rows, parser.invalid_rows) == (10_000, 0)
+
+
+def test_invalid_csv_rows_are_skipped():
+    """
+    Test that invalid rows are counted and described, and that the last row of a date wins.
+    """
+    parser = WeightImportParser("csv")
+    parser.feed(b"date,kg\r\n2020-01-01,80\n2020-13-01,80\n\n2020-01-02,heavy\n2020-01-02,-1\n")
+    parser.feed(b"just text\n2020-01-01,81.5")
+
+    assert parser.finish() == [(FIRST_DATE, 81.5)]
+    assert parser.invalid_rows == 4
+    assert parser.errors[0] == "row 2: invalid date `2020-13-01`"
+
+
+def test_json_formats():
+    """
+    Test that json lists of objects, lists of pairs and date to weight objects are imported.
+    """
+    documents = [
+        [{"date": "2020-01-01", "weight": 80}, {"date": "2020-01-02", "weight": "81.0"}],
+        [["2020-01-01", 80], ["2020-01-02", 81.0], ["2020-01-03", True]],
+        {"2020-01-01": 80, "2020-01-02": 81},
+    ]
+    for document in documents:
+        parser = WeightImportParser("json")
+        feed_in_chunks(parser, json.dumps(document).encode(), 5)
+        assert parser.finish() == [(FIRST_DATE, 80.0), (FIRST_DATE + timedelta(days=1), 81.0)]
+
+    parser = WeightImportParser("json")
+    parser.feed(b"[{")
+    assert parser.finish() == []
+    assert parser.errors[0].startswith("not valid json")
+
+
+def test_merge_entries():
+    """
+    Test that merging replaces the entries of the same date and keeps the entries sorted.
+    """
+    entries = [(date(2020, 1, day), 80.0) for day in (1, 3, 5)]
+    updates = [(date(2020, 1, day), 70.0) for day in (2, 3, 6)]
+
+    assert merge_entries(entries, updates) == [
+        (date(2020, 1, 1), 80.0),
+        (date(2020, 1, 2), 70.0),
+        (date(2020, 1, 3), 70.0),
+        (date(2020, 1, 5), 80.0),
+        (date(2020, 1, 6), 70.0),
+    ]
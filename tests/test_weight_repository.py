@@ -0,0 +1,266 @@
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+from libs.weight_repository import (BinaryWeightRepository,
+                                    CsvWeightRepository,
+                                    SqliteWeightRepository, WeightRepository,
+                                    export_csv_directory, import_csv_directory)
+
+"""
+This module contains the test cases for the weight repositories.
+"""
+
+
+@pytest.fixture(params=["csv", "sqlite", "binary"])
+def repository(request, tmp_path: Path) -> WeightRepository:
+    """
+    A weight repository of every storage backend.
+    """
+    if request.param == "csv":
+        repository = CsvWeightRepository(str(tmp_path / "weightcog"))
+    elif request.param == "binary":
+        repository = BinaryWeightRepository(str(tmp_path / "weightcog_binary"))
+    else:
+        repository = SqliteWeightRepository(str(tmp_path / "weightcog.sqlite3"))
+    yield repository
+    repository.close()
+
+
+def test_upsert_replaces_date(repository: WeightRepository):
+    """
+    Test that entries are sorted by date and unique per date.
+    """
+    repository.upsert("1", date(2024, 1, 2), 80.0)
+    repository.upsert("1", date(2024, 1, 1), 81.0)
+    repository.upsert("1", date(2024, 1, 2), 79.5)
+
+    assert repository.read_range("1") == [(date(2024, 1, 1), 81.0), (date(2024, 1, 2), 79.5)]
+    assert repository.user_ids() == ["1"]
+
+
+def test_read_range(repository: WeightRepository):
+    """
+    Test that a range only returns the entries between the inclusive bounds.
+    """
+    repository.upsert_many("1", [(date(2024, 1, day), 80.0 + day) for day in range(1, 11)])
+
+    entries = repository.read_range("1", date(2024, 1, 3), date(2024, 1, 5))
+    assert entries == [(date(2024, 1, 3), 83.0), (date(2024, 1, 4), 84.0), (date(2024, 1, 5), 85.0)]
+    assert repository.read_range("2") == []
+
+
+def test_read_random_ranges(repository: WeightRepository):
+    """
+    Test random ranges over a history with gaps against a plain filter of all entries.
+    """
+    random.seed(0)
+    first_date = date(2020, 1, 1)
+    entries = [
+        (first_date + timedelta(days=day), round(random.uniform(60, 100), 1))
+        for day in sorted(random.sample(range(1000), 300))
+    ]
+    repository.upsert_many("1", entries)
+
+    for _ in range(50):
+        start = first_date + timedelta(days=random.randint(-10, 1010))
+        end = start + timedelta(days=random.randint(0, 100))
+        expected = [entry for entry in entries if start <= entry[0] <= end]
+        assert repository.read_range("1", start, end) == expected
+
+    assert repository.read_range("1", first_date + timedelta(days=2000)) == []
+    assert repository.read_range("1", end=first_date - timedelta(days=1)) == []
+
+
+def test_remove_and_delete(repository: WeightRepository):
+    """
+    Test removing a single entry and deleting all data of a user.
+    """
+    repository.upsert_many("1", [(date(2024, 1, 1), 80.0), (date(2024, 1, 2), 81.0)])
+
+    assert repository.remove("1", date(2024, 1, 1)) == 80.0
+    assert repository.remove("1", date(2024, 1, 1)) is None
+    assert repository.read_range("1") == [(date(2024, 1, 2), 81.0)]
+
+    assert repository.delete_user("1")
+    assert not repository.has_data("1")
+    assert not repository.delete_user("1")
+
+
+def test_import_csv_directory(tmp_path: Path):
+    """
+    Test importing the csv files of the WeightCog into a SQLite database.
+    """
+    csv_repository = CsvWeightRepository(str(tmp_path / "weightcog"))
+    csv_repository.upsert_many("1", [(date(2024, 1, 1), 80.0), (date(2024, 1, 2), 81.0)])
+    csv_repository.upsert_goal("1", date(2024, 6, 1), 75.0)
+    (tmp_path / "weightcog" / "1_plot.png").write_bytes(b"")
+
+    database = SqliteWeightRepository(str(tmp_path / "weightcog.sqlite3"))
+    assert import_csv_directory(str(tmp_path / "weightcog"), database) == 1
+    assert database.read_range("1") == csv_repository.read_range("1")
+    assert database.export_csv("1") == csv_repository.export_csv("1")
+    database.close()
+
+
+def test_sqlite_checkpoint_completes_the_committed_file(tmp_path: Path):
+    """
+    Test that the database file of the data commit contains the transactions of the write-ahead
+    log after a checkpoint, without the log, and that `data_paths` doesn't checkpoint.
+    """
+    database = SqliteWeightRepository(str(tmp_path / "weightcog.sqlite3"))
+    database.upsert("1", date(2024, 1, 1), 80.0)
+    (database_path,) = database.data_paths("1")
+    assert Path(f"{database_path}-wal").stat().st_size > 0
+    assert database.checkpoint()
+    committed_copy = tmp_path / "committed.sqlite3"
+    committed_copy.write_bytes(Path(database_path).read_bytes())
+    database.close()
+
+    assert SqliteWeightRepository(str(committed_copy)).read_range("1") == [(date(2024, 1, 1), 80.0)]
+
+
+def test_upsert_groups(repository: WeightRepository):
+    """
+    Test that the entries of a group of users are written like with `upsert_many` for every user,
+    both after and between existing entries, and that the data versions of the users change.
+    """
+    repository.upsert_many("1", [(date(2024, 1, 1), 80.0), (date(2024, 1, 3), 82.0)])
+    repository.upsert_many("2", [(date(2024, 1, 1), 90.0)])
+    versions = {user_id: repository.data_version(user_id) for user_id in ["1", "2", "3"]}
+    errors = repository.upsert_groups(
+        {
+            "1": [(date(2024, 1, 2), 81.0)],
+            "2": [(date(2024, 1, 2), 91.0), (date(2024, 1, 1), 89.5)],
+            "3": [(date(2024, 1, 1), 70.0)],
+        }
+    )
+
+    assert errors == {}
+    assert repository.read_range("1") == [
+        (date(2024, 1, 1), 80.0),
+        (date(2024, 1, 2), 81.0),
+        (date(2024, 1, 3), 82.0),
+    ]
+    assert repository.read_range("2") == [(date(2024, 1, 1), 89.5), (date(2024, 1, 2), 91.0)]
+    assert repository.read_range("3") == [(date(2024, 1, 1), 70.0)]
+    assert all(repository.data_version(user_id) != versions[user_id] for user_id in versions)
+
+
+def test_upsert_groups_with_an_unreadable_csv_file(tmp_path: Path):
+    """
+    Test that a csv file that can't be read only fails the write of its own user.
+    """
+    repository = CsvWeightRepository(str(tmp_path))
+    Path(repository.weight_path("1")).write_text("Date,Weight\nyesterday,80.0\n")
+    errors = repository.upsert_groups(
+        {"1": [(date(2024, 1, 1), 80.0)], "2": [(date(2024, 1, 1), 90.0)]}
+    )
+
+    assert list(errors) == ["1"]
+    assert repository.read_range("2") == [(date(2024, 1, 1), 90.0)]
+
+
+def test_upsert_sorts_unsorted_csv_file(tmp_path: Path):
+    """
+    Test that an upsert into a csv file that was edited by hand sorts the file again.
+    """
+    repository = CsvWeightRepository(str(tmp_path))
+    Path(repository.weight_path("1")).write_text(
+        "Date,Weight\n2024-01-03,83.0\n2024-01-01,80.0\n2024-01-03,82.0\n"
+    )
+    repository.upsert("1", date(2024, 1, 2), 81.0)
+
+    assert repository.read_range("1") == [
+        (date(2024, 1, 1), 80.0),
+        (date(2024, 1, 2), 81.0),
+        (date(2024, 1, 3), 82.0),
+    ]
+
+
+def test_read_range_of_csv_file_sorted_as_text(tmp_path: Path):
+    """
+    Test that a range of an older csv file, which was sorted as text and has dates without leading
+    zeros, is read correctly, and that the file is binary searched once it has been sorted.
+    """
+    repository = CsvWeightRepository(str(tmp_path))
+    csv_path = repository.weight_path("1")
+    Path(csv_path).write_text("Date,Weight\n2024-1-10,80.0\n2024-1-2,82.0\n2024-1-9,81.0\n")
+
+    for _ in range(2):
+        assert repository.read_range("1", date(2024, 1, 5)) == [
+            (date(2024, 1, 9), 81.0),
+            (date(2024, 1, 10), 80.0),
+        ]
+    assert csv_path not in repository.sorted_files
+
+    repository.upsert("1", date(2024, 1, 11), 79.5)
+    assert csv_path in repository.sorted_files
+    assert repository.read_range("1", date(2024, 1, 5), date(2024, 1, 10)) == [
+        (date(2024, 1, 9), 81.0),
+        (date(2024, 1, 10), 80.0),
+    ]
+
+
+def test_binary_round_trip(tmp_path: Path):
+    """
+    Test converting csv files into the binary format and back, including the goals.
+    """
+    csv_repository = CsvWeightRepository(str(tmp_path / "weightcog"))
+    csv_repository.upsert_many("1", [(date(2024, 1, 1), 80.1), (date(2024, 1, 2), 81.25)])
+    csv_repository.upsert_goal("1", date(2024, 6, 1), 75.0)
+
+    binary_repository = BinaryWeightRepository(str(tmp_path / "weightcog_binary"))
+    assert import_csv_directory(str(tmp_path / "weightcog"), binary_repository) == 1
+    assert binary_repository.read_range("1") == csv_repository.read_range("1")
+    assert binary_repository.export_csv("1") == csv_repository.export_csv("1")
+
+    assert export_csv_directory(binary_repository, str(tmp_path / "converted")) == 1
+    converted_repository = CsvWeightRepository(str(tmp_path / "converted"))
+    for file_name in ("1.csv", "1_goal_weight.csv"):
+        converted = Path(converted_repository.paths.resolve("1", file_name)).read_text()
+        assert converted == Path(csv_repository.paths.resolve("1", file_name)).read_text()
+
+
+def test_binary_appends_in_place(tmp_path: Path):
+    """
+    Test that daily appends write into the existing file, and that a partial record left by an
+    interrupted append is ignored and overwritten.
+    """
+    repository = BinaryWeightRepository(str(tmp_path))
+    repository.upsert("1", date(2024, 1, 1), 80.0)
+    inode = Path(repository.weight_path("1")).stat().st_ino
+    repository.upsert("1", date(2024, 1, 2), 81.0)
+    repository.upsert("1", date(2024, 1, 2), 81.5)
+    assert Path(repository.weight_path("1")).stat().st_ino == inode
+
+    with open(repository.weight_path("1"), "ab") as binary_file:
+        binary_file.write(b"\x01\x02\x03")
+    assert repository.read_range("1") == [(date(2024, 1, 1), 80.0), (date(2024, 1, 2), 81.5)]
+
+    repository.upsert("1", date(2024, 1, 3), 82.0)
+    assert Path(repository.weight_path("1")).stat().st_size == 3 * 8
+    assert repository.read_range("1", date(2024, 1, 2))[-1] == (date(2024, 1, 3), 82.0)
+
+
+def test_flat_data_directory_is_migrated_lazily(tmp_path: Path):
+    """
+    Test that the files of a flat data directory are listed right away, and are moved into their
+    shard directory when they are first accessed.
+    """
+    (tmp_path / "123456789.csv").write_text("Date,Weight\n2024-01-01,80.0\n")
+    (tmp_path / "123456789_goal_weight.csv").write_text("Date,Weight\n2024-06-01,75.0\n")
+    (tmp_path / "5.csv").write_text("Date,Weight\n2024-01-01,90.0\n")
+    repository = CsvWeightRepository(str(tmp_path))
+    assert repository.user_ids() == ["123456789", "5"]
+
+    assert repository.read_range("123456789") == [(date(2024, 1, 1), 80.0)]
+    assert (tmp_path / "89" / "123456789.csv").exists()
+    assert not (tmp_path / "123456789.csv").exists()
+    assert (tmp_path / "123456789_goal_weight.csv").exists()
+    assert repository.read_goals("123456789") == [(date(2024, 6, 1), 75.0)]
+    assert not (tmp_path / "123456789_goal_weight.csv").exists()
+
+    assert CsvWeightRepository(str(tmp_path)).user_ids() == ["123456789", "5"]
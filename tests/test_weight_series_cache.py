@@ -0,0 +1,104 @@
+import os
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+from libs.async_weight_repository import AsyncWeightRepository
+from libs.weight_repository import CsvWeightRepository, entries_to_csv
+from libs.weight_series_cache import (WeightSeries, WeightSeriesCache,
+                                      tuple_list_size)
+
+"""
+This module contains the test cases for the weight series cache.
+"""
+
+FIRST_DATE = date(2020, 1, 1)
+
+
+def make_series(days: int, version=1) -> WeightSeries:
+    """
+    Creates a series with an entry on each of a number of days.
+    """
+    return WeightSeries.from_entries(
+        [(FIRST_DATE + timedelta(days=day), 80.0 + day) for day in range(days)], version
+    )
+
+
+@pytest.fixture
+def repository(tmp_path: Path) -> AsyncWeightRepository:
+    """
+    An async csv weight repository with a series cache.
+    """
+    async_repository = AsyncWeightRepository(
+        CsvWeightRepository(str(tmp_path)), series_cache=WeightSeriesCache(1024 * 1024)
+    )
+    yield async_repository
+    async_repository.close()
+
+
+def test_series_updates():
+    """
+    Test that upserts replace entries of the same date, and that slices are inclusive.
+    """
+    series = make_series(5)
+    series = series.upsert([(FIRST_DATE + timedelta(days=2), 1.0), (date(2019, 12, 31), 2.0)], 2)
+    assert series.entries()[:4] == [
+        (date(2019, 12, 31), 2.0),
+        (FIRST_DATE, 80.0),
+        (FIRST_DATE + timedelta(days=1), 81.0),
+        (FIRST_DATE + timedelta(days=2), 1.0),
+    ]
+    series = series.remove(FIRST_DATE, 3)
+    assert len(series) == 5 and series.version == 3
+    assert len(series.slice(FIRST_DATE + timedelta(days=1), FIRST_DATE + timedelta(days=3))) == 3
+
+
+def test_memory_budget_evicts_least_recently_used():
+    """
+    Test that the least recently used series are evicted when the memory budget is exceeded, and
+    that an outdated version is a miss.
+    """
+    cache = WeightSeriesCache(max_bytes=2 * make_series(10).nbytes)
+    cache.put("a", make_series(10))
+    cache.put("b", make_series(10))
+    assert cache.get("a", 1) is not None
+    cache.put("c", make_series(10))
+
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 2) is None
+    assert cache.get("c", 1) is not None
+    assert cache.nbytes == make_series(10).nbytes
+    assert make_series(1000).nbytes * 8 < tuple_list_size(1000)
+
+
+@pytest.mark.asyncio
+async def test_writes_go_through_the_cache(repository: AsyncWeightRepository):
+    """
+    Test that writes update the cached series instead of invalidating it.
+    """
+    await repository.upsert("1", FIRST_DATE, 80.0)
+    assert await repository.read_range("1") == [(FIRST_DATE, 80.0)]
+
+    await repository.upsert("1", FIRST_DATE + timedelta(days=1), 81.0)
+    await repository.remove("1", FIRST_DATE)
+    misses = repository.series_cache.misses
+    assert await repository.read_range("1") == [(FIRST_DATE + timedelta(days=1), 81.0)]
+    assert repository.series_cache.misses == misses
+
+
+@pytest.mark.asyncio
+async def test_changes_outside_of_the_bot_invalidate(repository: AsyncWeightRepository):
+    """
+    Test that a file that is changed outside of the bot is read again.
+    """
+    await repository.upsert("1", FIRST_DATE, 80.0)
+    assert await repository.read_range("1") == [(FIRST_DATE, 80.0)]
+
+    path = repository.repository.weight_path("1")
+    with open(path, "w") as csv_file:
+        csv_file.write(entries_to_csv([(FIRST_DATE, 70.0)]))
+    # Make sure the modification time changes on file systems with a coarse resolution.
+    os.utime(path, ns=(0, 0))
+
+    assert await repository.read_range("1") == [(FIRST_DATE, 70.0)]
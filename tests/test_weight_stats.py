@@ -0,0 +1,65 @@
+from datetime import date
+
+import numpy as np
+
+from libs.weight_stats import (largest_triangle_three_buckets, moving_average,
+                               ordinals_to_dates, to_arrays)
+
+"""
+This module contains the test cases for the weight statistics.
+"""
+
+
+def test_moving_average_uses_calendar_days():
+    """
+    Test that the window is measured in days, so skipped days are not averaged in.
+    """
+    ordinals, weights = to_arrays(
+        [
+            (date(2024, 1, 1), 80.0),
+            (date(2024, 1, 2), 82.0),
+            (date(2024, 1, 3), 84.0),
+            # Three skipped days.
+            (date(2024, 1, 7), 90.0),
+        ]
+    )
+
+    avg_ordinals, averages = moving_average(ordinals, weights, 3)
+
+    assert ordinals_to_dates(avg_ordinals).tolist() == [date(2024, 1, 3), date(2024, 1, 7)]
+    # The window of 2024-01-07 (01-05 up to 01-07) only contains the entry of 01-07.
+    assert np.allclose(averages, [82.0, 90.0])
+
+
+def test_moving_average_without_full_window():
+    """
+    Test that no averages are returned when the history is shorter than the window.
+    """
+    ordinals, weights = to_arrays([(date(2024, 1, 1), 80.0), (date(2024, 1, 2), 81.0)])
+    avg_ordinals, averages = moving_average(ordinals, weights, 7)
+    assert len(avg_ordinals) == len(averages) == 0
+
+
+def test_downsampling_keeps_extremes():
+    """
+    Test that LTTB keeps the first, last, lowest and highest entry, and returns sorted indices.
+    """
+    rng = np.random.default_rng(0)
+    ordinals = np.arange(10_000, dtype=np.int32) + date(2000, 1, 1).toordinal()
+    weights = 80 + rng.normal(0, 0.5, len(ordinals))
+    weights[1234], weights[8765] = 60.0, 100.0
+
+    indices = largest_triangle_three_buckets(ordinals, weights, 200)
+
+    assert len(indices) == 200
+    assert np.all(np.diff(indices) > 0)
+    assert {0, 1234, 8765, 9999} <= set(indices.tolist())
+
+
+def test_downsampling_short_series():
+    """
+    Test that a series with fewer entries than the threshold isn't downsampled.
+    """
+    ordinals, weights = to_arrays([(date(2024, 1, day), 80.0) for day in range(1, 11)])
+    assert largest_triangle_three_buckets(ordinals, weights, 500).tolist() == list(range(10))
+    assert len(largest_triangle_three_buckets(ordinals, weights, 0)) == 10
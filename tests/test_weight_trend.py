@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from libs.weight_trend import WeightTrend, WeightTrendStore
+
+"""
+This module contains the test cases for the weight trend and the goal projection.
+"""
+
+START = date(2024, 1, 1).toordinal()
+
+
+def test_incremental_updates_match_a_recompute():
+    """
+    Test that adding entries one by one ends up with the same trend as computing it from the whole
+    series.
+    """
+    rng = np.random.default_rng(3)
+    ordinals = START + np.cumsum(rng.integers(1, 4, 200))
+    weights = 90 - 0.05 * (ordinals - START) + rng.normal(0, 0.5, len(ordinals))
+
+    trend = WeightTrend()
+    for ordinal, weight in zip(ordinals.tolist(), weights.tolist()):
+        trend.add(ordinal, weight)
+    recomputed = WeightTrend.from_arrays(ordinals, weights)
+
+    for name, value in recomputed.__dict__.items():
+        assert getattr(trend, name) == pytest.approx(value, rel=1e-9), name
+    assert trend.matches(ordinals)
+
+
+def test_out_of_order_entries_mark_the_trend_stale():
+    """
+    Test that an entry that isn't after the last entry marks the trend stale instead of updating
+    it.
+    """
+    trend = WeightTrend()
+    trend.add(START + 1, 80.0)
+    trend.add(START, 81.0)
+    assert trend.stale
+    assert not trend.matches(np.array([START, START + 1]))
+
+
+def test_projected_date_of_a_linear_series():
+    """
+    Test that a steady loss of 0.1 kg per day projects the goal at the matching date, and that no
+    date is projected when the weight moves away from the goal.
+    """
+    ordinals = np.arange(START, START + 100)
+    trend = WeightTrend.from_arrays(ordinals, 100 - 0.1 * (ordinals - START))
+    assert trend.slope() == pytest.approx(-0.1)
+
+    # The smoothed weight lags about 0.9 kg behind the last weight of 90.1 kg on a steady trend.
+    assert trend.smoothed_weight == pytest.approx(91.0, abs=1e-3)
+    expected = date.fromordinal(START + 99) + timedelta(days=110)
+    assert trend.projected_date(80.0) == expected
+    assert trend.projected_date(95.0) is None
+    assert WeightTrend().projected_date(80.0) is None
+
+
+def test_trend_store(tmp_path: Path):
+    """
+    Test that a stored trend is loaded with the same state, and that a deleted trend is gone.
+    """
+    store = WeightTrendStore(str(tmp_path))
+    trend = WeightTrend.from_arrays(np.array([START, START + 7]), np.array([80.0, 79.0]))
+    assert store.load("1") is None
+
+    store.save("1", trend)
+    assert store.load("1").__dict__ == trend.__dict__
+    store.delete("1")
+    store.delete("1")
+    assert store.load("1") is None